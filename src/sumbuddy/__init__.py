@@ -1,14 +1,39 @@
+import importlib
+
 from sumbuddy.__about__ import __version__
-from sumbuddy.__main__ import get_checksums
-from sumbuddy.hasher import Hasher
-from sumbuddy.mapper import Mapper
 
-# Create instances of the classes
-mapper_instance = Mapper()
-hasher_instance = Hasher()
+# Public names are resolved on first access so that `import sumbuddy` stays cheap:
+# neither the CLI module (argparse, tqdm) nor the walker (pathspec) is loaded until used.
+_LAZY_ATTRIBUTES = {
+    "ChecksumRecord": ("sumbuddy.checksums", "ChecksumRecord"),
+    "get_checksums": ("sumbuddy.__main__", "get_checksums"),
+    "iter_checksums": ("sumbuddy.checksums", "iter_checksums"),
+    "Hasher": ("sumbuddy.hasher", "Hasher"),
+    "Mapper": ("sumbuddy.mapper", "Mapper"),
+}
+
+# Instance methods exposed at package level, bound to a shared instance on first access
+_LAZY_METHODS = {
+    "gather_file_paths": ("Mapper", "gather_file_paths"),
+    "checksum_file": ("Hasher", "checksum_file"),
+}
+
+__all__ = ["ChecksumRecord", "__version__", "checksum_file", "gather_file_paths", "get_checksums", "iter_checksums"]
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+        value = getattr(importlib.import_module(module_name), attribute)
+    elif name in _LAZY_METHODS:
+        class_name, method = _LAZY_METHODS[name]
+        value = getattr(__getattr__(class_name)(), method)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+    return value
 
-# Expose the instance methods
-gather_file_paths = mapper_instance.gather_file_paths
-checksum_file = hasher_instance.checksum_file
 
-__all__ = ["__version__", "checksum_file", "gather_file_paths", "get_checksums"]
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | set(_LAZY_METHODS))
@@ -1,123 +1,656 @@
-import argparse
 import csv
-import hashlib
 import os
 import sys
-from contextlib import nullcontext
-
-from tqdm import tqdm
+import threading
+from contextlib import contextmanager, nullcontext
+from itertools import chain
 
 from sumbuddy.__about__ import __version__
 from sumbuddy.archive import ArchiveHandler
+from sumbuddy.checksums import (
+    _input_paths,
+    _iter_checksums,
+    _iter_entries,
+    load_checksums,
+    refine_fingerprints,
+)
 from sumbuddy.exceptions import (
     EmptyInputDirectoryError,
     LengthUsedForFixedLengthHashError,
     NoFilesAfterFilteringError,
+    NoListedFilesError,
     OutputFileExistsError,
+    StorageError,
 )
-from sumbuddy.hasher import Hasher
-from sumbuddy.mapper import Mapper
+from sumbuddy.mapper import iter_file_list
+
+
+class _NullProgressBar:
+    """Stand-in for a disabled tqdm bar; avoids importing tqdm when no progress is shown."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def update(self, n=1):
+        pass
+
+
+def _progress_bar(total, desc, disable):
+    if disable:
+        return _NullProgressBar()
+
+    from tqdm import tqdm
+
+    return tqdm(total=total, desc=desc)
+
+
+def _open_member_cache(member_cache_filepath, strict):
+    if not member_cache_filepath:
+        return nullcontext()
+
+    from sumbuddy.membercache import MemberCache
+
+    return MemberCache(member_cache_filepath, strict=strict)
 
 
-def get_checksums(input_path, output_filepath=None, ignore_file=None, include_hidden=False, algorithm='md5', length=None, archive_dive=True, force=False):
+@contextmanager
+def _open_file_list(files_from):
+    """Yield the paths of `files_from`: the path of a file list, '-' for standard input, an iterable of paths, or None."""
+    if files_from is None or not isinstance(files_from, (str, os.PathLike)):
+        yield files_from
+    elif files_from == "-":
+        yield iter_file_list(sys.stdin.buffer)
+    else:
+        with open(files_from, "rb") as f:
+            yield iter_file_list(f)
+
+
+def get_checksums(input_path, output_filepath=None, ignore_file=None, include_hidden=False, algorithm='md5', length=None, archive_dive=True, force=False, dir_digests_filepath=None, block_size=None, block_index_filepath=None, workers=None, follow_symlinks=False, inode_column=False, local_ignores=True, fingerprint_size=None, refine_baseline=None, chunk_report_filepath=None, chunk_size=None, chunk_index_filepath=None, walk_threads=None, pipelined=False, sort=None, decompress=False, max_bytes_per_second=None, max_files_per_second=None, files_from=None, xattrs=False, storage=None, member_cache_filepath=None, member_cache_strict=False, chunk_sample=None):
     """
-    Generate a CSV file with the filepath, filename, and checksum of all files in the input directory according to patterns to ignore. Checksum column is labeled by the selected algorithm (e.g., 'md5' or 'sha256').
+    Generate a CSV file with the filepath, filename, and checksum of all files in the input directory (or directories, or file list) according to patterns to ignore. Checksum column is labeled by the selected algorithm (e.g., 'md5' or 'sha256').
 
     Parameters:
     ------------
-    input_path - String. File or directory to traverse for files.
+    input_path - String or list of Strings. File or directory to traverse for files; several (non-overlapping) paths are hashed in one run into one output. With files_from, None or the directory the listed paths are relative to.
     output_filepath - String [optional]. Filepath for the output CSV file. Defaults to None, i.e. output will be to stdout.
     ignore_file - String [optional]. Filepath for the ignore patterns file.
     include_hidden - Boolean [optional]. Whether to include hidden files. Default is False.
-    algorithm - String. Algorithm to use for checksums. Default: 'md5', see options with 'hashlib.algorithms_available'.
+    algorithm - String. Algorithm to use for checksums. Default: 'md5', see options with 'hashlib.algorithms_available'. 'fastest-secure' picks the fastest collision-resistant algorithm on this machine (see sumbuddy.bench); the resolved name labels the column.
     length - Integer [conditionally optional]. Length of the digest for SHAKE (required) and BLAKE (optional) algorithms in bytes.
     archive_dive - Boolean [optional]. Whether to descend into archive files and hash their members. When False, archives are hashed as opaque files. Default: True.
     force - Boolean [optional]. Whether to overwrite output_filepath if it already exists. Default is False, which raises OutputFileExistsError when the file exists.
+    dir_digests_filepath - String [optional]. Filepath for a second CSV with a Merkle-style aggregate digest for every directory and archive member set (see sumbuddy.merkle), labeled dir-<checksum label> so fingerprint and block-tree aggregates are never mistaken for full checksums. Default is None, i.e. not written.
+    block_size - Integer [optional]. When given, compute block-tree digests over blocks of this many bytes instead of plain checksums (see sumbuddy.blocktree); the column is labeled e.g. 'tree-sha256-64MiB'. Default is None.
+    block_index_filepath - String [optional]. With block_size, filepath for a CSV of per-block digests, for later partial re-verification. Default is None, i.e. not written.
+    workers - Integer [optional]. Number of threads hashing the members of one archive concurrently, or the blocks of one file in block-tree mode. Default: CPU count.
+    follow_symlinks - Boolean [optional]. Whether to descend into symlinked directories, skipping any that would loop back to a directory already on the current path. Default is False.
+    local_ignores - Boolean [optional]. Whether to apply `.sumbuddyignore` files found in the walked directories, with gitignore layering semantics. Default is True.
+    inode_column - Boolean [optional]. Whether to add an 'inode' column holding '<st_dev>:<st_ino>' of each file (empty for archive members). Default is False.
+    fingerprint_size - Integer [optional]. When given, write quick fingerprints (file size plus the first, middle and last this many bytes, see Hasher.fingerprint_file) instead of checksums; the column is labeled e.g. 'fp-md5-1MiB'. Default is None.
+    refine_baseline - String [optional]. With fingerprint_size, filepath of an earlier fingerprint CSV. Rows whose fingerprint changed, is new, or collides with another file get a full checksum in an extra column labeled by the algorithm. Finding collisions holds every record in memory, so unlike the rest of the pipeline, refine mode does not run in constant memory. Default is None.
+    chunk_report_filepath - String [optional]. Filepath for a CSV estimating cross-file deduplication: files are also cut into content-defined chunks while they are hashed, and unique versus total chunk bytes are reported for the tree and each directory (see sumbuddy.chunking). Default is None, i.e. no chunk analysis.
+    chunk_size - Integer [optional]. With chunk_report_filepath, average chunk size in bytes, a power of two. Default: 64 KiB.
+    chunk_index_filepath - String [optional]. With chunk_report_filepath, filepath for a CSV listing every chunk (filepath, offset, length, digest). Default is None, i.e. not written.
+    walk_threads - Integer [optional]. Number of threads listing directories concurrently during the walk, for NFS, Lustre and other filesystems with slow metadata. Rows are then sorted by name within each directory. Default is None, i.e. a single-threaded walk.
+    pipelined - Boolean [optional]. Whether to read each file on a background I/O thread into a ring of 4 x 1 MiB buffers while the previous buffer is hashed, for high-latency storage. Default is False.
+    decompress - Boolean [optional]. Whether to also hash the decompressed content of .gz, .bz2, .xz (and, on Python 3.14+, .zst) files, read in the same pass as the file itself, in an extra row '<file path>/<name without suffix>' right after the file's own row. Nothing is written to disk. Default is False.
+    max_bytes_per_second - Number [optional]. Cap on the average read throughput, enforced by a token bucket shared by every reading thread (see sumbuddy.throttle), so a run can go on beside production load. Default is None, i.e. unlimited.
+    max_files_per_second - Number [optional]. Cap on the average number of files and archive members opened per second, shared likewise. Default is None, i.e. unlimited.
+    sort - String [optional]. 'path' to order rows by filepath, or 'checksum' by checksum then filepath, comparing bytes so the order is the same on every filesystem and locale. Rows are sorted with bounded memory, spilling sorted runs to temporary files (see sumbuddy.extsort), and written once hashing is complete. Default is None, i.e. walk order.
+    files_from - String or iterable of Strings [optional]. Hash only the files listed here instead of walking input_path: the path of a file list with one path per line or NUL-separated (as from `find -print0`), '-' for standard input, or an iterable of paths. Ignore patterns and archive dive still apply; missing files and directories are skipped with a warning. Default is None.
+    xattrs - Boolean [optional]. Whether to keep each file's digest in a `user.sumbuddy.<algorithm>` extended attribute holding the digest, size and mtime_ns, and to trust it instead of reading the file while size and mtime match. The digest then travels with the data (e.g. `rsync -X`). Filesystems without extended attributes are hashed as usual. Plain checksums only. Default is False.
+    storage - sumbuddy.storage.StorageBackend [optional]. Hash objects from this backend instead of local files, e.g. sumbuddy.storage.S3Storage.from_url('s3://bucket/prefix'); input_path is then the key prefix (or a list of them) and rows carry 's3://bucket/key' paths. Objects are read with many concurrent ranged GETs over reused connections. Plain checksums and ignore patterns only. Default is None, i.e. the local filesystem.
+    member_cache_filepath - String [optional]. Filepath of a SQLite cache of archive member digests, created if missing (see sumbuddy.membercache). An archive whose device, inode, size, mtime and central directory are unchanged since it was cached has its member rows written from the cache, without decompressing any member. Cannot be combined with chunk_report_filepath or block_index_filepath. Default is None.
+    member_cache_strict - Boolean [optional]. With member_cache_filepath, key the cache on each archive's full digest instead, so an archive is trusted only if its bytes are unchanged (at the cost of reading it, which its own row needs anyway). Default is False.
+    chunk_sample - Float [optional]. With chunk_report_filepath, fraction of files to chunk, above 0 and at most 1. Chunking runs at about 1% of md5's throughput, so a sample keeps the estimate affordable on large trees; files are picked by their first bytes (see sumbuddy.chunking.ChunkAnalyzer). Default is None, i.e. every file.
+
+    Rows are produced by sumbuddy.iter_checksums and written as they arrive. Hardlinked files are read only once; the digest is reused for every path.
     """
-    if output_filepath and not force and os.path.exists(output_filepath):
-        raise OutputFileExistsError(output_filepath)
+    if block_index_filepath and not block_size:
+        raise ValueError("block_index_filepath requires block_size")
+    if member_cache_strict and not member_cache_filepath:
+        raise ValueError("member_cache_strict requires member_cache_filepath")
+    input_paths = _input_paths(input_path)
+    if dir_digests_filepath and (files_from is not None or len(input_paths) > 1 or storage is not None):
+        raise ValueError("dir_digests_filepath needs a single local input directory; it cannot be combined with several input paths, files_from or storage")
+    throttle = None
+    if max_bytes_per_second or max_files_per_second:
+        from sumbuddy.throttle import Throttle
 
-    mapper = Mapper()
+        throttle = Throttle(max_bytes_per_second, max_files_per_second)
+    sorter = None
+    if sort is not None:
+        from sumbuddy.extsort import SORT_KEYS, ExternalSorter, row_key
 
-    if os.path.isfile(input_path):
-        regular_files = [os.path.normpath(input_path)]
-        archive_files = []
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unsupported sort order '{sort}'; use one of: {', '.join(SORT_KEYS)}")
+        sorter = ExternalSorter(row_key(SORT_KEYS[sort]))
+    if algorithm == "fastest-secure":
+        from sumbuddy.bench import resolve_algorithm
+
+        algorithm = resolve_algorithm(algorithm)
+    if refine_baseline and not fingerprint_size:
+        raise ValueError("refine_baseline requires fingerprint_size")
+    if (chunk_size or chunk_index_filepath or chunk_sample is not None) and not chunk_report_filepath:
+        raise ValueError("chunk_size, chunk_index_filepath and chunk_sample require chunk_report_filepath")
+    if chunk_sample is not None and not 0 < chunk_sample <= 1:
+        raise ValueError("chunk_sample must be a fraction of files above 0 and at most 1")
+    if chunk_report_filepath and (block_size or fingerprint_size):
+        raise ValueError("chunk_report_filepath cannot be combined with block_size or fingerprint_size")
+    for path in (output_filepath, dir_digests_filepath, block_index_filepath, chunk_report_filepath, chunk_index_filepath):
+        if path and not force and os.path.exists(path):
+            raise OutputFileExistsError(path)
+
+    if storage is None and files_from is None and input_paths and all(os.path.isfile(path) for path in input_paths):
         if ignore_file:
             print("Warning: --ignore-file (-i) flag is ignored when input is a single file.")
         if include_hidden:
             print("Warning: --include-hidden (-H) flag is ignored when input is a single file.")
+        if dir_digests_filepath:
+            print("Warning: --dir-digests flag is ignored when input is a single file.")
+            dir_digests_filepath = None
+
+    options = {
+        "ignore_file": ignore_file,
+        "include_hidden": include_hidden,
+        "archive_dive": archive_dive,
+        "follow_symlinks": follow_symlinks,
+        "local_ignores": local_ignores,
+        "walk_threads": walk_threads,
+        "decompress": decompress,
+        # Exclude the output files from being hashed
+        "exclude": (output_filepath, dir_digests_filepath, block_index_filepath, chunk_report_filepath, chunk_index_filepath)
+        + ((member_cache_filepath, f"{member_cache_filepath}-wal", f"{member_cache_filepath}-shm") if member_cache_filepath else ()),
+    }
+
+    if storage is not None:
+        source = ", ".join(storage.url(prefix) for prefix in input_paths or [""])
+    elif files_from is None:
+        source = ", ".join(os.fspath(path) for path in input_paths)
+    elif isinstance(files_from, (str, os.PathLike)):
+        source = "files listed in " + ("standard input" if files_from == "-" else os.fspath(files_from))
     else:
-        regular_files, archive_files = mapper.gather_file_paths(
-            input_path,
-            ignore_file=ignore_file,
-            include_hidden=include_hidden,
-            archive_dive=archive_dive,
-        )
+        source = "listed files"
 
-    # Exclude the output file from being hashed
-    if output_filepath:
-        output_file_abs_path = os.path.abspath(output_filepath)
-        regular_files = [path for path in regular_files if os.path.abspath(path) != output_file_abs_path]
-        archive_files = [path for path in archive_files if os.path.abspath(path) != output_file_abs_path]
+    checksum_label = algorithm
+    if block_size:
+        from sumbuddy.blocktree import BlockIndexWriter, block_tree_label
 
-    hasher = Hasher(algorithm)
-    archive_handler = ArchiveHandler()
+        checksum_label = block_tree_label(algorithm, block_size)
+    elif fingerprint_size:
+        from sumbuddy.hasher import fingerprint_label
+
+        checksum_label = fingerprint_label(algorithm, fingerprint_size)
+
+    directory_digests = None
+    if dir_digests_filepath:
+        from sumbuddy.merkle import DirectoryDigests
+
+        directory_digests = DirectoryDigests(input_paths[0], algorithm=algorithm, length=length, label=checksum_label)
+
+    baseline = None
+    if refine_baseline:
+        baseline_label, baseline = load_checksums(refine_baseline)
+        if baseline_label != checksum_label:
+            raise ValueError(f"Baseline {refine_baseline} holds '{baseline_label}' values, not '{checksum_label}' fingerprints")
 
     with (
-        open(output_filepath, 'w', newline='')
-        if output_filepath
-        else nullcontext(sys.stdout)
-    ) as output_stream:
-        writer = csv.writer(output_stream)
-        writer.writerow(["filepath", "filename", f"{algorithm}"])
+        open(block_index_filepath, 'w', newline='')
+        if block_index_filepath
+        else nullcontext()
+    ) as block_index_stream, (
+        open(chunk_index_filepath, 'w', newline='')
+        if chunk_index_filepath
+        else nullcontext()
+    ) as chunk_index_stream, _open_file_list(files_from) as listed_paths, (
+        _open_member_cache(member_cache_filepath, member_cache_strict)
+    ) as member_cache:
+        block_index = BlockIndexWriter(block_index_stream, checksum_label) if block_index_stream else None
+        chunk_analyzer = None
+        if chunk_report_filepath:
+            from sumbuddy.chunking import DEFAULT_AVERAGE_CHUNK_SIZE, ChunkAnalyzer
+
+            chunk_analyzer = ChunkAnalyzer(chunk_size or DEFAULT_AVERAGE_CHUNK_SIZE, index_stream=chunk_index_stream, sample=chunk_sample or 1.0)
+        records = _iter_checksums(input_paths, files_from=listed_paths, xattrs=xattrs, storage=storage, member_cache=member_cache, algorithm=algorithm, length=length, block_size=block_size, workers=workers, fingerprint_size=fingerprint_size, pipelined=pipelined, throttle=throttle, block_index=block_index, chunk_analyzer=chunk_analyzer, **options)
+        # Start the walk before creating the output, so an empty or fully filtered input leaves no file behind
+        first_record = next(records, None)
 
         disable_tqdm = output_filepath is None
-        total_files = (
-            len(regular_files)
-            + len(archive_files)
-            + sum(archive_handler.count_members(p) for p in archive_files)
-        )
-        with tqdm(total=total_files, desc=f"Calculating {algorithm} checksums on {input_path}", disable=disable_tqdm) as pbar:
-            for file_path in regular_files:
-                checksum = hasher.checksum_file(file_path, algorithm=algorithm, length=length)
-                writer.writerow([file_path, os.path.basename(file_path), checksum])
-                pbar.update(1)
-            for archive_path in archive_files:
-                checksum = hasher.checksum_file(archive_path, algorithm=algorithm, length=length)
-                writer.writerow([archive_path, os.path.basename(archive_path), checksum])
+        # The bar's total comes from a second walk, run alongside hashing. A file list can only be read once, listing a bucket twice
+        # costs requests, and walk_threads marks a filesystem where a second walk would double the metadata load: those bars have no total
+        count_total = not disable_tqdm and files_from is None and storage is None and not walk_threads
+        with (
+            open(output_filepath, 'w', newline='')
+            if output_filepath
+            else nullcontext(sys.stdout)
+        ) as output_stream, _progress_bar(None, f"Calculating {checksum_label} checksums on {source}", disable_tqdm) as pbar, (
+            _counting_total(pbar, input_paths, options) if count_total else nullcontext()
+        ), (
+            sorter or nullcontext()
+        ):
+            writer = csv.writer(output_stream)
+            writer.writerow(["filepath", "filename", checksum_label] + ([algorithm] if baseline is not None else []) + (["inode"] if inode_column else []))
+            records = chain([first_record], records) if first_record else ()
+            if baseline is None:
+                rows = ((record, None) for record in records)
+            else:
+                rows = refine_fingerprints(records, baseline, algorithm=algorithm, length=length, throttle=throttle)
+            for record, full_checksum in rows:
+                row = [record.path, record.name, record.digest]
+                if baseline is not None:
+                    row.append(full_checksum or "")
+                if inode_column:
+                    row.append(f"{record.file_id[0]}:{record.file_id[1]}" if record.file_id else "")
+                if sorter:
+                    sorter.add(row)
+                else:
+                    writer.writerow(row)
+                if directory_digests:
+                    if record.archive:
+                        directory_digests.add_member(record.archive, record.path[len(record.archive) + 1:], record.digest)
+                    else:
+                        directory_digests.add_file(record.path, record.digest)
                 pbar.update(1)
-                for member, file_obj in archive_handler.iter_members(archive_path):
-                    virtual_path = f"{archive_path}/{member}"
-                    checksum = hasher.checksum_file(file_obj, algorithm=algorithm, length=length)
-                    writer.writerow([virtual_path, os.path.basename(member), checksum])
-                    pbar.update(1)
+            if sorter:
+                writer.writerows(sorter)
+
+    if directory_digests:
+        directory_digests.write_csv(dir_digests_filepath)
+    if chunk_analyzer:
+        chunk_analyzer.write_report(chunk_report_filepath)
 
     if output_filepath:
-        print(f"{algorithm} checksums for {input_path} written to {output_filepath}")
+        print(f"{checksum_label} checksums for {source} written to {output_filepath}")
+
+def _count_entries(input_paths, decompress=False, stop=None, **walk_options):
+    """Number of records get_checksums will write, for the progress bar; walks the trees without hashing. None once `stop` (an Event) is set."""
+    archive_handler = ArchiveHandler()
+    total = 0
+    for file_path, _, is_archive in _iter_entries(input_paths, **walk_options):
+        if stop is not None and stop.is_set():
+            return None
+        # Counting members reads only each archive's central directory
+        total += 1 + (archive_handler.count_members(file_path) if is_archive else 0)
+        if decompress and not is_archive and archive_handler.is_compressed_file(file_path):
+            total += 1
+    return total
+
+
+@contextmanager
+def _counting_total(pbar, input_paths, options):
+    """Count the records on a background thread while hashing runs, and give the progress bar its total once known."""
+    stop = threading.Event()
+
+    def count():
+        try:
+            total = _count_entries(input_paths, stop=stop, **options)
+        except Exception:  # noqa: BLE001 - the count only feeds the bar; the hashing walk reports any real problem with the tree
+            return
+        if total is not None:
+            pbar.total = total
+
+    thread = threading.Thread(target=count, name="sumbuddy-count", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _add_checksum_arguments(parser, multiple_inputs=False):
+    """Arguments shared by the default command and `client`: what to hash, how, and where to write it."""
+    import argparse
+    import hashlib
 
-def main():
     available_algorithms = ', '.join(hashlib.algorithms_available)
 
-    parser = argparse.ArgumentParser(description="Generate CSV with filepath, filename, and checksums for all files in a given directory (or a single file)")
-    parser.add_argument("-V", "--version", action="version", version=f"%(prog)s {__version__}")
-    parser.add_argument("input_path", help="File or directory to traverse for files")
+    if multiple_inputs:
+        parser.add_argument("input_path", nargs="*", help="Files or directories to traverse for files, written to one output. With --files-from, the directory listed paths are relative to (default: the current directory)")
+    else:
+        parser.add_argument("input_path", help="File or directory to traverse for files")
     parser.add_argument("-o", "--output-file", help="Filepath for the output CSV file; defaults to stdout", default=None)
     parser.add_argument("-f", "--force", action="store_true", help="Overwrite the output file if it already exists")
     group = parser.add_mutually_exclusive_group()
     group.add_argument("-i", "--ignore-file", help="Filepath for the ignore patterns file")
     group.add_argument("-H", "--include-hidden", action="store_true", help="Include hidden files")
-    parser.add_argument("-a", "--algorithm", default="md5", help=f"Hash algorithm to use (default: md5; available: {available_algorithms})")
+    parser.add_argument("-a", "--algorithm", default="md5", help=f"Hash algorithm to use (default: md5; available: {available_algorithms}). 'fastest-secure' picks the fastest collision-resistant algorithm on this machine (see `sum-buddy bench-algorithms`)")
     parser.add_argument("-l", "--length", type=int, help="Length of the digest for SHAKE (required) or BLAKE (optional) algorithms in bytes")
     parser.add_argument("--archive-dive", action=argparse.BooleanOptionalAction, default=True, help="Descend into archive files and hash their members (default). Use --no-archive-dive to hash archives as opaque files.")
+    parser.add_argument("--local-ignores", action=argparse.BooleanOptionalAction, default=True, help="Apply .sumbuddyignore files found in subdirectories on top of the ignore rules, as git does with .gitignore (default). Use --no-local-ignores to disable.")
+
+
+def _serve(argv):
+    import argparse
+    import signal
+
+    from sumbuddy.cache import HashCache
+    from sumbuddy.exceptions import ServerAlreadyRunningError
+    from sumbuddy.server import ChecksumServer, default_socket_path
+
+    parser = argparse.ArgumentParser(prog="sum-buddy serve", description="Run a resident checksum server on a Unix domain socket; requests and results are JSON lines")
+    parser.add_argument("--socket", default=default_socket_path(), help="Path of the Unix socket to listen on (default: %(default)s)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of hashing threads shared by all requests (default: CPU count)")
+    parser.add_argument("--cache-size", type=int, default=1_000_000, help="Maximum number of file digests kept in the in-memory cache (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    # Let service managers stop the server cleanly so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        with ChecksumServer(args.socket, workers=args.workers, cache=HashCache(args.cache_size)) as server:
+            print(f"sum-buddy server listening on {server.socket_path}", file=sys.stderr)
+            server.serve_forever()
+    except (ServerAlreadyRunningError, FileExistsError) as e:
+        sys.exit(str(e))
+    except KeyboardInterrupt:
+        pass
+
+
+def _client(argv):
+    import argparse
+
+    from sumbuddy.exceptions import ServerRequestError
+    from sumbuddy.server import default_socket_path, request_checksums
 
-    args = parser.parse_args()
+    parser = argparse.ArgumentParser(prog="sum-buddy client", description="Request checksums from a running `sum-buddy serve`; output matches the regular command")
+    parser.add_argument("--socket", default=default_socket_path(), help="Path of the server's Unix socket (default: %(default)s)")
+    _add_checksum_arguments(parser)
+    args = parser.parse_args(argv)
 
     if args.output_file and not args.output_file.endswith('.csv'):
         parser.error("Output file is in CSV format; extension should be '.csv'")
+    if args.output_file and not args.force and os.path.exists(args.output_file):
+        sys.exit(str(OutputFileExistsError(args.output_file)))
 
     try:
-        get_checksums(
+        records = request_checksums(
+            args.input_path,
+            socket_path=args.socket,
+            ignore_file=args.ignore_file,
+            include_hidden=args.include_hidden,
+            algorithm=args.algorithm,
+            length=args.length,
+            archive_dive=args.archive_dive,
+            local_ignores=args.local_ignores,
+        )
+    except (FileNotFoundError, ConnectionRefusedError):
+        sys.exit(f"No sum-buddy server is listening on '{args.socket}'.\nStart one with `sum-buddy serve`.")
+
+    try:
+        with (
+            open(args.output_file, 'w', newline='')
+            if args.output_file
+            else nullcontext(sys.stdout)
+        ) as output_stream:
+            writer = csv.writer(output_stream)
+            writer.writerow(["filepath", "filename", f"{args.algorithm}"])
+            output_file_abs_path = os.path.abspath(args.output_file) if args.output_file else None
+            for record in records:
+                # The server cannot know which file this client writes to, so exclude it here
+                if output_file_abs_path and os.path.abspath(record["filepath"]) == output_file_abs_path:
+                    continue
+                writer.writerow([record["filepath"], record["filename"], record["checksum"]])
+    except ServerRequestError as e:
+        sys.exit(str(e))
+
+
+def _watch(argv):
+    import argparse
+
+    from sumbuddy.watch import Watcher
+
+    parser = argparse.ArgumentParser(prog="sum-buddy watch", description="Scan a directory into a SQLite manifest, then keep it up to date as files are created, modified or deleted (Linux inotify)")
+    parser.add_argument("input_path", help="Directory to watch")
+    parser.add_argument("-o", "--output-file", required=True, help="Filepath for the SQLite manifest; reused (and brought up to date) if it exists")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-i", "--ignore-file", help="Filepath for the ignore patterns file")
+    group.add_argument("-H", "--include-hidden", action="store_true", help="Include hidden files")
+    parser.add_argument("-a", "--algorithm", default="md5", help="Hash algorithm to use (default: md5)")
+    parser.add_argument("-l", "--length", type=int, help="Length of the digest for SHAKE (required) or BLAKE (optional) algorithms in bytes")
+    parser.add_argument("--archive-dive", action=argparse.BooleanOptionalAction, default=True, help="Descend into archive files and hash their members (default)")
+    parser.add_argument("--debounce", type=float, default=2.0, help="Seconds a file must go unmodified before it is rehashed (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.input_path):
+        parser.error(f"'{args.input_path}' is not a directory")
+
+    try:
+        with Watcher(
             args.input_path,
+            args.output_file,
+            ignore_file=args.ignore_file,
+            include_hidden=args.include_hidden,
+            algorithm=args.algorithm,
+            length=args.length,
+            archive_dive=args.archive_dive,
+            debounce=args.debounce,
+        ) as watcher:
+            print(f"Watching {args.input_path}; {args.algorithm} manifest at {args.output_file} (Ctrl+C to stop)", file=sys.stderr)
+            watcher.run()
+    except (LengthUsedForFixedLengthHashError, OSError) as e:
+        sys.exit(str(e))
+    except KeyboardInterrupt:
+        pass
+
+
+def _bench_algorithms(argv):
+    import argparse
+
+    from sumbuddy.bench import (
+        DEFAULT_BUFFER_SIZES,
+        bench_algorithms,
+        fastest_secure_algorithm,
+        format_results,
+    )
+    from sumbuddy.blocktree import format_block_size, parse_block_size
+
+    parser = argparse.ArgumentParser(prog="sum-buddy bench-algorithms", description="Measure the throughput of each hash algorithm on this machine and print a ranked table")
+    parser.add_argument("-a", "--algorithms", help="Comma-separated algorithms to measure (default: all available)")
+    parser.add_argument("--buffer-sizes", default=",".join(format_block_size(size) for size in DEFAULT_BUFFER_SIZES), help="Comma-separated bytes per read/update, e.g. 4K,1M (default: %(default)s)")
+    parser.add_argument("--size", default="64M", help="Amount of random data hashed per measurement (default: %(default)s)")
+    parser.add_argument("--directory", help="Directory for the on-disk test file, e.g. on the filesystem you will hash (default: system temporary directory)")
+    parser.add_argument("--no-disk", action="store_true", help="Only measure in-memory hashing")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per measurement (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        buffer_sizes = [parse_block_size(size) for size in args.buffer_sizes.split(",")]
+        data_size = parse_block_size(args.size)
+    except ValueError as e:
+        parser.error(str(e))
+    algorithms = args.algorithms.split(",") if args.algorithms else None
+    results = bench_algorithms(algorithms, buffer_sizes=buffer_sizes, data_size=data_size, on_disk=not args.no_disk, directory=args.directory, min_time=args.min_time)
+    if not results:
+        sys.exit("None of the requested algorithms is available")
+    print(format_results(results))
+    print(f"\n--algorithm fastest-secure resolves to: {fastest_secure_algorithm()}")
+
+
+def _lookup(argv):
+    import argparse
+    import sqlite3
+
+    from sumbuddy.lookup import ManifestIndex
+
+    parser = argparse.ArgumentParser(prog="sum-buddy lookup", description="Look up files in a CSV manifest by checksum or filepath, through a SQLite sidecar index that is built on first use and rebuilt whenever the manifest changes")
+    parser.add_argument("manifest", help="CSV manifest written by sum-buddy")
+    parser.add_argument("-c", "--checksum", action="append", default=[], help="Checksum to find; may be repeated")
+    parser.add_argument("-p", "--path", action="append", default=[], help="Exact filepath to find, as written in the manifest; may be repeated")
+    parser.add_argument("--index", help="Filepath of the sidecar index (default: <manifest>.index.sqlite)")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index even if it is up to date")
+    args = parser.parse_args(argv)
+
+    try:
+        with ManifestIndex(args.manifest, index_path=args.index) as index:
+            if index.refresh(force=args.rebuild) and not (args.checksum or args.path):
+                print(f"Index for {args.manifest} written to {index.index_path}", file=sys.stderr)
+            if not (args.checksum or args.path):
+                return
+            writer = csv.writer(sys.stdout)
+            writer.writerow(["filepath", "filename", index.label])
+            found = False
+            for rows in chain((index.by_checksum(checksum) for checksum in args.checksum), (index.by_path(path) for path in args.path)):
+                writer.writerows(rows)
+                found = found or bool(rows)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        sys.exit(str(e))
+    # Like grep, exit with status 1 when nothing matched
+    if not found:
+        sys.exit(1)
+
+
+# Commands recognized as the first CLI argument; anything else is an input path.
+# A file or directory literally named like a command can be passed as ./serve.
+_SUBCOMMANDS = {
+    "serve": _serve,
+    "client": _client,
+    "watch": _watch,
+    "bench-algorithms": _bench_algorithms,
+    "lookup": _lookup,
+}
+
+
+def main(argv=None):
+    # Deferred so that library imports of get_checksums do not pay for the CLI
+    import argparse
+
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] in _SUBCOMMANDS:
+        return _SUBCOMMANDS[argv[0]](argv[1:])
+
+    parser = argparse.ArgumentParser(
+        description="Generate CSV with filepath, filename, and checksums for all files in a given directory (or a single file)",
+        epilog=f"Other commands: {', '.join(_SUBCOMMANDS)} (see `sum-buddy <command> -h`)",
+    )
+    parser.add_argument("-V", "--version", action="version", version=f"%(prog)s {__version__}")
+    _add_checksum_arguments(parser, multiple_inputs=True)
+    parser.add_argument("--files-from", metavar="FILE", help="Hash only the files listed in FILE ('-' for standard input), one per line or NUL-separated as from `find -print0`, instead of walking directories. Ignore patterns and archive dive still apply")
+    parser.add_argument("--endpoint-url", metavar="URL", help="For s3://bucket/prefix inputs, URL of the S3-compatible service (default: AWS_ENDPOINT_URL, else AWS S3). Credentials are read from AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY; without them requests are anonymous")
+    parser.add_argument("--storage-concurrency", type=int, metavar="N", help="For s3:// inputs, number of concurrent ranged GETs and open connections (default: 16)")
+    parser.add_argument("--block-tree", metavar="BLOCK_SIZE", help="Compute block-tree digests over blocks of BLOCK_SIZE (e.g. 64M) hashed in parallel, instead of plain checksums. The column is labeled tree-<algorithm>-<size>: these values are NOT comparable with plain digests")
+    parser.add_argument("--block-index", metavar="BLOCK_INDEX_FILE", help="With --block-tree, write per-block digests to this CSV for partial re-verification")
+    parser.add_argument("-w", "--workers", type=int, help="Number of threads hashing the members of an archive, or the blocks of one file in --block-tree mode (default: CPU count)")
+    parser.add_argument("--fingerprint", metavar="SAMPLE_SIZE", nargs="?", const="1M", help="Write quick fingerprints instead of checksums: a digest of each file's size plus its first, middle and last SAMPLE_SIZE bytes (default 1M). The column is labeled fp-<algorithm>-<size>")
+    parser.add_argument("--refine", metavar="BASELINE_CSV", help="With --fingerprint, compare against an earlier fingerprint CSV and add a full checksum column for rows whose fingerprint changed, is new, or collides with another row")
+    parser.add_argument("--dir-digests", metavar="DIR_DIGESTS_FILE", help="Also write a CSV with an aggregate (Merkle-style) digest for every directory and archive member set, for fast comparison of replicas")
+    parser.add_argument("--chunk-report", metavar="REPORT_CSV", help="Also cut files into content-defined chunks while hashing them and write a CSV of total versus unique chunk bytes for the tree and each directory, estimating what deduplication would save. Chunking runs at about 1%% of md5's throughput (about 5 MB/s against 470 MB/s); see --chunk-sample")
+    parser.add_argument("--chunk-size", metavar="AVERAGE_SIZE", help="With --chunk-report, average chunk size, a power of two (default: 64K)")
+    parser.add_argument("--chunk-sample", type=float, metavar="FRACTION", help="With --chunk-report, chunk only this fraction of files, e.g. 0.01, picked by their first 4 KiB so identical files are sampled together; the report's dedup_ratio then estimates the whole tree's (default: 1, every file)")
+    parser.add_argument("--chunk-index", metavar="INDEX_CSV", help="With --chunk-report, also write every chunk's filepath, offset, length and digest to this CSV")
+    parser.add_argument("-L", "--follow-symlinks", action="store_true", help="Descend into symlinked directories; symlink loops are detected and skipped")
+    parser.add_argument("--decompress", action="store_true", help="Also hash the decompressed content of .gz, .bz2 and .xz files (.zst on Python 3.14+) in the same read, as an extra row <file>/<name without suffix>")
+    parser.add_argument("--sort", choices=["path", "checksum"], help="Write rows in a canonical order, by filepath or by checksum then filepath (byte order, independent of filesystem and locale), so manifests can be compared byte for byte. Uses bounded memory: sorted runs are spilled to temporary files and merged")
+    parser.add_argument("--pipelined-reads", action="store_true", help="Read each file on a background thread into a small ring of buffers while hashing, so reads and hashing overlap on high-latency storage")
+    parser.add_argument("--max-bytes-per-sec", metavar="RATE", help="Limit the average read rate, e.g. 50M for 50 MiB/s, across all threads")
+    parser.add_argument("--max-files-per-sec", metavar="RATE", type=float, help="Limit the average number of files opened per second across all threads")
+    parser.add_argument("--ionice", choices=["idle", "best-effort"], help="Linux only: set the I/O scheduling class, 'idle' to only use the disk when nothing else does, 'best-effort' for the lowest best-effort priority")
+    parser.add_argument("--walk-threads", type=int, metavar="N", help="List directories with N threads concurrently, for network and parallel filesystems where the walk waits on metadata; rows are then sorted by name within each directory")
+    parser.add_argument("--xattrs", action="store_true", help="Store each file's digest, size and mtime in a user.sumbuddy.<algorithm> extended attribute, and reuse it without reading the file while size and mtime are unchanged (plain checksums only)")
+    parser.add_argument("--member-cache", metavar="CACHE_FILE", help="Keep archive member digests in this SQLite file, and write the member rows of archives unchanged since (same inode, size, mtime and central directory) from it without decompressing them")
+    parser.add_argument("--member-cache-strict", action="store_true", help="With --member-cache, trust cached members only if the archive's full checksum is unchanged")
+    parser.add_argument("--inode-column", action="store_true", help="Add an 'inode' column (<device>:<inode>) identifying the physical file behind each path")
+
+    args = parser.parse_args(argv)
+
+    if args.output_file and not args.output_file.endswith('.csv'):
+        parser.error("Output file is in CSV format; extension should be '.csv'")
+    if args.files_from and len(args.input_path) > 1:
+        parser.error("--files-from takes at most one input directory, which the listed paths are relative to")
+    if not args.files_from and not args.input_path:
+        parser.error("the following arguments are required: input_path (or --files-from)")
+    if args.dir_digests and (args.files_from or len(args.input_path) > 1):
+        parser.error("--dir-digests needs a single input directory")
+    storage = None
+    input_paths = args.input_path
+    # As sumbuddy.storage.is_storage_url, without importing the storage module for local inputs
+    if any(path.startswith("s3://") for path in args.input_path):
+        from sumbuddy.storage import S3Storage, is_storage_url
+
+        if not all(is_storage_url(path) for path in args.input_path) or args.files_from:
+            parser.error("s3:// inputs cannot be mixed with local paths or --files-from")
+        try:
+            locations = [S3Storage.from_url(path, endpoint_url=args.endpoint_url, concurrency=args.storage_concurrency) for path in args.input_path]
+        except ValueError as e:
+            parser.error(str(e))
+        if len({location.bucket for location, _ in locations}) > 1:
+            parser.error("s3:// inputs must all be in the same bucket")
+        storage = locations[0][0]
+        input_paths = [prefix for _, prefix in locations]
+    elif args.endpoint_url or args.storage_concurrency:
+        parser.error("--endpoint-url and --storage-concurrency apply to s3:// inputs")
+    if args.block_index and not args.block_tree:
+        parser.error("--block-index requires --block-tree")
+    if args.refine and not args.fingerprint:
+        parser.error("--refine requires --fingerprint")
+    if args.fingerprint and args.block_tree:
+        parser.error("--fingerprint and --block-tree cannot be combined")
+    if (args.chunk_size or args.chunk_index or args.chunk_sample is not None) and not args.chunk_report:
+        parser.error("--chunk-size, --chunk-index and --chunk-sample require --chunk-report")
+    if args.chunk_sample is not None and not 0 < args.chunk_sample <= 1:
+        parser.error("--chunk-sample must be above 0 and at most 1")
+    if args.member_cache_strict and not args.member_cache:
+        parser.error("--member-cache-strict requires --member-cache")
+    if args.member_cache and (args.chunk_report or args.block_index):
+        parser.error("--member-cache cannot be combined with --chunk-report or --block-index")
+    if args.member_cache_strict and args.fingerprint:
+        parser.error("--member-cache-strict cannot be combined with --fingerprint")
+    if args.xattrs and (args.fingerprint or args.block_tree or args.chunk_report):
+        parser.error("--xattrs cannot be combined with --fingerprint, --block-tree or --chunk-report")
+    if args.decompress and (args.fingerprint or args.block_tree or args.chunk_report):
+        parser.error("--decompress cannot be combined with --fingerprint, --block-tree or --chunk-report")
+    if args.chunk_report and (args.fingerprint or args.block_tree):
+        parser.error("--chunk-report cannot be combined with --fingerprint or --block-tree")
+    block_size = None
+    fingerprint_size = None
+    chunk_size = None
+    max_bytes_per_second = None
+    if args.max_bytes_per_sec:
+        from sumbuddy.blocktree import parse_block_size
+
+        try:
+            max_bytes_per_second = parse_block_size(args.max_bytes_per_sec)
+        except ValueError as e:
+            parser.error(str(e).replace("block size", "rate"))
+    if args.max_files_per_sec is not None and args.max_files_per_sec <= 0:
+        parser.error("--max-files-per-sec must be positive")
+    if args.ionice:
+        from sumbuddy.throttle import set_io_priority
+
+        try:
+            set_io_priority(args.ionice)
+        except OSError as e:
+            print(f"Warning: could not set the I/O scheduling class: {e}", file=sys.stderr)
+    if args.chunk_size:
+        from sumbuddy.blocktree import parse_block_size
+
+        try:
+            chunk_size = parse_block_size(args.chunk_size)
+        except ValueError as e:
+            parser.error(str(e).replace("block size", "chunk size"))
+        if chunk_size < 64 or chunk_size & (chunk_size - 1):
+            parser.error("--chunk-size must be a power of two of at least 64 bytes")
+    if args.fingerprint:
+        from sumbuddy.blocktree import parse_block_size
+
+        try:
+            fingerprint_size = parse_block_size(args.fingerprint)
+        except ValueError as e:
+            parser.error(str(e).replace("block size", "sample size"))
+    if args.block_tree:
+        from sumbuddy.blocktree import parse_block_size
+
+        try:
+            block_size = parse_block_size(args.block_tree)
+        except ValueError as e:
+            parser.error(str(e))
+
+    try:
+        get_checksums(
+            input_paths,
             output_filepath=args.output_file,
             ignore_file=args.ignore_file,
             include_hidden=args.include_hidden,
@@ -125,9 +658,36 @@ def main():
             length=args.length,
             archive_dive=args.archive_dive,
             force=args.force,
+            dir_digests_filepath=args.dir_digests,
+            block_size=block_size,
+            block_index_filepath=args.block_index,
+            workers=args.workers,
+            follow_symlinks=args.follow_symlinks,
+            inode_column=args.inode_column,
+            local_ignores=args.local_ignores,
+            fingerprint_size=fingerprint_size,
+            refine_baseline=args.refine,
+            chunk_report_filepath=args.chunk_report,
+            chunk_size=chunk_size,
+            chunk_sample=args.chunk_sample,
+            chunk_index_filepath=args.chunk_index,
+            walk_threads=args.walk_threads,
+            pipelined=args.pipelined_reads,
+            sort=args.sort,
+            decompress=args.decompress,
+            max_bytes_per_second=max_bytes_per_second,
+            max_files_per_second=args.max_files_per_sec,
+            files_from=args.files_from,
+            xattrs=args.xattrs,
+            storage=storage,
+            member_cache_filepath=args.member_cache,
+            member_cache_strict=args.member_cache_strict,
         )
-    except (EmptyInputDirectoryError, NoFilesAfterFilteringError, LengthUsedForFixedLengthHashError, OutputFileExistsError) as e:
+    except (EmptyInputDirectoryError, NoFilesAfterFilteringError, NoListedFilesError, LengthUsedForFixedLengthHashError, OutputFileExistsError, StorageError) as e:
         sys.exit(str(e))
+    finally:
+        if storage is not None:
+            storage.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from sumbuddy.checksums import _iter_checksums
+from sumbuddy.hasher import Hasher
+from sumbuddy.throttle import ThrottledReader
+
+# Files hashed at once by default, each on its own worker thread (hashlib releases the GIL while hashing)
+DEFAULT_CONCURRENCY = os.cpu_count() or 1
+
+# Walk entries fetched per hop to the walk's thread, so the walk does not cost a thread hop per file
+_WALK_BATCH = 64
+
+_shared_executor = None
+_shared_executor_lock = threading.Lock()
+
+
+class _Cancelled(Exception):
+    """Raised in worker threads at their next read once the run they belong to is cancelled."""
+
+
+class _CancellableThrottle:
+    """
+    Throttle interface that raises _Cancelled once `cancelled` is set, charging the caller's Throttle (if any) otherwise.
+
+    Every read and file open of a run passes through its throttle, so a run cancelled from the
+    event loop stops at the next block in each of its threads, closing files and archives on the way out.
+    """
+
+    def __init__(self, throttle=None):
+        self.throttle = throttle
+        self.cancelled = threading.Event()
+
+    def _check(self):
+        if self.cancelled.is_set():
+            raise _Cancelled()
+
+    def consume(self, nbytes):
+        self._check()
+        if self.throttle:
+            self.throttle.consume(nbytes)
+
+    def open_file(self):
+        self._check()
+        if self.throttle:
+            self.throttle.open_file()
+
+    def wrap(self, file_obj):
+        return ThrottledReader(file_obj, self)
+
+
+def _get_shared_executor():
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            _shared_executor = ThreadPoolExecutor(max_workers=DEFAULT_CONCURRENCY, thread_name_prefix="sumbuddy-aio")
+    return _shared_executor
+
+
+async def _settle(futures):
+    """Wait for futures of worker threads that can no longer be interrupted, discarding their results and errors."""
+    futures = [future for future in futures if future is not None]
+    if futures:
+        await asyncio.wait(futures)
+        for future in futures:
+            if not future.cancelled():
+                future.exception()
+
+
+async def checksum_file(file_path_or_obj, algorithm="md5", length=None, throttle=None, executor=None):
+    """
+    Calculate the checksum of a file on a worker thread, without blocking the event loop.
+
+    Cancelling the awaiting task stops the read at its next block; the file is closed before the CancelledError propagates.
+
+    Parameters:
+    ------------
+    file_path_or_obj - String or file-like object. Path to the file, or a binary file-like object, to checksum.
+    algorithm - String. Algorithm to use for the checksum. Default: 'md5', see options with 'hashlib.algorithms_available'.
+    length - Integer [optional]. Length of the digest for SHAKE and BLAKE algorithms in bytes.
+    throttle - sumbuddy.throttle.Throttle [optional]. Byte-rate limit applied to the read. Default is None, i.e. unlimited.
+    executor - concurrent.futures.Executor [optional]. Runs the read and hashing, and so bounds how many files are hashed at once. Default: a pool of DEFAULT_CONCURRENCY threads shared by all calls.
+
+    Returns:
+    ---------
+    String. Hex digest of the file.
+
+    Raises:
+    -------
+    As Hasher.checksum_file, e.g. LengthUsedForFixedLengthHashError or FileNotFoundError.
+    """
+    control = _CancellableThrottle(throttle)
+    hasher = Hasher(algorithm, throttle=control)
+    future = asyncio.get_running_loop().run_in_executor(executor or _get_shared_executor(), partial(hasher.checksum_file, file_path_or_obj, algorithm=algorithm, length=length))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        control.cancelled.set()
+        await _settle([future])
+        raise
+
+
+def _records_step(records, limit):
+    """Take up to `limit` items from a generator of records (or of walk entries): ([items], whether it is exhausted)."""
+    taken = list(islice(records, limit))
+    return taken, len(taken) < limit
+
+
+async def iter_checksums(input_path, concurrency=None, throttle=None, **options):
+    """
+    Asynchronously yield a ChecksumRecord for every file, as sumbuddy.iter_checksums does, hashing up to `concurrency` files at once on worker threads.
+
+    Records are yielded as each file completes, so their order across files is not the walk order; an archive's
+    members still follow the archive's own record, as they are hashed. New files are only started while fewer
+    than `concurrency` are in progress, and finished records wait for the consumer, so a slow consumer holds the
+    walk and the reads back instead of buffering results. The walk itself runs on a worker thread too.
+
+    Leaving the `async for` early, cancelling the consuming task or an error stops the run: reads in progress
+    stop at their next block, and open files and archives are closed before the generator finishes closing.
+
+    Parameters:
+    ------------
+    input_path - String or list of Strings. As for sumbuddy.iter_checksums.
+    concurrency - Integer [optional]. Maximum number of files (or archives) hashed at once. Default: DEFAULT_CONCURRENCY, the CPU count.
+    throttle - sumbuddy.throttle.Throttle [optional]. Limits on bytes read and files opened per second, shared by all threads. Default is None, i.e. unlimited.
+    options - Any other sumbuddy.iter_checksums option, e.g. algorithm, ignore_file or workers. Not member_cache, which must be used from one thread.
+
+    Yields:
+    ---------
+    ChecksumRecord.
+
+    Raises:
+    -------
+    ValueError - For a concurrency below 1, with member_cache, or for any option iter_checksums rejects.
+    As sumbuddy.iter_checksums otherwise, e.g. EmptyInputDirectoryError.
+    """
+    if concurrency is None:
+        concurrency = DEFAULT_CONCURRENCY
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if options.get("member_cache") is not None:
+        raise ValueError("member_cache must be used from a single thread; it cannot be combined with sumbuddy.aio")
+
+    loop = asyncio.get_running_loop()
+    control = _CancellableThrottle(throttle)
+    # One thread per file being hashed, plus one for the walk
+    executor = ThreadPoolExecutor(max_workers=concurrency + 1, thread_name_prefix="sumbuddy-aio")
+    # Future of each step in progress -> the records generator it advances
+    running = {}
+    # Generators started and not yet exhausted, closed on the way out
+    open_generators = set()
+    entries = None
+    close_run = None
+    walk_future = None
+    waiting = deque()
+
+    def start(records, limit):
+        open_generators.add(records)
+        running[loop.run_in_executor(executor, _records_step, records, limit)] = (records, limit)
+
+    try:
+        if options.get("storage") is not None:
+            # Storage backends already read and hash objects concurrently; their records are streamed as one job
+            records = await loop.run_in_executor(executor, partial(_iter_checksums, input_path, throttle=control, **options))
+            start(records, 1)
+            walk_done = True
+        else:
+            entries, entry_records, close_run = await loop.run_in_executor(executor, partial(_iter_checksums, input_path, throttle=control, per_entry=True, **options))
+            walk_done = False
+
+        while True:
+            while waiting and len(running) < concurrency:
+                file_path, file_stat, is_archive = waiting.popleft()
+                # Archives stream their members one at a time; anything else yields at most two records in one step
+                start(entry_records(file_path, file_stat, is_archive), 1 if is_archive else 3)
+            if not walk_done and walk_future is None and len(waiting) < concurrency:
+                walk_future = loop.run_in_executor(executor, _records_step, entries, _WALK_BATCH)
+            if not running and walk_future is None:
+                break
+
+            done, _ = await asyncio.wait([*running, *([walk_future] if walk_future else [])], return_when=asyncio.FIRST_COMPLETED)
+            if walk_future in done:
+                batch, walk_done = walk_future.result()
+                walk_future = None
+                waiting.extend(batch)
+            for future in done:
+                if future not in running:
+                    continue
+                records, limit = running.pop(future)
+                taken, exhausted = future.result()
+                if exhausted:
+                    open_generators.discard(records)
+                else:
+                    start(records, limit)
+                for record in taken:
+                    yield record
+    finally:
+        control.cancelled.set()
+        await _settle([*running, walk_future])
+        # Closing a generator may wait for its archive's member threads, so it is done off the event loop
+        if hasattr(entries, "close"):
+            open_generators.add(entries)
+        for records in open_generators:
+            await _settle([loop.run_in_executor(executor, records.close)])
+        if close_run is not None:
+            await _settle([loop.run_in_executor(executor, close_run)])
+        executor.shutdown(wait=False)
@@ -1,4 +1,170 @@
-import zipfile
+import os
+
+# Members are handed to map_members' workers in batches of about this many compressed bytes (or _MEMBER_BATCH_COUNT members),
+# so a pool stays busy on archives of millions of tiny members without a task per member
+_MEMBER_BATCH_BYTES = 8 * 1024 * 1024
+_MEMBER_BATCH_COUNT = 512
+
+
+def _member_batches(infos):
+    """Split ZipInfo objects, in order, into runs of roughly equal compressed size."""
+    batch = []
+    batch_bytes = 0
+    for info in infos:
+        if info.is_dir():
+            continue
+        batch.append(info)
+        batch_bytes += info.compress_size
+        if batch_bytes >= _MEMBER_BATCH_BYTES or len(batch) >= _MEMBER_BATCH_COUNT:
+            yield batch
+            batch = []
+            batch_bytes = 0
+    if batch:
+        yield batch
+
+
+# ZIP end of central directory record: signature, fixed size, and how far from the end it can be (a comment is at most 64 KiB)
+_EOCD_SIGNATURE = b"PK\x05\x06"
+_EOCD_SIZE = 22
+_EOCD_MAX_OFFSET = _EOCD_SIZE + 0xFFFF
+# ZIP64 end of central directory locator and record, which precede the end record in archives over 4 GiB or 65535 entries
+_ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+_ZIP64_LOCATOR_SIZE = 20
+_ZIP64_RECORD_SIGNATURE = b"PK\x06\x06"
+_ZIP64_RECORD_SIZE = 56
+# How far before the locator a ZIP64 end record is searched for, to cover its extensible data and any prepended data
+_ZIP64_SEARCH_SIZE = 1024 * 1024
+
+
+# Raw bytes read per step, and the most decompressed bytes produced per step, when hashing a compressed file
+_DECOMPRESS_READ_SIZE = 64 * 1024
+_DECOMPRESS_BLOCK_SIZE = 1024 * 1024
+
+
+class _GzipDecompressor:
+    """zlib decompression of gzip data, with the decompress(data, max_length)/needs_input interface of bz2 and lzma."""
+
+    def __init__(self):
+        import zlib
+
+        self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._maybe_pending = False
+
+    @property
+    def eof(self):
+        return self._obj.eof
+
+    @property
+    def unused_data(self):
+        return self._obj.unused_data
+
+    @property
+    def needs_input(self):
+        # Output cut at max_length may leave more output buffered inside zlib
+        return not self._obj.unconsumed_tail and not self._maybe_pending
+
+    def decompress(self, data, max_length):
+        output = self._obj.decompress(self._obj.unconsumed_tail + data, max_length)
+        self._maybe_pending = len(output) == max_length
+        return output
+
+
+def _zstd_decompressor():
+    # compression.zstd is in the standard library from Python 3.14 on
+    from compression import zstd
+
+    return zstd.ZstdDecompressor()
+
+
+def _bz2_decompressor():
+    import bz2
+
+    return bz2.BZ2Decompressor()
+
+
+def _lzma_decompressor():
+    import lzma
+
+    return lzma.LZMADecompressor()
+
+
+# Single-file compression formats, by suffix, with a factory for a fresh decompressor per stream
+_COMPRESSED_FORMATS = {
+    ".gz": _GzipDecompressor,
+    ".bz2": _bz2_decompressor,
+    ".xz": _lzma_decompressor,
+    ".zst": _zstd_decompressor,
+}
+
+
+class DecompressingReader:
+    """
+    Read-only file-like object returning the decompressed bytes of a compressed file.
+
+    The compressed file is read once, in small pieces; each raw piece is also passed to
+    `raw_observer`, so the compressed bytes can be hashed in the same pass. Decompressed output
+    is produced in blocks of at most _DECOMPRESS_BLOCK_SIZE bytes, keeping memory bounded even
+    for highly compressed data. Concatenated streams (as written by `cat a.gz b.gz`) decompress
+    to the concatenation of their contents, as with the gzip, bz2 and lzma modules.
+    """
+
+    def __init__(self, path, raw_file, new_decompressor, raw_observer=None):
+        self.path = path
+        self.size = 0
+        self._raw_file = raw_file
+        self._new_decompressor = new_decompressor
+        self._decompressor = new_decompressor()
+        self._raw_observer = raw_observer
+        self._input = b""
+        self._pending = b""
+
+    def _read_raw(self):
+        data = self._raw_file.read(_DECOMPRESS_READ_SIZE)
+        if data and self._raw_observer:
+            self._raw_observer(data)
+        return data
+
+    def _next_block(self):
+        """Return the next decompressed block, or b'' once the whole file has been read."""
+        while True:
+            decompressor = self._decompressor
+            if decompressor.eof:
+                # Anything after the end of a stream must be another stream
+                self._input = decompressor.unused_data + self._input
+                if not self._input:
+                    self._input = self._read_raw()
+                    if not self._input:
+                        return b""
+                decompressor = self._decompressor = self._new_decompressor()
+            if decompressor.needs_input:
+                if not self._input:
+                    self._input = self._read_raw()
+                    if not self._input:
+                        raise EOFError("compressed file ended before the end-of-stream marker was reached")
+                data, self._input = self._input, b""
+            else:
+                data = b""
+            block = decompressor.decompress(data, _DECOMPRESS_BLOCK_SIZE)
+            if block:
+                self.size += len(block)
+                return block
+
+    def read(self, size=-1):
+        from sumbuddy.exceptions import DecompressionError
+
+        try:
+            if size is None or size < 0:
+                return self._pending + b"".join(iter(self._next_block, b""))
+            while len(self._pending) < size:
+                block = self._next_block()
+                if not block:
+                    break
+                self._pending += block
+        except Exception as e:
+            # zlib.error, lzma.LZMAError, OSError (bz2) and EOFError all mean a corrupt or truncated file
+            raise DecompressionError(self.path, e) from e
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
 
 
 class ArchiveHandler:
@@ -25,6 +191,8 @@ class ArchiveHandler:
         """
         lowered = path.lower()
         if lowered.endswith(self._ZIP_EXTENSIONS):
+            import zipfile
+
             return zipfile.is_zipfile(path)
         return False
 
@@ -40,11 +208,216 @@ class ArchiveHandler:
         ---------
         Tuples of (String, file-like object). The file-like object reads decompressed bytes.
         """
+        for member, _, file_obj in self.iter_member_entries(path):
+            yield member, file_obj
+
+    def iter_member_entries(self, path):
+        """
+        Like iter_members, but also report each member's uncompressed size.
+
+        Yields:
+        ---------
+        Tuples of (String, Integer, file-like object).
+        """
+        import zipfile
+
         with zipfile.ZipFile(path, "r") as zip_ref:
-            for member in zip_ref.namelist():
-                if member.endswith("/"):
+            for info in zip_ref.infolist():
+                if info.is_dir():
                     continue
-                yield member, zip_ref.open(member)
+                yield info.filename, info.file_size, zip_ref.open(info)
+
+    def map_members(self, path, func, workers=None, executor=None):
+        """
+        Apply `func` to every non-directory member of the archive using a pool of threads.
+
+        Members are grouped into batches of similar compressed size and spread over the workers;
+        each worker reads through its own handle on the archive, so members are decompressed and
+        hashed concurrently. Results are yielded in central-directory order, as iter_member_entries does.
+
+        Parameters:
+        ------------
+        path - String. Filesystem path to a supported archive.
+        func - Callable. Called with a file-like object reading one member's decompressed bytes; must be thread-safe.
+        workers - Integer [optional]. Number of threads. Default: CPU count.
+        executor - concurrent.futures.Executor [optional]. Runs the batches instead of a pool started for this archive, e.g. a long-lived pool of `workers` threads; it is left running. Default is None.
+
+        Yields:
+        ---------
+        Tuples of (String, Integer, result): member name, uncompressed size and the return value of func.
+        """
+        import threading
+        import zipfile
+        from collections import deque
+        from concurrent.futures import ThreadPoolExecutor, wait
+
+        workers = workers or os.cpu_count() or 1
+        handles = []
+        local = threading.local()
+
+        def run_batch(batch):
+            zip_ref = getattr(local, "zip_ref", None)
+            if zip_ref is None:
+                zip_ref = local.zip_ref = zipfile.ZipFile(path, "r")
+                handles.append(zip_ref)
+            results = []
+            for info in batch:
+                with zip_ref.open(info) as file_obj:
+                    results.append((info.filename, info.file_size, func(file_obj)))
+            return results
+
+        with zipfile.ZipFile(path, "r") as zip_ref:
+            infos = zip_ref.infolist()
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sumbuddy-archive")
+        window = deque()
+        try:
+            # A bounded window of batches in flight keeps results in order without holding them all
+            for batch in _member_batches(infos):
+                window.append(executor.submit(run_batch, batch))
+                if len(window) >= workers * 2:
+                    yield from window.popleft().result()
+            while window:
+                yield from window.popleft().result()
+        finally:
+            if own_executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+            else:
+                # A shared pool keeps running, so wait only for this archive's batches before closing their handles
+                for future in window:
+                    future.cancel()
+                wait(window)
+            for handle in handles:
+                handle.close()
+
+    def open_member(self, path, member):
+        """
+        Open a single archive member for reading.
+
+        Parameters:
+        ------------
+        path - String. Filesystem path to a supported archive.
+        member - String. Member name as yielded by iter_members.
+
+        Returns:
+        ---------
+        File-like object reading decompressed bytes; it stays usable after the archive itself is closed.
+        """
+        import zipfile
+
+        with zipfile.ZipFile(path, "r") as zip_ref:
+            return zip_ref.open(member)
+
+    def is_compressed_file(self, path):
+        """
+        Return True if `path` has the suffix of a supported single-file compression format.
+
+        gzip, bzip2 and xz are always supported; zstd requires Python 3.14 (compression.zstd).
+        """
+        suffix = os.path.splitext(path)[1].lower()
+        if suffix not in _COMPRESSED_FORMATS:
+            return False
+        if suffix == ".zst":
+            try:
+                _zstd_decompressor()
+            except ImportError:
+                return False
+        return True
+
+    def decompressed_name(self, path):
+        """Name of the decompressed content of a compressed file: its basename without the compression suffix."""
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def open_decompressed(self, path, raw_file, raw_observer=None):
+        """
+        Wrap an open compressed file in a DecompressingReader.
+
+        Parameters:
+        ------------
+        path - String. Filesystem path of the compressed file; its suffix selects the format.
+        raw_file - Binary file object positioned at the start of the compressed data.
+        raw_observer - Callable [optional]. Called with every block of compressed bytes as it is read.
+
+        Returns:
+        ---------
+        DecompressingReader. Its read() raises sumbuddy.exceptions.DecompressionError for corrupt or truncated data.
+        """
+        return DecompressingReader(path, raw_file, _COMPRESSED_FORMATS[os.path.splitext(path)[1].lower()], raw_observer)
+
+    def central_directory_digest(self, path):
+        """
+        Return a digest of a ZIP archive's central directory and end records, which list every member with its CRC-32 and sizes.
+
+        Only the end of the file is read, so this is cheap even for huge archives. Data prepended
+        to the archive (as in self-extractors) is not covered.
+
+        Parameters:
+        ------------
+        path - String. Filesystem path to a supported archive.
+
+        Returns:
+        ---------
+        String (hex BLAKE2b-128), or None if no valid end of central directory record is found.
+        """
+        import hashlib
+        import struct
+
+        with open(path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            tail_size = min(size, _EOCD_MAX_OFFSET)
+            f.seek(size - tail_size)
+            tail = f.read(tail_size)
+            position = tail.rfind(_EOCD_SIGNATURE)
+            if position < 0 or tail_size - position < _EOCD_SIZE:
+                return None
+            _, _, _, _, _, directory_size, _, _ = struct.unpack("<4s4H2LH", tail[position:position + _EOCD_SIZE])
+            end_offset = size - tail_size + position
+            locator = position - _ZIP64_LOCATOR_SIZE
+            if locator >= 0 and tail[locator:locator + 4] == _ZIP64_LOCATOR_SIGNATURE:
+                end_offset = self._zip64_record_offset(f, size - tail_size + locator, struct.unpack("<Q", tail[locator + 8:locator + 16])[0])
+                if end_offset is None:
+                    return None
+                f.seek(end_offset)
+                directory_size = struct.unpack("<Q", f.read(_ZIP64_RECORD_SIZE)[40:48])[0]
+            # Measured back from the end records rather than from the stored offset, which prepended data shifts
+            start = end_offset - directory_size
+            if start < 0:
+                return None
+            f.seek(start)
+            if directory_size and f.read(4) != b"PK\x01\x02":
+                return None
+            f.seek(start)
+            digest = hashlib.blake2b(digest_size=16)
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _zip64_record_offset(f, locator_offset, stored_offset):
+        """
+        Find the ZIP64 end of central directory record that ends at `locator_offset`, or return None.
+
+        The record may carry extensible data after its fixed 56 bytes, so its size is read from its
+        own size field. It is at `stored_offset` (from the locator) plus the length of any data
+        prepended to the archive, which is not known, so the last record in between that ends
+        exactly at the locator is taken.
+        """
+        import struct
+
+        if not 0 <= stored_offset <= locator_offset - _ZIP64_RECORD_SIZE:
+            return None
+        window_start = max(stored_offset, locator_offset - _ZIP64_SEARCH_SIZE)
+        f.seek(window_start)
+        window = f.read(locator_offset - window_start)
+        candidate = window.rfind(_ZIP64_RECORD_SIGNATURE)
+        while candidate >= 0:
+            if len(window) - candidate >= _ZIP64_RECORD_SIZE:
+                record_size = struct.unpack("<Q", window[candidate + 4:candidate + 12])[0]
+                if record_size >= _ZIP64_RECORD_SIZE - 12 and candidate + 12 + record_size == len(window):
+                    return window_start + candidate
+            candidate = window.rfind(_ZIP64_RECORD_SIGNATURE, 0, candidate)
+        return None
 
     def count_members(self, path):
         """
@@ -60,5 +433,7 @@ class ArchiveHandler:
         ---------
         Integer.
         """
+        import zipfile
+
         with zipfile.ZipFile(path) as zf:
             return sum(1 for n in zf.namelist() if not n.endswith("/"))
@@ -0,0 +1,181 @@
+import hashlib
+import os
+import tempfile
+import time
+from collections import namedtuple
+from functools import cache
+
+from sumbuddy.hasher import SHAKE_ALGORITHMS, Hasher
+
+# Pseudo-algorithm name resolved by resolve_algorithm to the fastest entry of SECURE_ALGORITHMS on this machine
+FASTEST_SECURE = "fastest-secure"
+
+# Collision-resistant algorithms eligible for 'fastest-secure'; md5, sha1 and other broken or short digests are left out
+SECURE_ALGORITHMS = (
+    "blake2b",
+    "blake2s",
+    "sha256",
+    "sha384",
+    "sha512",
+    "sha512_256",
+    "sha3_256",
+    "sha3_384",
+    "sha3_512",
+)
+
+DEFAULT_BUFFER_SIZES = (4 * 1024, 64 * 1024, 1024 * 1024)
+DEFAULT_DATA_SIZE = 64 * 1024 * 1024
+
+# Digest length used to benchmark SHAKE algorithms, which require one
+_SHAKE_BENCH_LENGTH = 32
+
+BenchResult = namedtuple("BenchResult", ["algorithm", "source", "buffer_size", "bytes_per_second", "secure"])
+BenchResult.__doc__ = """
+One throughput measurement.
+
+algorithm - String. hashlib algorithm name.
+source - String. 'memory' for bytes already in memory, 'disk' for a temporary file read with buffer_size reads.
+buffer_size - Integer. Bytes passed to each update() call (and each read, for 'disk').
+bytes_per_second - Float. Measured throughput.
+secure - Boolean. Whether the algorithm is eligible for 'fastest-secure'.
+"""
+
+
+def _new_hash(algorithm):
+    return Hasher(algorithm).new_hash(length=_SHAKE_BENCH_LENGTH if algorithm in SHAKE_ALGORITHMS else None)
+
+
+def _usable(algorithm):
+    # algorithms_available lists names OpenSSL may refuse at runtime (e.g. legacy digests under OpenSSL 3)
+    try:
+        _new_hash(algorithm)
+    except ValueError:
+        return False
+    return True
+
+
+def _timed(run, size, min_time):
+    """Repeat run() until min_time has elapsed; returns bytes per second, `size` bytes being hashed per run."""
+    total = 0
+    start = time.perf_counter()
+    while True:
+        run()
+        total += size
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return total / elapsed
+
+
+def measure_memory(algorithm, data, buffer_size, min_time=0.2):
+    """
+    Throughput of `algorithm` hashing `data` (bytes) in memory, `buffer_size` bytes per update.
+
+    Returns:
+    ---------
+    Float. Bytes per second.
+    """
+    view = memoryview(data)
+
+    def run():
+        hash_func = _new_hash(algorithm)
+        for offset in range(0, len(view), buffer_size):
+            hash_func.update(view[offset:offset + buffer_size])
+
+    return _timed(run, len(data), min_time)
+
+
+def measure_file(algorithm, file_path, buffer_size, min_time=0.2):
+    """
+    Throughput of `algorithm` reading and hashing a file with `buffer_size` reads, as checksum_file does.
+
+    Repeated reads are normally served from the page cache, so this measures the read path and
+    hashing, not the storage device.
+
+    Returns:
+    ---------
+    Float. Bytes per second.
+    """
+    size = os.path.getsize(file_path)
+
+    def run():
+        hash_func = _new_hash(algorithm)
+        with open(file_path, "rb", buffering=0) as f:
+            for chunk in iter(lambda: f.read(buffer_size), b""):
+                hash_func.update(chunk)
+
+    return _timed(run, size, min_time)
+
+
+def bench_algorithms(algorithms=None, buffer_sizes=DEFAULT_BUFFER_SIZES, data_size=DEFAULT_DATA_SIZE, on_disk=True, directory=None, min_time=0.2):
+    """
+    Measure the throughput of hash algorithms for each buffer size, on in-memory and on-disk data.
+
+    Parameters:
+    ------------
+    algorithms - Iterable of Strings [optional]. Algorithms to measure. Default: every usable name in 'hashlib.algorithms_available'.
+    buffer_sizes - Iterable of Integers [optional]. Bytes per update/read. Default: 4 KiB, 64 KiB and 1 MiB.
+    data_size - Integer [optional]. Bytes of random data hashed per run. Default: 64 MiB.
+    on_disk - Boolean [optional]. Whether to also measure reading the data back from a temporary file. Default is True.
+    directory - String [optional]. Directory for the temporary file, e.g. on the filesystem to be hashed. Default: the system temporary directory.
+    min_time - Float [optional]. Seconds spent on each measurement. Default: 0.2.
+
+    Returns:
+    ---------
+    List of BenchResult, fastest first.
+    """
+    if algorithms is None:
+        algorithms = sorted(hashlib.algorithms_available)
+    algorithms = [algorithm for algorithm in algorithms if _usable(algorithm)]
+    data = os.urandom(data_size)
+    results = []
+    for algorithm in algorithms:
+        for buffer_size in buffer_sizes:
+            speed = measure_memory(algorithm, data, buffer_size, min_time)
+            results.append(BenchResult(algorithm, "memory", buffer_size, speed, algorithm in SECURE_ALGORITHMS))
+
+    if on_disk:
+        with tempfile.NamedTemporaryFile(prefix="sumbuddy-bench-", dir=directory, delete=False) as f:
+            f.write(data)
+        try:
+            for algorithm in algorithms:
+                for buffer_size in buffer_sizes:
+                    speed = measure_file(algorithm, f.name, buffer_size, min_time)
+                    results.append(BenchResult(algorithm, "disk", buffer_size, speed, algorithm in SECURE_ALGORITHMS))
+        finally:
+            os.unlink(f.name)
+
+    results.sort(key=lambda result: result.bytes_per_second, reverse=True)
+    return results
+
+
+@cache
+def fastest_secure_algorithm():
+    """
+    Return the collision-resistant algorithm (see SECURE_ALGORITHMS) with the highest in-memory throughput on this machine.
+
+    A short probe (about 50 ms per algorithm) run once per process. The result can differ between
+    machines, or between OpenSSL builds, so record it next to the checksums it produced.
+    """
+    data = os.urandom(4 * 1024 * 1024)
+    candidates = [algorithm for algorithm in SECURE_ALGORITHMS if algorithm in hashlib.algorithms_available and _usable(algorithm)]
+    return max(candidates, key=lambda algorithm: measure_memory(algorithm, data, 64 * 1024, min_time=0.05))
+
+
+def resolve_algorithm(algorithm):
+    """Return `algorithm`, with FASTEST_SECURE replaced by fastest_secure_algorithm()."""
+    if algorithm == FASTEST_SECURE:
+        return fastest_secure_algorithm()
+    return algorithm
+
+
+def format_results(results):
+    """Render BenchResult rows as a ranked, aligned text table with throughput in MB/s."""
+    from sumbuddy.blocktree import format_block_size
+
+    header = ("rank", "algorithm", "data", "buffer", "MB/s", "secure")
+    rows = [
+        (str(rank), result.algorithm, result.source, format_block_size(result.buffer_size), f"{result.bytes_per_second / 1e6:.1f}", "yes" if result.secure else "no")
+        for rank, result in enumerate(results, 1)
+    ]
+    widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+    return "\n".join("  ".join(cell.rjust(width) if i in (0, 4) else cell.ljust(width) for i, (cell, width) in enumerate(zip(row, widths))).rstrip() for row in [header, *rows])
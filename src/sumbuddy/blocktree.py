@@ -0,0 +1,301 @@
+import csv
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from sumbuddy.hasher import Hasher
+
+DEFAULT_BLOCK_SIZE = 64 * 1024 * 1024
+
+# Domain separation keeps a leaf from ever being mistaken for an interior node (as in RFC 6962)
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+def _pread_fully(fd, length, offset):
+    """Read `length` bytes at `offset`; one pread may return fewer (at most about 2 GiB on Linux, less on network filesystems)."""
+    data = os.pread(fd, length, offset)
+    if len(data) == length:
+        return data
+    parts = [data]
+    done = len(data)
+    while done < length:
+        data = os.pread(fd, length - done, offset + done)
+        if not data:
+            raise EOFError(f"File ended at byte {offset + done} instead of {offset + length}; it was truncated while being hashed")
+        parts.append(data)
+        done += len(data)
+    return b"".join(parts)
+
+
+def format_block_size(block_size):
+    """Render a block size compactly for labels, e.g. 67108864 -> '64MiB'."""
+    for unit, factor in (("GiB", 1 << 30), ("MiB", 1 << 20), ("KiB", 1 << 10)):
+        if block_size % factor == 0:
+            return f"{block_size // factor}{unit}"
+    return f"{block_size}B"
+
+
+def parse_block_size(text):
+    """Parse '4M', '64MiB', '1G' or a plain byte count into bytes."""
+    text = text.strip()
+    number = text.rstrip("BbIiKkMmGg")
+    suffix = text[len(number):].upper().rstrip("B").rstrip("I")
+    factors = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    if not number.isdigit() or suffix not in factors or int(number) == 0:
+        raise ValueError(f"Invalid block size '{text}'; use a positive byte count optionally followed by K, M or G")
+    return int(number) * factors[suffix]
+
+
+def block_tree_label(algorithm, block_size):
+    """
+    Column label for block-tree digests, e.g. 'tree-sha256-64MiB'.
+
+    The prefix and block size make it explicit that these values are not plain
+    file digests: a tree root never equals the file's ordinary sha256.
+    """
+    return f"tree-{algorithm}-{format_block_size(block_size)}"
+
+
+class BlockTree:
+    """
+    Result of block-tree hashing: the per-block digests and the root that combines them.
+    """
+
+    def __init__(self, algorithm, block_size, size, block_digests, root, length=None):
+        self.algorithm = algorithm
+        self.block_size = block_size
+        self.length = length
+        self.size = size
+        self.block_digests = block_digests
+        self.root = root
+
+    @property
+    def label(self):
+        return block_tree_label(self.algorithm, self.block_size)
+
+    def block_range(self, index):
+        """Return (offset, length) of block `index` within the file."""
+        offset = index * self.block_size
+        return offset, max(0, min(self.block_size, self.size - offset))
+
+
+class BlockTreeHasher:
+    """
+    Hash a file as a binary tree over fixed-size blocks.
+
+    Blocks are read with os.pread by a pool of threads and hashed concurrently (hashlib
+    releases the GIL for large buffers), so one huge file can use every core. Leaves are
+    H(0x00 || block), interior nodes H(0x01 || left || right), with an odd node carried up
+    unchanged; the root is a different value from the plain digest of the same file.
+
+    The thread pool is created once and shared by every file (files of one block are read
+    inline, without it); close() it, or use the hasher as a context manager, when done.
+    """
+
+    def __init__(self, algorithm="sha256", block_size=DEFAULT_BLOCK_SIZE, length=None, workers=None, throttle=None):
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+        self.algorithm = algorithm
+        self.block_size = block_size
+        self.length = length
+        self.workers = workers or os.cpu_count() or 1
+        # Optional sumbuddy.throttle.Throttle charged for every block read
+        self.throttle = throttle
+        self._hasher = Hasher(algorithm)
+        # Fail early on an unusable algorithm/length combination
+        self._hasher.new_hash(algorithm, length)
+        # Block-reading pool shared by every file of the run, created on the first file with several blocks
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def label(self):
+        return block_tree_label(self.algorithm, self.block_size)
+
+    def _digest(self, *parts):
+        hash_func = self._hasher.new_hash(self.algorithm, self.length)
+        for part in parts:
+            hash_func.update(part)
+        return bytes.fromhex(self._hasher.hexdigest(hash_func, self.length))
+
+    def _leaf(self, data):
+        return self._digest(_LEAF_PREFIX, data)
+
+    def combine(self, block_digests):
+        """Fold leaf digests into the root digest (hex)."""
+        level = list(block_digests)
+        while len(level) > 1:
+            paired = [self._digest(_NODE_PREFIX, level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                paired.append(level[-1])
+            level = paired
+        return level[0].hex()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sumbuddy-blocks")
+        return self._executor
+
+    def _hash_blocks(self, fd, size, indices):
+        """Yield (index, leaf digest) for the given blocks of a file of `size` bytes, reading them concurrently with a bounded window."""
+        def hash_block(index):
+            offset = index * self.block_size
+            # Reading no more than the file holds, so a small file does not allocate a whole block
+            data = _pread_fully(fd, max(0, min(self.block_size, size - offset)), offset)
+            if self.throttle:
+                self.throttle.consume(len(data))
+            return index, self._leaf(data)
+
+        if len(indices) == 1:
+            # A single block (most small files) is read inline: a thread hop would cost more than the read
+            yield hash_block(indices[0])
+            return
+        executor = self._get_executor()
+        window = deque()
+        try:
+            for index in indices:
+                window.append(executor.submit(hash_block, index))
+                # Bound memory to a few blocks per worker
+                if len(window) >= self.workers * 2:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+        finally:
+            # Abandoned early (an error or a closed generator): blocks not yet started are not read
+            for future in window:
+                future.cancel()
+
+    def close(self):
+        """Shut down the block-reading threads; the hasher can still be used, and starts new ones if needed."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def hash_file(self, path):
+        """
+        Block-tree hash a file on disk.
+
+        Parameters:
+        ------------
+        path - String. Filesystem path of the file.
+
+        Returns:
+        ---------
+        BlockTree.
+        """
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            size = os.fstat(fd).st_size
+            block_count = max(1, -(-size // self.block_size))
+            block_digests = [digest for _, digest in self._hash_blocks(fd, size, range(block_count))]
+        finally:
+            os.close(fd)
+        return BlockTree(self.algorithm, self.block_size, size, block_digests, self.combine(block_digests), self.length)
+
+    def hash_stream(self, file_obj):
+        """
+        Block-tree hash a sequential stream (e.g. an archive member); same result as hash_file on the same bytes.
+        """
+        if self.throttle:
+            file_obj = self.throttle.wrap(file_obj)
+        block_digests = []
+        size = 0
+        while True:
+            data = file_obj.read(self.block_size)
+            if not data and block_digests:
+                break
+            size += len(data)
+            block_digests.append(self._leaf(data))
+            if len(data) < self.block_size:
+                break
+        return BlockTree(self.algorithm, self.block_size, size, block_digests, self.combine(block_digests), self.length)
+
+    def verify(self, path, tree, blocks=None):
+        """
+        Re-read blocks of `path` and compare them with a stored BlockTree.
+
+        Parameters:
+        ------------
+        path - String. File to check.
+        tree - BlockTree. Previously computed tree for the file.
+        blocks - Iterable of Integers [optional]. Block indices to check; defaults to all blocks.
+
+        Returns:
+        ---------
+        List of Integers. Indices of blocks that differ (sorted). If the file size changed, every block from the first affected one onward is reported.
+
+        Raises:
+        -------
+        ValueError - If the tree was built with another algorithm, block size or length, or for block indices outside the tree.
+        """
+        if (tree.algorithm, tree.block_size, tree.length) != (self.algorithm, self.block_size, self.length):
+            raise ValueError(f"Tree was built as {tree.label}, but this hasher computes {self.label}")
+        indices = range(len(tree.block_digests)) if blocks is None else sorted(set(blocks))
+        invalid = [index for index in indices if not 0 <= index < len(tree.block_digests)]
+        if invalid:
+            raise ValueError(f"Block indices {invalid} are outside the stored tree, which has {len(tree.block_digests)} blocks")
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            size = os.fstat(fd).st_size
+            mismatched = [index for index, digest in self._hash_blocks(fd, size, indices) if digest != tree.block_digests[index]]
+        finally:
+            os.close(fd)
+        if size != tree.size:
+            first_affected = min(size, tree.size) // self.block_size
+            mismatched = sorted(set(mismatched) | {index for index in indices if index >= first_affected})
+        return mismatched
+
+
+class BlockIndexWriter:
+    """
+    Write per-block digests as CSV rows (filepath, block, offset, length, leaf digest) for later verification.
+    """
+
+    def __init__(self, output_stream, label):
+        self._writer = csv.writer(output_stream)
+        self._writer.writerow(["filepath", "block", "offset", "length", f"{label}-leaf"])
+
+    def write(self, filepath, tree):
+        for index, digest in enumerate(tree.block_digests):
+            offset, length = tree.block_range(index)
+            self._writer.writerow([filepath, index, offset, length, digest.hex()])
+
+
+def load_block_index(csv_path, length=None):
+    """
+    Read a block index written by BlockIndexWriter.
+
+    Returns:
+    ---------
+    Dict mapping filepath to a BlockTree whose root is recomputed from the stored leaves.
+    """
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return {}
+        # Label is tree-<algorithm>-<block size>-leaf; the algorithm itself may contain '-' (e.g. md5-sha1)
+        algorithm, block_size_text, _ = header[4][len("tree-"):].rsplit("-", 2)
+        block_size = parse_block_size(block_size_text)
+        blocks = {}
+        for filepath, _index, offset, block_length, digest in reader:
+            blocks.setdefault(filepath, []).append((int(offset), int(block_length), bytes.fromhex(digest)))
+
+    hasher = BlockTreeHasher(algorithm, block_size, length=length, workers=1)
+    trees = {}
+    for filepath, entries in blocks.items():
+        size = entries[-1][0] + entries[-1][1]
+        digests = [digest for _, _, digest in entries]
+        trees[filepath] = BlockTree(algorithm, block_size, size, digests, hasher.combine(digests), length)
+    return trees
@@ -0,0 +1,171 @@
+import errno
+import os
+import string
+import threading
+from collections import OrderedDict
+from functools import cache
+
+from sumbuddy.hasher import SHAKE_ALGORITHMS, Hasher
+
+
+class HashCache:
+    """
+    In-memory cache of file digests, validated against the file's stat data.
+
+    An entry is reused only while the file's device, inode, size, mtime and ctime are
+    unchanged, so edits (including in-place rewrites and replacements) invalidate it.
+    Safe to share between threads.
+    """
+
+    def __init__(self, max_entries=1_000_000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _signature(stat_result):
+        return (stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ctime_ns)
+
+    def get(self, path, algorithm, length=None, stat_result=None):
+        """
+        Return the cached digest for `path`, or None when absent or stale.
+
+        Parameters:
+        ------------
+        path - String. Filesystem path of the file.
+        algorithm - String. Hash algorithm the digest was computed with.
+        length - Integer [optional]. Digest length for SHAKE/BLAKE algorithms.
+        stat_result - os.stat_result [optional]. Current stat of the file; taken when not given.
+
+        Returns:
+        ---------
+        String or None.
+        """
+        if stat_result is None:
+            stat_result = os.stat(path)
+        key = (os.path.abspath(path), algorithm, length)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == self._signature(stat_result):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, path, algorithm, length, stat_result, digest):
+        """
+        Store `digest` for `path` as of `stat_result`, evicting the least recently used entry when full.
+
+        The stat must be taken before the file is read, so a write racing with hashing leaves a stale signature rather than a wrong digest.
+        """
+        key = (os.path.abspath(path), algorithm, length)
+        with self._lock:
+            self._entries[key] = (self._signature(stat_result), digest)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Prefix of the extended attributes written by XattrCache; the 'user.' namespace is writable by the file's owner
+XATTR_PREFIX = "user.sumbuddy."
+
+_HEX_DIGITS = frozenset(string.hexdigits.lower())
+
+
+@cache
+def _hex_digest_length(algorithm, length):
+    """Number of hex characters in an `algorithm` digest of `length` bytes (None for the algorithm's default)."""
+    if algorithm in SHAKE_ALGORITHMS:
+        return 2 * length
+    return len(Hasher().new_hash(algorithm, length).hexdigest())
+
+
+class XattrCache:
+    """
+    Digests stored on the files themselves, in `user.sumbuddy.<algorithm>` extended attributes.
+
+    Each attribute holds the digest with the file's size and mtime_ns when it was read, and is
+    trusted only while both still match, so the digest travels with the data (e.g. `rsync -X`,
+    `cp --preserve=xattr`) and survives across hosts and runs. Writing an attribute changes the
+    ctime but not the mtime, which is why the ctime is not part of the check. Filesystems or
+    platforms without extended attributes, and files that cannot be written, are silently
+    skipped: the file is simply hashed. Safe to share between threads.
+    """
+
+    def __init__(self):
+        self.supported = hasattr(os, "setxattr")
+        # Devices found not to support user extended attributes, so they are not probed for every file
+        self._unsupported_devices = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def attribute_name(algorithm, length=None):
+        """Name of the attribute holding `algorithm` digests, e.g. 'user.sumbuddy.sha256' or 'user.sumbuddy.shake_128-32'."""
+        return f"{XATTR_PREFIX}{algorithm}" + (f"-{length}" if length else "")
+
+    def _skip(self, stat_result, error):
+        if error.errno in (errno.ENOTSUP, errno.EOPNOTSUPP):
+            with self._lock:
+                self._unsupported_devices.add(stat_result.st_dev)
+
+    def get(self, path, algorithm, length=None, stat_result=None):
+        """
+        Return the digest stored on `path`, or None when absent, stale or unreadable.
+
+        Parameters:
+        ------------
+        path - String. Filesystem path of the file.
+        algorithm - String. Hash algorithm the digest was computed with.
+        length - Integer [optional]. Digest length for SHAKE/BLAKE algorithms.
+        stat_result - os.stat_result [optional]. Current stat of the file; taken when not given.
+
+        Returns:
+        ---------
+        String or None.
+        """
+        if not self.supported:
+            return None
+        if stat_result is None:
+            stat_result = os.stat(path)
+        if stat_result.st_dev in self._unsupported_devices:
+            return None
+        try:
+            size, mtime_ns, digest = os.getxattr(path, self.attribute_name(algorithm, length)).decode("ascii").split()
+            stored_stat = (int(size), int(mtime_ns))
+        except OSError as e:
+            self._skip(stat_result, e)
+            digest = None
+        except ValueError:
+            # Not written by this class (values travel between hosts, so they are untrusted); it is overwritten with a valid value on put()
+            digest = None
+        else:
+            if stored_stat != (stat_result.st_size, stat_result.st_mtime_ns) or len(digest) != _hex_digest_length(algorithm, length) or not _HEX_DIGITS.issuperset(digest):
+                digest = None
+        with self._lock:
+            if digest is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return digest
+
+    def put(self, path, algorithm, length, stat_result, digest):
+        """
+        Store `digest` on `path` as of `stat_result`; failures (read-only files or filesystems, no xattr support) are ignored.
+
+        The stat must be taken before the file is read, so a write racing with hashing leaves a stale value rather than a wrong digest.
+        """
+        if not self.supported or stat_result.st_dev in self._unsupported_devices:
+            return
+        value = f"{stat_result.st_size} {stat_result.st_mtime_ns} {digest}".encode("ascii")
+        try:
+            os.setxattr(path, self.attribute_name(algorithm, length), value)
+        except OSError as e:
+            self._skip(stat_result, e)
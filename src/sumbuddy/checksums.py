@@ -0,0 +1,446 @@
+import csv
+import os
+import sys
+import threading
+from collections import Counter, OrderedDict, namedtuple
+from itertools import chain
+
+from sumbuddy.archive import ArchiveHandler
+from sumbuddy.exceptions import DecompressionError
+from sumbuddy.hasher import Hasher, fingerprint_label
+from sumbuddy.mapper import Mapper
+
+# Hardlinked files whose results are kept for links not seen yet; beyond this, the oldest are read again when reached
+_MAX_LINKED_FILES = 65_536
+
+ChecksumRecord = namedtuple(
+    "ChecksumRecord",
+    ["path", "name", "size", "algorithm", "digest", "archive", "file_id"],
+    defaults=(None, None),
+)
+ChecksumRecord.__doc__ = """
+One hashed file or archive member.
+
+path - String. Filepath; for archive members, '<archive path>/<member name>'.
+name - String. Basename of the file or member.
+size - Integer. Size in bytes (uncompressed size for archive members).
+algorithm - String. Checksum label, e.g. 'md5' or 'tree-sha256-64MiB'.
+digest - String. Hex digest.
+archive - String or None. For archive members, the path of the containing archive.
+file_id - Tuple or None. (st_dev, st_ino) of the file on disk; None for archive members.
+"""
+
+
+def iter_checksums(input_path, ignore_file=None, include_hidden=False, algorithm="md5", length=None, archive_dive=True, follow_symlinks=False, block_size=None, workers=None, exclude=None, local_ignores=True, fingerprint_size=None, walk_threads=None, pipelined=False, decompress=False, throttle=None, files_from=None, xattrs=False, storage=None, member_cache=None):
+    """
+    Lazily yield a ChecksumRecord for every file in the input directories (or single input files), or for every listed file, with the same filtering and archive-dive rules as get_checksums.
+
+    The directory is walked as records are consumed, so memory stays constant however many files there are.
+    Several input paths are walked in turn, as one tree. Regular files are yielded in walk order, followed by each archive and its members (as in the CSV).
+    Hardlinked files are read once, and the digest is reused for every path that links to them.
+
+    Parameters:
+    ------------
+    input_path - String or list of Strings. File(s) or directories to traverse for files; they must not overlap. With files_from, at most one directory, which the listed paths are relative to (or None).
+    ignore_file - String [optional]. Filepath for the ignore patterns file.
+    include_hidden - Boolean [optional]. Whether to include hidden files. Default is False.
+    algorithm - String. Algorithm to use for checksums. Default: 'md5', see options with 'hashlib.algorithms_available'. 'fastest-secure' resolves to the fastest collision-resistant algorithm on this machine, which records carry as their algorithm.
+    length - Integer [conditionally optional]. Length of the digest for SHAKE (required) and BLAKE (optional) algorithms in bytes.
+    archive_dive - Boolean [optional]. Whether to descend into archive files and hash their members. Default: True.
+    follow_symlinks - Boolean [optional]. Whether to descend into symlinked directories (loops are skipped). Default is False.
+    block_size - Integer [optional]. When given, digests are block-tree roots over blocks of this many bytes (see sumbuddy.blocktree). Default is None.
+    workers - Integer [optional]. Number of threads hashing the members of one archive, or the blocks of one file in block-tree mode. Default: CPU count.
+    exclude - Iterable of Strings [optional]. Files to leave out, e.g. the output file being written inside the input directory.
+    local_ignores - Boolean [optional]. Whether to apply `.sumbuddyignore` files found in the walked directories, layered as in git. Default is True.
+    fingerprint_size - Integer [optional]. When given, digests are quick fingerprints of the size plus three samples of this many bytes (see Hasher.fingerprint_file), labeled e.g. 'fp-md5-1MiB'. Default is None.
+    walk_threads - Integer [optional]. Number of threads listing directories ahead of the walk, for high-latency filesystems; files are then visited in sorted order within each directory (see Mapper). Default is None, i.e. single-threaded.
+    pipelined - Boolean [optional]. Whether to overlap reading and hashing of each file with a background I/O thread (see Hasher.checksum_file). Applies to plain checksums. Default is False.
+    decompress - Boolean [optional]. Whether to also hash the decompressed content of .gz, .bz2, .xz (and, on Python 3.14+, .zst) files, in the same read as the file itself. Each such file is followed by a record for '<file path>/<name without suffix>' with the file as its archive. Plain checksums only. Default is False.
+    throttle - sumbuddy.throttle.Throttle [optional]. Limits on bytes read and files opened per second, shared by all threads (and by any other run given the same Throttle). Default is None, i.e. unlimited.
+    files_from - Iterable of Strings [optional]. Hash exactly these files instead of walking input_path, e.g. sumbuddy.mapper.iter_file_list over `find -print0` output. Ignore patterns and archive dive still apply; listed directories and missing files are skipped with a warning. Default is None.
+    xattrs - Boolean [optional]. Whether to reuse digests stored in `user.sumbuddy.<algorithm>` extended attributes while the file's size and mtime match, skipping the read, and to store fresh digests there (see sumbuddy.cache.XattrCache). Plain checksums of files on disk only. Default is False.
+    storage - sumbuddy.storage.StorageBackend [optional]. Read from this backend instead of the local walk, e.g. sumbuddy.storage.S3Storage; input_path is then a key prefix (or list of them) and paths are the backend's URLs. Objects are read with concurrent ranged reads and hashed concurrently (see StorageBackend.map_objects). Plain checksums with ignore patterns only. Default is None, i.e. the local filesystem.
+    member_cache - sumbuddy.membercache.MemberCache [optional]. Cache of archive member digests: members of an archive found unchanged are yielded from it without being read, and newly hashed archives are added. Not with chunk analysis or a block index, which need the member bytes. Default is None.
+
+    Returns:
+    ---------
+    Iterator of ChecksumRecord.
+
+    Raises:
+    -------
+    ValueError - Immediately, for an unavailable algorithm, if both block_size and fingerprint_size are given, if decompress is combined with either, or for overlapping input paths.
+    LengthUsedForFixedLengthHashError - Immediately, if length is given for a fixed-length algorithm.
+    NotADirectoryError - Immediately, if an input path is neither a file nor a directory (with files_from: not a directory).
+    EmptyInputDirectoryError, NoFilesAfterFilteringError, NoListedFilesError - While iterating, once a walk (or the file list) yields nothing to hash.
+    """
+    return _iter_checksums(
+        input_path,
+        ignore_file=ignore_file,
+        include_hidden=include_hidden,
+        algorithm=algorithm,
+        length=length,
+        archive_dive=archive_dive,
+        follow_symlinks=follow_symlinks,
+        block_size=block_size,
+        workers=workers,
+        exclude=exclude,
+        local_ignores=local_ignores,
+        fingerprint_size=fingerprint_size,
+        walk_threads=walk_threads,
+        pipelined=pipelined,
+        decompress=decompress,
+        throttle=throttle,
+        files_from=files_from,
+        xattrs=xattrs,
+        storage=storage,
+        member_cache=member_cache,
+    )
+
+
+def _input_paths(input_path):
+    """The input paths of a run as a list: input_path may be a single path, a list of them, or None (with a file list)."""
+    if input_path is None:
+        return []
+    if isinstance(input_path, (str, os.PathLike)):
+        return [input_path]
+    return list(input_path)
+
+
+def _iter_entries(input_paths, files_from=None, ignore_file=None, include_hidden=False, archive_dive=True, follow_symlinks=False, exclude=None, local_ignores=True, walk_threads=None):
+    """
+    The (file_path, stat_result or None, is_archive) entries to hash: the listed files, or the walks of every input path in turn.
+
+    Every input path is checked before any walk starts, so bad paths fail immediately.
+    """
+    mapper_options = {"follow_symlinks": follow_symlinks, "exclude": exclude, "local_ignores": local_ignores, "walk_threads": walk_threads}
+    filter_options = {"ignore_file": ignore_file, "include_hidden": include_hidden, "archive_dive": archive_dive}
+    if files_from is not None:
+        if len(input_paths) > 1:
+            raise ValueError("A file list is relative to at most one input directory")
+        root = input_paths[0] if input_paths else None
+        return Mapper(**mapper_options).iter_listed_paths(files_from, root=root, **filter_options)
+
+    if not input_paths:
+        raise ValueError("No input path given")
+    absolute_paths = [os.path.abspath(path) for path in input_paths]
+    for i, parent in enumerate(absolute_paths):
+        for child in absolute_paths[i + 1:]:
+            if os.path.commonpath([parent, child]) in (parent, child):
+                raise ValueError(f"Input paths overlap: {parent} and {child}")
+
+    walks = []
+    for path in input_paths:
+        if os.path.isfile(path):
+            walks.append([(os.path.normpath(path), None, False)])
+        else:
+            walks.append(Mapper(**mapper_options).iter_file_paths(path, **filter_options))
+    return chain.from_iterable(walks)
+
+
+def _iter_checksums(input_path, ignore_file=None, include_hidden=False, algorithm="md5", length=None, archive_dive=True, follow_symlinks=False, block_size=None, workers=None, exclude=None, local_ignores=True, fingerprint_size=None, walk_threads=None, pipelined=False, decompress=False, throttle=None, files_from=None, xattrs=False, storage=None, member_cache=None, block_index=None, chunk_analyzer=None, cache=None, executor=None, per_entry=False):
+    """
+    iter_checksums, plus hooks for get_checksums: `block_index`, a BlockIndexWriter that receives the tree of every path in block-tree mode,
+    and `chunk_analyzer`, a sumbuddy.chunking.ChunkAnalyzer fed with the bytes of every file as it is hashed.
+    For sumbuddy.server: `cache`, a sumbuddy.cache.HashCache of plain digests consulted before and filled after hashing each file on disk,
+    and `executor`, a long-lived pool (of `workers` threads) that hashes archive members instead of a pool started per archive.
+
+    With `per_entry` (for sumbuddy.aio, local walks only), return (entries, entry_records, close) instead: the walk's (path, stat, is_archive) entries,
+    a function yielding the records of one entry, which may run in several threads at once when there is no block_index, chunk_analyzer or member_cache,
+    and a function releasing the run's thread pools once every entry is done.
+    """
+    if algorithm == "fastest-secure":
+        from sumbuddy.bench import resolve_algorithm
+
+        algorithm = resolve_algorithm(algorithm)
+    hasher = Hasher(algorithm, throttle=throttle, xattrs=xattrs)
+    archive_handler = ArchiveHandler()
+    tree_hasher = None
+    label = algorithm
+    if block_size and fingerprint_size:
+        raise ValueError("block_size and fingerprint_size cannot be combined")
+    if chunk_analyzer and (block_size or fingerprint_size):
+        raise ValueError("Chunk analysis needs full sequential reads; it cannot be combined with block_size or fingerprint_size")
+    if decompress and (block_size or fingerprint_size or chunk_analyzer):
+        raise ValueError("decompress applies to plain checksums; it cannot be combined with block_size, fingerprint_size or chunk analysis")
+    if xattrs and (block_size or fingerprint_size or chunk_analyzer):
+        raise ValueError("xattrs applies to plain checksums; it cannot be combined with block_size, fingerprint_size or chunk analysis")
+    if storage is not None and (block_size or fingerprint_size or chunk_analyzer or decompress or xattrs or files_from is not None or member_cache is not None):
+        raise ValueError("Storage backends support plain checksums of key prefixes; block_size, fingerprint_size, chunk analysis, decompress, xattrs, files_from and member_cache need the local filesystem")
+    if cache is not None and (block_size or fingerprint_size or chunk_analyzer):
+        raise ValueError("cache applies to plain checksums; it cannot be combined with block_size, fingerprint_size or chunk analysis")
+    if member_cache is not None and (chunk_analyzer or block_index):
+        raise ValueError("member_cache cannot be combined with chunk analysis or a block index, which need every member's bytes")
+    if member_cache is not None and member_cache.strict and fingerprint_size:
+        raise ValueError("A strict member_cache keys on the full archive digest, which fingerprint mode does not compute")
+    if block_size:
+        from sumbuddy.blocktree import BlockTreeHasher
+
+        tree_hasher = BlockTreeHasher(algorithm, block_size, length=length, workers=workers, throttle=throttle)
+        label = tree_hasher.label
+    else:
+        # Fail before walking on an unusable algorithm/length combination
+        hasher.new_hash(algorithm, length)
+        if fingerprint_size:
+            label = fingerprint_label(algorithm, fingerprint_size)
+
+    # Member digests depend on the label, and for SHAKE and BLAKE on the digest length too
+    cache_label = f"{label}:{length}" if length else label
+
+    if storage is not None:
+        return _iter_storage_records(storage, _input_paths(input_path) or [""], hasher, algorithm, length, ignore_file, include_hidden, pipelined, throttle)
+
+    entries = _iter_entries(
+        _input_paths(input_path),
+        files_from=files_from,
+        ignore_file=ignore_file,
+        include_hidden=include_hidden,
+        archive_dive=archive_dive,
+        follow_symlinks=follow_symlinks,
+        exclude=exclude,
+        local_ignores=local_ignores,
+        walk_threads=walk_threads,
+    )
+
+    def compute(path_or_obj, path, archive=None, size=None):
+        if throttle:
+            throttle.open_file()
+        if chunk_analyzer:
+            chunk_analyzer.start_file(path, archive)
+            digest = hasher.checksum_file(path_or_obj, algorithm=algorithm, length=length, observer=chunk_analyzer.update, pipelined=pipelined)
+            chunk_analyzer.finish_file()
+            return digest
+        if fingerprint_size:
+            return hasher.fingerprint_file(path_or_obj, algorithm=algorithm, length=length, sample_size=fingerprint_size)
+        if tree_hasher is None:
+            return hasher.checksum_file(path_or_obj, algorithm=algorithm, length=length, pipelined=pipelined, size=size)
+        return tree_hasher.hash_file(path_or_obj) if isinstance(path_or_obj, str) else tree_hasher.hash_stream(path_or_obj)
+
+    def emit(path, result):
+        if tree_hasher is None:
+            return result
+        if block_index:
+            block_index.write(path, result)
+        return result.root
+
+    # Results for files with several hardlinks, kept until their last link has been seen or dropped beyond _MAX_LINKED_FILES,
+    # as links outside the walk (other trees, ignored or hidden paths) are never seen
+    linked = OrderedDict()
+    linked_lock = threading.Lock()
+
+    def once(file_stat, kind, compute_fn):
+        """Compute a result per physical file, reusing it for the other hardlinks of that file (which per_entry callers may reach concurrently)."""
+        if file_stat.st_nlink < 2:
+            return compute_fn()
+        # Imported here, so that runs without hardlinks do not pay for concurrent.futures at startup
+        from concurrent.futures import Future
+
+        key = (kind, file_stat.st_dev, file_stat.st_ino)
+        with linked_lock:
+            entry = linked.get(key)
+            first = entry is None
+            if first:
+                entry = linked[key] = [Future(), file_stat.st_nlink]
+                if len(linked) > _MAX_LINKED_FILES:
+                    # A later link of a dropped file is read again, with the same result
+                    linked.popitem(last=False)
+            entry[1] -= 1
+            if entry[1] == 0:
+                del linked[key]
+        if first:
+            try:
+                entry[0].set_result(compute_fn())
+            except BaseException as e:
+                entry[0].set_exception(e)
+                raise
+        return entry[0].result()
+
+    def file_result(file_path, file_stat):
+        if cache is None:
+            return compute(file_path, file_path, size=file_stat.st_size)
+        digest = cache.get(file_path, label, length, file_stat)
+        if digest is None:
+            digest = compute(file_path, file_path, size=file_stat.st_size)
+            cache.put(file_path, label, length, file_stat, digest)
+        return digest
+
+    def file_record(file_path, file_stat):
+        result = once(file_stat, "file", lambda: file_result(file_path, file_stat))
+        file_id = (file_stat.st_dev, file_stat.st_ino)
+        return ChecksumRecord(file_path, os.path.basename(file_path), file_stat.st_size, label, emit(file_path, result), None, file_id)
+
+    def decompressed_result(file_path):
+        """Hash a compressed file and its decompressed content in one read: (raw digest, decompressed size and digest or None)."""
+        raw_hash = hasher.new_hash(algorithm, length)
+        if throttle:
+            throttle.open_file()
+        try:
+            with open(file_path, "rb") as raw_file:
+                reader = archive_handler.open_decompressed(file_path, throttle.wrap(raw_file) if throttle else raw_file, raw_hash.update)
+                digest = hasher.checksum_file(reader, algorithm=algorithm, length=length)
+        except DecompressionError as e:
+            print(f"Warning: {e}; hashing it as a regular file", file=sys.stderr)
+            return compute(file_path, file_path), None
+        return hasher.hexdigest(raw_hash, length), (reader.size, digest)
+
+    def compressed_records(file_path, file_stat):
+        raw_digest, decompressed = once(file_stat, "decompressed", lambda: decompressed_result(file_path))
+        yield ChecksumRecord(file_path, os.path.basename(file_path), file_stat.st_size, label, raw_digest, None, (file_stat.st_dev, file_stat.st_ino))
+        if decompressed:
+            name = archive_handler.decompressed_name(file_path)
+            yield ChecksumRecord(f"{file_path}/{name}", name, decompressed[0], label, decompressed[1], file_path)
+
+    def member_results(archive_path):
+        if chunk_analyzer or tree_hasher:
+            # Chunk analysis must see members one at a time, and block trees already spread each member's blocks over the workers
+            return ((member, size, compute(file_obj, f"{archive_path}/{member}", archive_path)) for member, size, file_obj in archive_handler.iter_member_entries(archive_path))
+        return archive_handler.map_members(archive_path, lambda file_obj: compute(file_obj, None), workers=workers, executor=executor)
+
+    def archive_records(archive_path, archive_stat):
+        archive_record = file_record(archive_path, archive_stat)
+        yield archive_record
+        cache_key = member_cache.archive_key(archive_path, archive_stat, archive_record.digest) if member_cache else None
+        if cache_key is not None:
+            cached = member_cache.get(cache_key, cache_label)
+            if cached is not None:
+                for member, size, digest in cached:
+                    yield ChecksumRecord(f"{archive_path}/{member}", os.path.basename(member), size, label, digest, archive_path)
+                return
+        if archive_stat.st_nlink > 1:
+            # A hardlinked archive's members are the same too, so read them once
+            members = once(archive_stat, "members", lambda path=archive_path: list(member_results(path)))
+        else:
+            members = member_results(archive_path)
+        hashed = []
+        for member, size, result in members:
+            virtual_path = f"{archive_path}/{member}"
+            digest = emit(virtual_path, result)
+            if cache_key is not None:
+                hashed.append((member, size, digest))
+            yield ChecksumRecord(virtual_path, os.path.basename(member), size, label, digest, archive_path)
+        # Stored only once every member has been hashed, so an interrupted archive is never cached partially
+        if cache_key is not None:
+            member_cache.put(cache_key, cache_label, hashed)
+
+    def entry_records(file_path, file_stat, is_archive):
+        """Yield the records of one walk entry: a file, a compressed file and its content, or an archive and its members."""
+        if is_archive:
+            yield from archive_records(file_path, file_stat)
+        elif decompress and archive_handler.is_compressed_file(file_path):
+            yield from compressed_records(file_path, file_stat or os.stat(file_path))
+        else:
+            yield file_record(file_path, file_stat or os.stat(file_path))
+
+    def close():
+        linked.clear()
+        if tree_hasher is not None:
+            tree_hasher.close()
+
+    if per_entry:
+        return entries, entry_records, close
+
+    def records():
+        archive_entries = []
+        try:
+            for entry in entries:
+                if entry[2]:
+                    # Archives follow the regular files, as in the CSV layout
+                    archive_entries.append(entry)
+                    continue
+                yield from entry_records(*entry)
+            for entry in archive_entries:
+                yield from entry_records(*entry)
+        finally:
+            close()
+
+    return records()
+
+
+def _iter_storage_records(storage, prefixes, hasher, algorithm, length, ignore_file, include_hidden, pipelined, throttle):
+    """The records of every object under `prefixes` in a storage backend, hashed concurrently in listing order."""
+    import posixpath
+
+    listings = [Mapper().iter_storage_paths(storage, prefix, ignore_file=ignore_file, include_hidden=include_hidden) for prefix in prefixes]
+
+    def compute(reader):
+        if throttle:
+            throttle.open_file()
+        return hasher.checksum_file(reader, algorithm=algorithm, length=length, pipelined=pipelined)
+
+    for info, digest in storage.map_objects(chain.from_iterable(listings), compute):
+        yield ChecksumRecord(storage.url(info.path), posixpath.basename(info.path), info.size, algorithm, digest)
+
+
+def load_checksums(csv_path):
+    """
+    Read a CSV written by get_checksums.
+
+    Returns:
+    ---------
+    Tuple (label, dict). label is the header of the checksum column (e.g. 'md5' or 'fp-md5-1MiB'); the dict maps filepath to that column's value.
+    """
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return None, {}
+        return header[2], {row[0]: row[2] for row in reader if len(row) > 2}
+
+
+def refine_fingerprints(records, baseline, algorithm="md5", length=None, throttle=None):
+    """
+    Full-hash the fingerprinted records that need a closer look.
+
+    A record is full-hashed when its fingerprint differs from (or is missing in) the baseline,
+    or when its fingerprint is shared with another physical file in `records`, since equal fingerprints
+    do not prove equal contents. Everything else keeps only its fingerprint. Hardlinks of one file
+    (by file_id), and the members of hardlinked archives, are not collisions, and are full-hashed once.
+
+    Parameters:
+    ------------
+    records - Iterable of ChecksumRecord with fingerprint digests; held in memory to find collisions.
+    baseline - Dict mapping filepath to the fingerprint recorded by an earlier scan (see load_checksums).
+    algorithm - String. Algorithm for the full checksums. Default: 'md5'.
+    length - Integer [conditionally optional]. Length of the digest for SHAKE (required) and BLAKE (optional) algorithms in bytes.
+    throttle - sumbuddy.throttle.Throttle [optional]. Limits applied to the full-hash reads. Default is None.
+
+    Yields:
+    ---------
+    Tuples (ChecksumRecord, full checksum or None).
+    """
+    records = list(records)
+    archive_ids = {record.path: record.file_id for record in records if record.file_id}
+
+    def identity(record):
+        """The physical file behind a record: its file_id, or for an archive member, its archive's file_id and the member name."""
+        if record.archive:
+            return archive_ids.get(record.archive, record.archive), record.path[len(record.archive) + 1:]
+        return record.file_id or record.path
+
+    files_per_digest = {}
+    for record in records:
+        files_per_digest.setdefault(record.digest, set()).add(identity(record))
+    links = Counter(identity(record) for record in records)
+    # Full checksums of files with further links still to come
+    linked = {}
+    hasher = Hasher(algorithm, throttle=throttle)
+    archive_handler = ArchiveHandler()
+    for record in records:
+        if len(files_per_digest[record.digest]) == 1 and baseline.get(record.path) == record.digest:
+            yield record, None
+            continue
+        key = identity(record)
+        checksum = linked.get(key)
+        if checksum is None:
+            if throttle:
+                throttle.open_file()
+            if record.archive:
+                with archive_handler.open_member(record.archive, record.path[len(record.archive) + 1:]) as file_obj:
+                    checksum = hasher.checksum_file(file_obj, algorithm=algorithm, length=length)
+            else:
+                checksum = hasher.checksum_file(record.path, algorithm=algorithm, length=length)
+        links[key] -= 1
+        if links[key]:
+            linked[key] = checksum
+        else:
+            linked.pop(key, None)
+        yield record, checksum
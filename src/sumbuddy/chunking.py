@@ -0,0 +1,231 @@
+import csv
+import hashlib
+import os
+
+DEFAULT_AVERAGE_CHUNK_SIZE = 64 * 1024
+
+_MASK_64 = (1 << 64) - 1
+
+# Bytes at the start of each file that decide whether a sampled analysis includes it
+SAMPLE_KEY_SIZE = 4096
+
+
+def _gear_table():
+    # Fixed pseudo-random values, so chunk boundaries are stable across runs and machines
+    return [int.from_bytes(hashlib.sha256(b"sumbuddy-gear" + bytes([i])).digest()[:8], "big") for i in range(256)]
+
+
+_GEAR = _gear_table()
+
+
+def _high_bits_mask(bits):
+    # The gear hash shifts left, so its high bits depend on the most recent ~64 bytes
+    return ((1 << bits) - 1) << (64 - bits)
+
+
+class ContentChunker:
+    """
+    FastCDC-style content-defined chunker fed incrementally with the bytes of one stream.
+
+    A gear rolling hash picks cut points from the content itself, so an insertion only changes
+    the chunks around it and shared runs of bytes between files produce identical chunks.
+    Cut-point skipping (nothing before `min_size`) and normalized chunking (a stricter mask
+    before the average size, a looser one after) follow Xia et al., "FastCDC" (USENIX ATC 2016).
+    """
+
+    def __init__(self, average_size=DEFAULT_AVERAGE_CHUNK_SIZE, min_size=None, max_size=None):
+        if average_size < 64 or average_size & (average_size - 1):
+            raise ValueError("average_size must be a power of two of at least 64 bytes")
+        self.average_size = average_size
+        self.min_size = min_size or average_size // 4
+        self.max_size = max_size or average_size * 8
+        bits = average_size.bit_length() - 1
+        self._mask_small = _high_bits_mask(bits + 2)
+        self._mask_large = _high_bits_mask(bits - 2)
+        self._buffer = bytearray()
+
+    def _cut_point(self, data, start, end):
+        """Length of the chunk starting at `start`, given the bytes up to `end`."""
+        available = end - start
+        if available <= self.min_size:
+            return available
+        limit = min(available, self.max_size)
+        normal = min(self.average_size, limit)
+        gear = _GEAR
+        fingerprint = 0
+        i = start + self.min_size
+        for stop, mask in ((start + normal, self._mask_small), (start + limit, self._mask_large)):
+            while i < stop:
+                fingerprint = ((fingerprint << 1) + gear[data[i]]) & _MASK_64
+                i += 1
+                if not fingerprint & mask:
+                    return i - start
+        return limit
+
+    def update(self, data):
+        """
+        Add bytes to the stream.
+
+        Returns:
+        ---------
+        List of bytes objects, the chunks completed by these bytes.
+        """
+        buffer = self._buffer
+        buffer += data
+        chunks = []
+        start = 0
+        # A cut is always found within max_size, so only search once that much is buffered
+        while len(buffer) - start >= self.max_size:
+            size = self._cut_point(buffer, start, len(buffer))
+            chunks.append(bytes(buffer[start:start + size]))
+            start += size
+        del buffer[:start]
+        return chunks
+
+    def finish(self):
+        """Cut the remaining bytes into their final chunks and reset for the next stream."""
+        buffer = self._buffer
+        chunks = []
+        start = 0
+        while start < len(buffer):
+            size = self._cut_point(buffer, start, len(buffer))
+            chunks.append(bytes(buffer[start:start + size]))
+            start += size
+        buffer.clear()
+        return chunks
+
+
+class _GroupStats:
+    __slots__ = ("chunks", "files", "seen", "total_bytes", "unique_bytes")
+
+    def __init__(self):
+        self.files = 0
+        self.chunks = 0
+        self.total_bytes = 0
+        self.unique_bytes = 0
+        self.seen = set()
+
+    def add(self, digest, size):
+        self.chunks += 1
+        self.total_bytes += size
+        if digest not in self.seen:
+            self.seen.add(digest)
+            self.unique_bytes += size
+
+
+def _in_sample(key, sample):
+    """Whether a file whose first bytes are `key` falls in a sample of this fraction of files."""
+    value = int.from_bytes(hashlib.blake2b(key, digest_size=8, person=b"sumbuddy-sample").digest(), "big")
+    return value < sample * (1 << 64)
+
+
+class ChunkAnalyzer:
+    """
+    Estimate deduplication savings from the bytes read while files are hashed.
+
+    Each file is cut into content-defined chunks identified by a 128-bit BLAKE2b digest.
+    Unique versus total chunk bytes are tracked for the whole tree and for every directory
+    (counting the files directly inside it; an archive's members form their own group).
+    Memory grows with the number of distinct chunks.
+
+    Chunking runs in pure Python at about 1% of md5's throughput (roughly 5 MB/s against 470 MB/s),
+    so large trees are best analyzed with `sample` below 1. A file is then chunked only when a digest
+    of its first SAMPLE_KEY_SIZE bytes falls in the sample, so identical files (and files sharing
+    those first bytes) are always sampled together, and the ratio of total to unique bytes of the
+    sampled files estimates that of the tree. Counts and byte totals cover the sampled files only.
+
+    Usage: call start_file, pass `update` as the hasher's observer, then call finish_file.
+    """
+
+    def __init__(self, average_size=DEFAULT_AVERAGE_CHUNK_SIZE, index_stream=None, sample=1.0):
+        if not 0 < sample <= 1:
+            raise ValueError("sample must be a fraction of files above 0 and at most 1")
+        self.chunker = ContentChunker(average_size)
+        self.sample = sample
+        self.tree = _GroupStats()
+        self.groups = {}
+        self._archives = set()
+        self._index = None
+        if index_stream is not None:
+            self._index = csv.writer(index_stream)
+            self._index.writerow(["filepath", "offset", "length", "chunk-blake2b-128"])
+        self._path = None
+        self._archive = None
+        self._group = None
+        self._offset = 0
+        # First bytes of a file whose sampling is undecided, or None once decided
+        self._key = None
+        self._sampled = True
+
+    def start_file(self, path, archive=None):
+        """Begin a file; archive members (with `archive` set) are grouped under their archive."""
+        self._path = path
+        self._archive = archive
+        self._offset = 0
+        if self.sample < 1:
+            self._key = bytearray()
+        else:
+            self._start_group()
+
+    def _start_group(self):
+        group = self._archive or os.path.dirname(self._path) or os.curdir
+        if self._archive:
+            self._archives.add(self._archive)
+        self._group = self.groups.get(group)
+        if self._group is None:
+            self._group = self.groups[group] = _GroupStats()
+        self._group.files += 1
+        self.tree.files += 1
+        self._sampled = True
+
+    def _decide(self):
+        """Settle whether the current file is sampled, and chunk the bytes held back until then if so."""
+        key = bytes(self._key)
+        self._key = None
+        self._sampled = _in_sample(key[:SAMPLE_KEY_SIZE], self.sample)
+        if self._sampled:
+            self._start_group()
+            self._record(self.chunker.update(key))
+
+    def _record(self, chunks):
+        for chunk in chunks:
+            digest = hashlib.blake2b(chunk, digest_size=16).digest()
+            size = len(chunk)
+            self.tree.add(digest, size)
+            self._group.add(digest, size)
+            if self._index:
+                self._index.writerow([self._path, self._offset, size, digest.hex()])
+            self._offset += size
+
+    def update(self, data):
+        if self._key is not None:
+            self._key += data
+            if len(self._key) >= SAMPLE_KEY_SIZE:
+                self._decide()
+        elif self._sampled:
+            self._record(self.chunker.update(data))
+
+    def finish_file(self):
+        if self._key is not None:
+            self._decide()
+        if self._sampled:
+            self._record(self.chunker.finish())
+
+    def rows(self):
+        """
+        Yield (scope, dirpath, files, chunks, total_bytes, unique_bytes): scope 'tree' first, then a 'directory' or 'archive' row for each group in sorted order.
+        """
+        yield ("tree", "", self.tree.files, self.tree.chunks, self.tree.total_bytes, self.tree.unique_bytes)
+        for group in sorted(self.groups, key=os.fsencode):
+            stats = self.groups[group]
+            scope = "archive" if group in self._archives else "directory"
+            yield (scope, group, stats.files, stats.chunks, stats.total_bytes, stats.unique_bytes)
+
+    def write_report(self, output_filepath):
+        """Write rows() as CSV, with a dedup_ratio column (total / unique bytes)."""
+        with open(output_filepath, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["scope", "dirpath", "files", "chunks", "total_bytes", "unique_bytes", "dedup_ratio"])
+            for row in self.rows():
+                total_bytes, unique_bytes = row[4], row[5]
+                writer.writerow(row + (f"{total_bytes / unique_bytes:.3f}" if unique_bytes else "",))
@@ -8,6 +8,11 @@ class NotADirectoryError(Exception):
         message = f"The input path '{input_directory}' is not a directory. \nPlease provide a directory with files."
         super().__init__(message)
 
+class NoListedFilesError(Exception):
+    def __init__(self, source):
+        message = f"None of the paths listed in {source} is a readable regular file. \nCheck the file list and the directory it is relative to."
+        super().__init__(message)
+
 class NoFilesAfterFilteringError(Exception):
     def __init__(self, input_directory, ignore_file):
         message = f"The directory {input_directory} contains files, but all are filtered out. \nCheck patterns in your {ignore_file} file and/or hidden files settings."
@@ -22,3 +27,28 @@ class OutputFileExistsError(FileExistsError):
     def __init__(self, output_filepath):
         message = f"The output file '{output_filepath}' already exists.\nPass force=True (Python) or use the -f/--force flag (CLI) to overwrite it."
         super().__init__(message)
+
+class ServerAlreadyRunningError(Exception):
+    def __init__(self, socket_path):
+        message = f"A sum-buddy server is already listening on '{socket_path}'.\nStop it or choose another path with --socket."
+        super().__init__(message)
+
+class ServerRequestError(Exception):
+    def __init__(self, error_type, detail):
+        message = f"The sum-buddy server could not complete the request ({error_type}): {detail}"
+        super().__init__(message)
+
+class WatchNotSupportedError(OSError):
+    def __init__(self, reason):
+        message = f"Watch mode requires Linux inotify, which is not available: {reason}"
+        super().__init__(message)
+
+class DecompressionError(Exception):
+    def __init__(self, filepath, detail):
+        message = f"Could not decompress '{filepath}': {detail}"
+        super().__init__(message)
+
+class StorageError(OSError):
+    def __init__(self, location, detail):
+        message = f"Object storage request for '{location}' failed: {detail}"
+        super().__init__(message)
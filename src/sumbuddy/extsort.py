@@ -0,0 +1,80 @@
+import csv
+import heapq
+import os
+import tempfile
+
+# Rows held in memory before a sorted run is spilled to a temporary file (roughly 100 MB of typical manifest rows)
+DEFAULT_RUN_SIZE = 200_000
+
+# Output orders supported by get_checksums(sort=...), as column indexes of the CSV row compared in turn
+SORT_KEYS = {
+    "path": (0,),
+    "checksum": (2, 0),
+}
+
+
+def row_key(columns):
+    """
+    Sort key over CSV rows comparing the given columns in turn.
+
+    Values are compared as their filesystem encoding (bytes), so the order does not depend on
+    the locale and paths that are not valid UTF-8 still sort consistently.
+    """
+    return lambda row: tuple(os.fsencode(row[column]) for column in columns)
+
+
+class ExternalSorter:
+    """
+    Sort CSV rows (lists of strings) with bounded memory.
+
+    Rows are buffered up to `run_size`, then each full buffer is sorted and spilled to a temporary
+    file as a run. Iterating merges the runs (and the last, in-memory buffer) with a k-way heap merge.
+    The sort is stable. Temporary files are removed on close() or when the context manager exits.
+    """
+
+    def __init__(self, key, run_size=None, directory=None):
+        """
+        Parameters:
+        ------------
+        key - Callable. Sort key for a row, e.g. row_key(SORT_KEYS['path']).
+        run_size - Integer [optional]. Rows sorted in memory per run. Default: 200,000.
+        directory - String [optional]. Directory for the run files. Default: the system temporary directory.
+        """
+        self.key = key
+        self.run_size = run_size or DEFAULT_RUN_SIZE
+        self.directory = directory
+        self._buffer = []
+        self._runs = []
+
+    def add(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.run_size:
+            self._spill()
+
+    def _spill(self):
+        self._buffer.sort(key=self.key)
+        # surrogateescape keeps undecodable filenames intact through the round trip
+        run = tempfile.TemporaryFile("w+", newline="", encoding="utf-8", errors="surrogateescape", prefix="sumbuddy-sort-", dir=self.directory)  # noqa: SIM115 - closed by close()
+        csv.writer(run).writerows(self._buffer)
+        run.seek(0)
+        self._runs.append(run)
+        self._buffer = []
+
+    def __iter__(self):
+        self._buffer.sort(key=self.key)
+        if not self._runs:
+            return iter(self._buffer)
+        return heapq.merge(*(csv.reader(run) for run in self._runs), self._buffer, key=self.key)
+
+    def close(self):
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
@@ -1,11 +1,34 @@
 import os
+import sys
+from functools import lru_cache
 
-import pathspec
+# Name of the per-directory ignore files discovered during a walk; their patterns are relative to their directory
+LOCAL_IGNORE_FILENAME = ".sumbuddyignore"
+
+
+def _compile(lines):
+    # Imported here: pathspec is only needed once patterns are compiled
+    import pathspec
+
+    return pathspec.PathSpec.from_lines('gitwildmatch', lines)
+
+
+def _has_negation(spec):
+    return any(pattern.include is False for pattern in spec.patterns)
+
+
+@lru_cache(maxsize=4096)
+def _compile_local_ignore(path, mtime_ns, size):
+    # Keyed by mtime and size as well as path, so an edited ignore file is recompiled while unchanged ones are reused across walks
+    with open(path, 'r') as f:
+        spec = _compile(f.read().splitlines())
+    return spec, _has_negation(spec)
 
 
 class Filter:
     def __init__(self):
         self.spec = None
+        self._negates = False
 
     def read_ignore_patterns(self, ignore_filepath=None, include_hidden=False):
         """
@@ -20,17 +43,96 @@ class Filter:
             ignore_patterns = ['.*']
 
         if ignore_patterns:
-            self.spec = pathspec.PathSpec.from_lines('gitwildmatch', ignore_patterns)
+            self.spec = _compile(ignore_patterns)
+            self._negates = _has_negation(self.spec)
         else:
             self.spec = None
+            self._negates = False
+
+    @staticmethod
+    def load_local_ignore(relative_directory, ignore_filepath, stat_result=None):
+        """
+        Compile a per-directory ignore file into a layer for should_include and should_descend.
+
+        Compiled specs are cached by path, mtime and size, so repeated walks only re-read ignore files that changed.
+
+        Parameters:
+        ------------
+        relative_directory - String. Directory holding the ignore file, relative to the walk root ('' for the root).
+        ignore_filepath - String. Path of the ignore file.
+        stat_result - os.stat_result [optional]. Stat of the ignore file, if already known.
+
+        Returns:
+        ---------
+        Tuple (relative_directory, PathSpec, has_negation), or None if the file cannot be read.
+        """
+        try:
+            if stat_result is None:
+                stat_result = os.stat(ignore_filepath)
+            spec, negates = _compile_local_ignore(ignore_filepath, stat_result.st_mtime_ns, stat_result.st_size)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Warning: cannot read ignore file {ignore_filepath}: {e}", file=sys.stderr)
+            return None
+        return relative_directory, spec, negates
+
+    def local_layers(self, directory, root):
+        """
+        Return the layers of the per-directory ignore files that apply inside `directory`, shallowest first.
+
+        Used when a single path must be checked outside of a walk (e.g. in watch mode).
+        """
+        relative = os.path.relpath(directory, root)
+        parts = [] if relative == os.curdir else relative.split(os.sep)
+        layers = []
+        for depth in range(len(parts) + 1):
+            relative_directory = os.path.join(*parts[:depth]) if depth else ''
+            ignore_filepath = os.path.join(root, relative_directory, LOCAL_IGNORE_FILENAME)
+            if os.path.isfile(ignore_filepath):
+                layer = self.load_local_ignore(relative_directory, ignore_filepath)
+                if layer:
+                    layers.append(layer)
+        return tuple(layers)
+
+    @staticmethod
+    def _relative_to_layer(relative_path, layer_directory):
+        return relative_path[len(layer_directory) + 1:] if layer_directory else relative_path
 
-    def should_include(self, filepath, root):
+    def should_include(self, filepath, root, layers=()):
         """
         Determine if a file should be included based on compiled PathSpec patterns and the root directory.
+
+        With per-directory ignore file `layers`, patterns are applied as in git: the ignore file
+        (or default) for the whole tree first, then each directory's file from shallowest to deepest,
+        with the last matching pattern deciding, so a deeper `!pattern` can re-include a file.
         """
-        if not self.spec:
+        if not self.spec and not layers:
             return True  # If no spec is provided, include all files by default.
-        
+
         relative_filepath = os.path.relpath(filepath, start=root)
-        return not self.spec.match_file(relative_filepath)
+        if not layers:
+            return not self.spec.match_file(relative_filepath)
+
+        ignored = self.spec.check_file(relative_filepath).include if self.spec else None
+        for layer_directory, spec, _ in layers:
+            result = spec.check_file(self._relative_to_layer(relative_filepath, layer_directory)).include
+            if result is not None:
+                ignored = result
+        return not ignored
 
+    def should_descend(self, relative_directory, layers=()):
+        """
+        Determine whether a directory (relative to the walk root) may contain included files.
+
+        A directory is skipped only when it is ignored and no pattern in effect is a negation,
+        since then no file below it could be included again. Like git, its own ignore file is
+        never read in that case.
+        """
+        if self._negates or any(negates for _, _, negates in layers):
+            return True
+        directory_path = relative_directory + '/'
+        if self.spec and self.spec.match_file(directory_path):
+            return False
+        return not any(
+            spec.match_file(self._relative_to_layer(directory_path, layer_directory))
+            for layer_directory, spec, _ in layers
+        )
@@ -1,29 +1,91 @@
 import hashlib
+import os
+import threading
 
 from sumbuddy.exceptions import LengthUsedForFixedLengthHashError
 
+# Define variable length algorithm sets
+SHAKE_ALGORITHMS = {'shake_128', 'shake_256'}
+BLAKE_DEFAULT_LENGTHS = {'blake2s': 32, 'blake2b': 64}
+
+# Files up to this size are read by checksum_file in one raw read into a reused buffer, when their size is known
+SMALL_FILE_THRESHOLD = 256 * 1024
+
+# Raw open flags for the small-file path; O_NOATIME (Linux) skips the access-time update, but only the file's owner may use it
+_SMALL_FILE_FLAGS = os.O_RDONLY | getattr(os, "O_BINARY", 0) | getattr(os, "O_CLOEXEC", 0)
+_O_NOATIME = getattr(os, "O_NOATIME", 0)
+
+if hasattr(os, "readv"):
+    def _read_into(fd, buffer):
+        return os.readv(fd, (buffer,))
+else:
+    def _read_into(fd, buffer):
+        data = os.read(fd, len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+# Bytes sampled from each of the start, middle and end of a file by fingerprint_file
+DEFAULT_FINGERPRINT_SAMPLE_SIZE = 1024 * 1024
+
+
+def fingerprint_label(algorithm, sample_size=DEFAULT_FINGERPRINT_SAMPLE_SIZE):
+    """
+    Column label for fingerprints, e.g. 'fp-sha256-1MiB'; fingerprints are not comparable with full checksums.
+    """
+    from sumbuddy.blocktree import format_block_size
+
+    return f"fp-{algorithm}-{format_block_size(sample_size)}"
+
+
+def _fingerprint_regions(size, sample_size):
+    """(offset, count) ranges sampled for a file of `size` bytes; small files are covered entirely."""
+    if size <= 3 * sample_size:
+        return [(0, size)]
+    return [(0, sample_size), ((size - sample_size) // 2, sample_size), (size - sample_size, sample_size)]
+
 
 class Hasher:
-    def __init__(self, algorithm='md5'):
+    def __init__(self, algorithm='md5', throttle=None, xattrs=False):
+        """
+        Parameters:
+        ------------
+        algorithm - String. Default hash function. Default: 'md5'.
+        throttle - sumbuddy.throttle.Throttle [optional]. Byte-rate limit applied to every read. Default is None, i.e. unlimited.
+        xattrs - Boolean [optional]. Whether checksum_file reuses and records digests of files on disk in `user.sumbuddy.<algorithm>` extended attributes (see sumbuddy.cache.XattrCache). Default is False.
+        """
         self.algorithm = algorithm
+        self.throttle = throttle
+        # Empty hash objects by (algorithm, length), copied for each file instead of validating and constructing anew
+        self._templates = {}
+        self._noatime = bool(_O_NOATIME)
+        # Read buffer of the small-file path, one per thread
+        self._local = threading.local()
+        self.xattr_cache = None
+        if xattrs:
+            from sumbuddy.cache import XattrCache
+
+            self.xattr_cache = XattrCache()
 
-    def checksum_file(self, file_path_or_obj, algorithm=None, length=None):
+    def _throttled(self, f):
+        return self.throttle.wrap(f) if self.throttle else f
+
+    def new_hash(self, algorithm=None, length=None):
         """
-        Calculate the checksum of a file using the specified algorithm.
-        
+        Create an empty hash object for the algorithm, configured as checksum_file would.
+
         Parameters:
         ------------
-        file_path_or_obj - String or file-like object. Path to file or file-like object to apply checksum function.
-        algorithm - String. Hash function to use for checksums. Default: 'md5', see options with 'hashlib.algorithms_available'.
-        length - Integer [optional]. Length of the digest for SHAKE and BLAKE algorithms in bytes.
-        
+        algorithm - String. Hash function to use. Default: the instance's algorithm.
+        length - Integer [optional]. Length of the digest for SHAKE (required) and BLAKE (optional) algorithms in bytes.
+
         Returns:
         ---------
-        String. Hash of file.
+        hashlib hash object.
 
         Raises:
         -------
-        ValueError - If length is provided for a fixed-length algorithm or unsupported algorithm.
+        ValueError - If the algorithm is unsupported or SHAKE is used without a length.
+        LengthUsedForFixedLengthHashError - If length is provided for a fixed-length algorithm.
         """
         if algorithm is None:
             algorithm = self.algorithm
@@ -32,43 +94,195 @@ class Hasher:
         if algorithm not in hashlib.algorithms_available:
             raise ValueError(f"Unsupported algorithm '{algorithm}'")
 
-        # Define variable length algorithm sets
-        shake_algorithms = {'shake_128', 'shake_256'}
-        blake_default_lengths = {'blake2s': 32, 'blake2b': 64} 
-
         # SHAKE algorithm (requires length parameter)
-        if algorithm in shake_algorithms:
+        if algorithm in SHAKE_ALGORITHMS:
             if length is None:
                 raise ValueError(f"Length parameter [bytes] is required for algorithm '{algorithm}'")
-            hash_func = hashlib.new(algorithm)
-        
+            return hashlib.new(algorithm)
+
         # BLAKE algorithm (accepts length parameter, but defaults to standard lengths)
-        elif algorithm in blake_default_lengths:
+        if algorithm in BLAKE_DEFAULT_LENGTHS:
             if length:
-                hash_func = hashlib.new(algorithm, digest_size=length)
-            else:
-                default_length = blake_default_lengths[algorithm]
-                hash_func = hashlib.new(algorithm)
-                print(f"Using default length of {default_length} bytes for {algorithm}")
-        
+                return hashlib.new(algorithm, digest_size=length)
+            return hashlib.new(algorithm)
+
         # Other algorithms
-        else:
-            if length is not None:
-                raise LengthUsedForFixedLengthHashError(algorithm)
-            hash_func = hashlib.new(algorithm)
+        if length is not None:
+            raise LengthUsedForFixedLengthHashError(algorithm)
+        return hashlib.new(algorithm)
+
+    def _template(self, algorithm, length):
+        key = (algorithm, length)
+        template = self._templates.get(key)
+        if template is None:
+            template = self._templates[key] = self.new_hash(algorithm, length)
+            if algorithm in BLAKE_DEFAULT_LENGTHS and not length:
+                print(f"Using default length of {BLAKE_DEFAULT_LENGTHS[algorithm]} bytes for {algorithm}")
+        return template
+
+    def hexdigest(self, hash_func, length=None):
+        """
+        Return the hex digest of a hash object created by new_hash; SHAKE digests are `length` bytes long.
+        """
+        if hash_func.name in SHAKE_ALGORITHMS:
+            return hash_func.hexdigest(length)
+        return hash_func.hexdigest()
+
+    def checksum_file(self, file_path_or_obj, algorithm=None, length=None, observer=None, pipelined=False, size=None):
+        """
+        Calculate the checksum of a file using the specified algorithm.
+        
+        Parameters:
+        ------------
+        file_path_or_obj - String or file-like object. Path to file or file-like object to apply checksum function.
+        algorithm - String. Hash function to use for checksums. Default: 'md5', see options with 'hashlib.algorithms_available'.
+        length - Integer [optional]. Length of the digest for SHAKE and BLAKE algorithms in bytes.
+        observer - Callable [optional]. Called with every block of bytes as it is read, so other analyses can share this single read of the file. With pipelined, blocks are memoryviews that must not be kept.
+        pipelined - Boolean [optional]. Whether to read on a separate I/O thread into a small ring of buffers while hashing, overlapping reads with hashing (see sumbuddy.pipeline). Files no larger than one buffer are read directly. Default is False.
+        size - Integer [optional]. Size of the file at file_path_or_obj from an earlier stat, e.g. the walk's. Files no larger than SMALL_FILE_THRESHOLD (256 KiB) are then opened with a raw os.open (with O_NOATIME where permitted) and read with a single readv into a reused buffer, avoiding the cost of a Python file object. Ignored with an observer or pipelined. Default is None.
+
+        With xattrs enabled on the instance, a file path whose stored digest still matches its size and mtime is not read at all (unless an observer needs its bytes), and a freshly computed digest is stored on the file.
+        
+        Returns:
+        ---------
+        String. Hash of file.
 
+        Raises:
+        -------
+        ValueError - If length is provided for a fixed-length algorithm or unsupported algorithm.
+        """
+        if algorithm is None:
+            algorithm = self.algorithm
+
+        hash_func = self._template(algorithm, length).copy()
+
+        stat_result = None
+        if self.xattr_cache is not None and observer is None and isinstance(file_path_or_obj, str):
+            # Taken before the read, so a concurrent write leaves a stale attribute rather than a wrong one
+            stat_result = os.stat(file_path_or_obj)
+            digest = self.xattr_cache.get(file_path_or_obj, algorithm, length, stat_result)
+            if digest is not None:
+                return digest
+
+        if size is not None and size <= SMALL_FILE_THRESHOLD and observer is None and not pipelined and isinstance(file_path_or_obj, str):
+            self._update_small_file(hash_func, file_path_or_obj)
+        elif pipelined:
+            self._update_pipelined(hash_func, file_path_or_obj, observer)
         # Handle both file paths and file-like objects
-        if isinstance(file_path_or_obj, str):
-            with open(file_path_or_obj, "rb") as f:
+        elif isinstance(file_path_or_obj, str):
+            with open(file_path_or_obj, "rb") as raw_file:
+                f = self._throttled(raw_file)
                 for chunk in iter(lambda: f.read(4096), b""):
                     hash_func.update(chunk)
+                    if observer:
+                        observer(chunk)
         else:
             # Assume it's a file-like object
-            for chunk in iter(lambda: file_path_or_obj.read(4096), b""):
+            file_obj = self._throttled(file_path_or_obj)
+            for chunk in iter(lambda: file_obj.read(4096), b""):
                 hash_func.update(chunk)
+                if observer:
+                    observer(chunk)
 
-        # Return the hash digest
-        if algorithm in shake_algorithms:
-            return hash_func.hexdigest(length)
+        digest = self.hexdigest(hash_func, length)
+        if stat_result is not None:
+            self.xattr_cache.put(file_path_or_obj, algorithm, length, stat_result, digest)
+        return digest
+
+    def _update_small_file(self, hash_func, path):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = self._local.buffer = bytearray(SMALL_FILE_THRESHOLD)
+            self._local.view = memoryview(buffer)
+        view = self._local.view
+        if self._noatime:
+            try:
+                fd = os.open(path, _SMALL_FILE_FLAGS | _O_NOATIME)
+            except PermissionError:
+                # Not the owner: O_NOATIME is refused (EPERM) even for readable files, and the rest of the tree likely shares the owner
+                fd = os.open(path, _SMALL_FILE_FLAGS)
+                self._noatime = False
         else:
-            return hash_func.hexdigest()
+            fd = os.open(path, _SMALL_FILE_FLAGS)
+        try:
+            # Usually one read fills in the whole file and a second confirms the end; a file that grew is still read in full
+            while count := _read_into(fd, buffer):
+                hash_func.update(view[:count])
+                if self.throttle:
+                    self.throttle.consume(count)
+        finally:
+            os.close(fd)
+
+    def _update_pipelined(self, hash_func, file_path_or_obj, observer):
+        from sumbuddy.pipeline import DEFAULT_PIPELINE_BUFFER_SIZE, PipelinedReader
+
+        def update(f):
+            with PipelinedReader(self._throttled(f)) as reader:
+                for block in reader:
+                    hash_func.update(block)
+                    if observer:
+                        observer(block)
+
+        if not isinstance(file_path_or_obj, str):
+            update(file_path_or_obj)
+            return
+        # Unbuffered, so readinto() fills the ring buffers straight from the kernel
+        with open(file_path_or_obj, "rb", buffering=0) as f:
+            if os.fstat(f.fileno()).st_size > DEFAULT_PIPELINE_BUFFER_SIZE:
+                update(f)
+                return
+            # A thread is not worth starting for a file that fits in one read
+            data = self._throttled(f).read()
+            hash_func.update(data)
+            if observer and data:
+                observer(data)
+
+    def fingerprint_file(self, file_path_or_obj, algorithm=None, length=None, sample_size=DEFAULT_FINGERPRINT_SAMPLE_SIZE):
+        """
+        Calculate a quick fingerprint: a digest of the file size plus the first, middle and last `sample_size` bytes.
+
+        Files no larger than three samples are hashed entirely (still prefixed by their size), so the
+        fingerprint never equals the plain checksum. A change outside the sampled regions that keeps
+        the size the same goes unnoticed: use fingerprints for triage, not verification.
+
+        Parameters:
+        ------------
+        file_path_or_obj - String or seekable file-like object. Path to file or file-like object to fingerprint.
+        algorithm - String. Hash function to use. Default: the instance's algorithm.
+        length - Integer [optional]. Length of the digest for SHAKE and BLAKE algorithms in bytes.
+        sample_size - Integer [optional]. Bytes read from each sampled region. Default: 1 MiB.
+
+        Returns:
+        ---------
+        String. Hex fingerprint.
+
+        Raises:
+        -------
+        ValueError - If the algorithm is unsupported, or a file-like object is not seekable.
+        """
+        if algorithm is None:
+            algorithm = self.algorithm
+        hash_func = self.new_hash(algorithm, length)
+
+        if isinstance(file_path_or_obj, str):
+            with open(file_path_or_obj, "rb") as f:
+                self._update_fingerprint(hash_func, self._throttled(f), os.fstat(f.fileno()).st_size, sample_size)
+        else:
+            if not file_path_or_obj.seekable():
+                raise ValueError("Fingerprints need a seekable file-like object")
+            size = file_path_or_obj.seek(0, os.SEEK_END)
+            self._update_fingerprint(hash_func, self._throttled(file_path_or_obj), size, sample_size)
+
+        return self.hexdigest(hash_func, length)
+
+    @staticmethod
+    def _update_fingerprint(hash_func, f, size, sample_size):
+        hash_func.update(size.to_bytes(8, "big"))
+        for offset, count in _fingerprint_regions(size, sample_size):
+            f.seek(offset)
+            while count > 0:
+                chunk = f.read(min(count, 1024 * 1024))
+                if not chunk:
+                    break
+                hash_func.update(chunk)
+                count -= len(chunk)
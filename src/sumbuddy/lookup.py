@@ -0,0 +1,162 @@
+import csv
+import os
+import sqlite3
+from pathlib import Path
+
+# Appended to a manifest's path to name its default sidecar index
+INDEX_SUFFIX = ".index.sqlite"
+
+# Rows inserted per transaction while an index is built
+_BUILD_BATCH = 50_000
+
+
+def _manifest_signature(manifest_path):
+    """Values stored in an index to recognize the exact manifest file it was built from."""
+    manifest_stat = os.stat(manifest_path)
+    return {
+        "size": str(manifest_stat.st_size),
+        "mtime_ns": str(manifest_stat.st_mtime_ns),
+        "inode": f"{manifest_stat.st_dev}:{manifest_stat.st_ino}",
+    }
+
+
+def _checksum_key(checksum):
+    """Hex digests are stored as bytes, half their text size; anything else is kept as text."""
+    try:
+        return bytes.fromhex(checksum)
+    except ValueError:
+        return checksum
+
+
+class ManifestIndex:
+    """
+    SQLite sidecar index over a CSV manifest written by get_checksums, for O(log n) lookups by checksum or filepath.
+
+    The index records the manifest's size, mtime and inode when it is built. Every lookup
+    first compares them with the manifest on disk, so an index is rebuilt automatically as soon
+    as the manifest is rewritten or edited; it is never consulted while stale. Builds go to a
+    temporary file that replaces the index atomically, so concurrent readers see either the
+    old or the new index in full.
+    """
+
+    def __init__(self, manifest_path, index_path=None):
+        """
+        Parameters:
+        ------------
+        manifest_path - String. CSV manifest written by get_checksums (filepath, filename, checksum columns first).
+        index_path - String [optional]. Filepath of the sidecar index. Default: the manifest path plus '.index.sqlite'.
+        """
+        self.manifest_path = manifest_path
+        self.index_path = index_path or manifest_path + INDEX_SUFFIX
+        self.connection = None
+        self.label = None
+
+    def _connect(self):
+        # Read-only: lookups never modify the index, which is only ever replaced as a whole
+        uri = Path(self.index_path).absolute().as_uri() + "?mode=ro"
+        self.connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def _is_current(self, signature):
+        if self.connection is None:
+            if not os.path.exists(self.index_path):
+                return False
+            self._connect()
+        try:
+            stored = dict(self.connection.execute("SELECT key, value FROM meta"))
+        except sqlite3.DatabaseError:
+            return False
+        self.label = stored.get("label")
+        return all(stored.get(key) == value for key, value in signature.items())
+
+    def refresh(self, force=False):
+        """
+        Make sure the index matches the manifest, rebuilding it if the manifest changed (or if `force`).
+
+        Returns:
+        ---------
+        Boolean. True if the index was rebuilt.
+        """
+        signature = _manifest_signature(self.manifest_path)
+        if not force:
+            if self._is_current(signature):
+                return False
+            # Another process may have replaced the index since this connection was opened
+            self.close()
+            if self._is_current(signature):
+                return False
+        self.close()
+        self._build(signature)
+        self._connect()
+        return True
+
+    def _build(self, signature):
+        temporary_path = f"{self.index_path}.{os.getpid()}.tmp"
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        connection = sqlite3.connect(temporary_path)
+        try:
+            connection.executescript(
+                """
+                PRAGMA journal_mode = OFF;
+                PRAGMA synchronous = OFF;
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE entries (
+                    filepath TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    checksum BLOB NOT NULL
+                ) WITHOUT ROWID;
+                """
+            )
+            with open(self.manifest_path, newline="") as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if not header or len(header) < 3 or header[:2] != ["filepath", "filename"]:
+                    raise ValueError(f"{self.manifest_path} is not a sum-buddy manifest (expected filepath, filename and checksum columns)")
+                batch = []
+                for row in reader:
+                    if len(row) < 3:
+                        continue
+                    batch.append((row[0], row[1], _checksum_key(row[2])))
+                    if len(batch) >= _BUILD_BATCH:
+                        connection.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", batch)
+                        batch = []
+                connection.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", batch)
+            # Built after the bulk insert, which is faster than maintaining it row by row
+            connection.execute("CREATE INDEX entries_checksum ON entries (checksum)")
+            connection.executemany("INSERT INTO meta VALUES (?, ?)", [*signature.items(), ("label", header[2])])
+            connection.commit()
+        except BaseException:
+            connection.close()
+            os.remove(temporary_path)
+            raise
+        connection.close()
+        os.replace(temporary_path, self.index_path)
+        self.label = header[2]
+
+    def _query(self, sql, value):
+        self.refresh()
+        return [(filepath, filename, checksum.hex() if isinstance(checksum, bytes) else checksum) for filepath, filename, checksum in self.connection.execute(sql, (value,))]
+
+    def by_checksum(self, checksum):
+        """
+        Return the (filepath, filename, checksum) rows whose checksum equals `checksum` (hex, any case), in filepath order.
+        """
+        return self._query("SELECT filepath, filename, checksum FROM entries WHERE checksum = ? ORDER BY filepath", _checksum_key(checksum.strip()))
+
+    def by_path(self, filepath):
+        """
+        Return the (filepath, filename, checksum) row for exactly `filepath`, as a one-element list, or an empty list.
+        """
+        return self._query("SELECT filepath, filename, checksum FROM entries WHERE filepath = ?", filepath)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
@@ -1,18 +1,89 @@
 import os
+import stat
+import sys
 
 from sumbuddy.archive import ArchiveHandler
 from sumbuddy.exceptions import (
     EmptyInputDirectoryError,
     NoFilesAfterFilteringError,
+    NoListedFilesError,
     NotADirectoryError,
 )
-from sumbuddy.filter import Filter
+from sumbuddy.filter import LOCAL_IGNORE_FILENAME, Filter
+
+# Bytes read at a time from a file list
+_FILE_LIST_READ_SIZE = 64 * 1024
+
+
+def iter_file_list(stream):
+    """
+    Yield the paths in a file list read from a binary stream, such as `find -print0` output or a transfer log.
+
+    Paths are separated by NUL bytes if the first block read contains one, otherwise by newlines
+    (a trailing carriage return is dropped). Empty entries are skipped. Paths are decoded as file
+    names are (os.fsdecode), so any name the filesystem allows round-trips.
+    """
+    separator = None
+    pending = b""
+    while True:
+        block = stream.read(_FILE_LIST_READ_SIZE)
+        if separator is None:
+            separator = b"\0" if b"\0" in block else b"\n"
+        if not block:
+            break
+        *entries, pending = (pending + block).split(separator)
+        for entry in entries:
+            entry = entry if separator == b"\0" else entry.rstrip(b"\r")
+            if entry:
+                yield os.fsdecode(entry)
+    pending = pending if separator == b"\0" else pending.rstrip(b"\r")
+    if pending:
+        yield os.fsdecode(pending)
+
+
+# Directory listings kept in flight per walk thread; bounds the memory held by the concurrent walker's frontier
+_PREFETCH_PER_THREAD = 4
 
 
 class Mapper:
-    def __init__(self):
+    def __init__(self, follow_symlinks=False, exclude=None, local_ignores=True, walk_threads=None):
+        """
+        Parameters:
+        ------------
+        local_ignores - Boolean [optional]. Whether to apply the `.sumbuddyignore` files found in the walked directories, layered as in git. Default is True.
+        follow_symlinks - Boolean [optional]. Whether to descend into symlinked directories. Directories already on the current path are skipped, so symlink loops terminate. Symlinks to files are always included (and hashed by their target's content). Default is False.
+        exclude - Iterable of Strings [optional]. Files to leave out of every walk, such as output files written inside the input directory; they need not exist yet.
+        walk_threads - Integer [optional]. When greater than 1, this many threads list and stat directories ahead of the walk, for filesystems with slow metadata (NFS, Lustre). Entries are then visited in sorted order within each directory; the files selected are the same. Default is None, i.e. a single-threaded walk in os.walk order.
+        """
         self.filter_manager = Filter()
         self.archive_handler = ArchiveHandler()
+        self.follow_symlinks = follow_symlinks
+        self.local_ignores = local_ignores
+        self.walk_threads = walk_threads
+        # Directories skipped as wholly ignored during the last walk
+        self.pruned_directories = 0
+        self._excluded = self._exclusion_keys(exclude or ())
+        self._excluded_names = {name for _, _, name in self._excluded}
+
+    @staticmethod
+    def _exclusion_keys(paths):
+        """
+        Identify each path by its parent directory's (st_dev, st_ino) plus its name.
+
+        This matches the file however the walk reaches its directory (relative or absolute
+        paths, symlinked aliases) without an abspath call per walked file, and works for
+        output files that are only created after the walk has started.
+        """
+        keys = set()
+        for path in paths:
+            if not path:
+                continue
+            try:
+                parent_stat = os.stat(os.path.dirname(os.path.abspath(path)) or os.curdir)
+            except OSError:
+                continue
+            keys.add((parent_stat.st_dev, parent_stat.st_ino, os.path.basename(path)))
+        return keys
 
     def reset_filter(self, ignore_file=None, include_hidden=False):
         """
@@ -33,47 +104,379 @@ class Mapper:
         else:
             self.filter_manager.read_ignore_patterns(include_hidden=False)  # Default: ignore hidden files
 
-    def gather_file_paths(self, input_directory, ignore_file=None, include_hidden=False, archive_dive=True):
+    def _walk(self, input_directory):
         """
-        Generate list of file paths in the input directory based on ignore pattern rules.
+        Yield (directory, name, stat_result, layers) for every regular file below input_directory, in os.walk's top-down order.
+
+        `layers` are the per-directory ignore files in effect for the directory (see Filter.should_include).
+        Directories the filter rules out entirely are not read (see Filter.should_descend).
+        Files are stat'ed through symlinks, so a symlinked file reports its target's device and inode.
+        Broken symlinks and special files (FIFOs, sockets, devices) are skipped with a warning, and excluded files silently.
+        With walk_threads, directories are listed concurrently ahead of the walk (see _walk_concurrently), and entries come in sorted order.
+        """
+        if self.walk_threads and self.walk_threads > 1:
+            return self._walk_concurrently(input_directory)
+        return self._walk_directories(input_directory, self._list_directory)
+
+    @staticmethod
+    def _list_directory(directory):
+        """DirEntry objects of a directory, or None if it cannot be read."""
+        try:
+            with os.scandir(directory) as it:
+                return list(it)
+        except OSError:
+            return None
+
+    def _list_directory_sorted(self, directory):
+        """
+        Sorted DirEntry objects of a directory with their type and stat already cached, or None if it cannot be read.
+
+        Run on a walk thread: DirEntry caches is_dir() and stat(), so the metadata round trips
+        happen here rather than when _walk_directories consumes the listing.
+        """
+        entries = self._list_directory(directory)
+        if entries is None:
+            return None
+        entries.sort(key=lambda entry: entry.name)
+        for entry in entries:
+            try:
+                if not entry.is_dir() or self.follow_symlinks or not entry.is_symlink():
+                    entry.stat()
+            except OSError:
+                # Broken symlinks are reported when the walk reaches them
+                pass
+        return entries
+
+    def _walk_concurrently(self, input_directory):
+        """
+        _walk with directory listings fetched by a pool of walk_threads threads.
+
+        The walk itself stays a single depth-first traversal, so filter decisions and output order are
+        deterministic; the pool lists the directories that traversal will visit next, keeping at most
+        walk_threads * _PREFETCH_PER_THREAD listings in flight.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        executor = ThreadPoolExecutor(max_workers=self.walk_threads, thread_name_prefix="sumbuddy-walk")
+        limit = self.walk_threads * _PREFETCH_PER_THREAD
+        # Listings in flight, by directory path
+        listings = {}
+
+        def prefetch(pending):
+            # Directories are popped from the end of the stack, so list those first; at most `limit` entries are skipped as in flight
+            for item in reversed(pending):
+                if len(listings) >= limit:
+                    break
+                if item[0] not in listings:
+                    listings[item[0]] = executor.submit(self._list_directory_sorted, item[0])
+
+        def list_directory(directory):
+            future = listings.pop(directory, None)
+            if future is None:
+                return self._list_directory_sorted(directory)
+            return future.result()
+
+        try:
+            yield from self._walk_directories(input_directory, list_directory, prefetch)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _walk_directories(self, input_directory, list_directory, prefetch=None):
+        """
+        Traverse input_directory depth-first for _walk, reading each directory with `list_directory`.
+
+        `prefetch`, if given, is called with the stack of pending directories before each one is popped,
+        so their listings can be started before they are needed.
+        """
+        self.pruned_directories = 0
+        root_stat = os.stat(input_directory)
+        root_id = (root_stat.st_dev, root_stat.st_ino)
+        # Each pending directory carries its own (st_dev, st_ino) and those of its ancestors, for loop detection,
+        # its path relative to input_directory and the ignore layers inherited from its ancestors
+        pending = [(input_directory, root_id, frozenset([root_id]), '', ())]
+        while pending:
+            if prefetch:
+                prefetch(pending)
+            directory, directory_id, ancestors, relative_directory, layers = pending.pop()
+            entries = list_directory(directory)
+            if entries is None:
+                # Unreadable directories are skipped, as os.walk does by default
+                continue
+
+            if self.local_ignores:
+                for entry in entries:
+                    if entry.name == LOCAL_IGNORE_FILENAME and entry.is_file():
+                        layer = self.filter_manager.load_local_ignore(relative_directory, entry.path, entry.stat())
+                        if layer:
+                            layers = layers + (layer,)
+                        break
+
+            subdirectories = []
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        subdirectories.append(entry)
+                        continue
+                    entry_stat = entry.stat()
+                except OSError:
+                    print(f"Warning: skipping broken symlink {entry.path}", file=sys.stderr)
+                    continue
+                if not stat.S_ISREG(entry_stat.st_mode):
+                    print(f"Warning: skipping special file {entry.path}", file=sys.stderr)
+                    continue
+                if entry.name in self._excluded_names and directory_id + (entry.name,) in self._excluded:
+                    continue
+                yield directory, entry.name, entry_stat, layers
+
+            for entry in reversed(subdirectories):
+                relative_subdirectory = os.path.join(relative_directory, entry.name) if relative_directory else entry.name
+                if not self.filter_manager.should_descend(relative_subdirectory, layers):
+                    self.pruned_directories += 1
+                    continue
+                if entry.is_symlink():
+                    if not self.follow_symlinks:
+                        continue
+                    try:
+                        entry_stat = entry.stat()
+                    except OSError:
+                        continue
+                else:
+                    entry_stat = entry.stat()
+                subdirectory_id = (entry_stat.st_dev, entry_stat.st_ino)
+                if subdirectory_id in ancestors:
+                    print(f"Warning: skipping symlink loop at {entry.path}", file=sys.stderr)
+                    continue
+                pending.append((entry.path, subdirectory_id, ancestors | {subdirectory_id}, relative_subdirectory, layers))
+
+    def iter_file_paths(self, input_directory, ignore_file=None, include_hidden=False, archive_dive=True):
+        """
+        Lazily yield the files in the input directory that pass the ignore pattern rules, in walk order.
 
         Parameters:
         ------------
         input_directory - String. Directory to traverse for files.
         ignore_file - String [optional]. Filepath for the ignore patterns file.
         include_hidden - Boolean [optional]. Whether to include hidden files.
-        archive_dive - Boolean [optional]. Whether to classify supported archives separately so callers can descend into their members. When False, archive files are returned with regular_files. Default is True.
+        archive_dive - Boolean [optional]. Whether to flag supported archives so callers can descend into their members. Default is True.
 
-        Returns:
+        Yields:
         ---------
-        regular_files - List. Files in input_directory that are not ignored. When archive_dive is True, this excludes supported archives. When False, it includes them.
-        archive_files - List. Archive files in input_directory that are not ignored and should be expanded by the caller.
-        """
+        Tuples of (file_path, stat_result, is_archive). stat_result follows symlinks; is_archive is always False when archive_dive is False.
 
+        Raises:
+        -------
+        NotADirectoryError - Immediately, if input_directory is not a directory.
+        EmptyInputDirectoryError, NoFilesAfterFilteringError - Once the walk is exhausted, if nothing was yielded.
+        """
         if not os.path.isdir(input_directory):
             raise NotADirectoryError(input_directory)
 
         self.reset_filter(ignore_file=ignore_file, include_hidden=include_hidden)
+        return self._iter_file_paths(input_directory, ignore_file, archive_dive)
 
-        regular_files = []
-        archive_files = []
+    def _iter_file_paths(self, input_directory, ignore_file, archive_dive):
         root_directory = os.path.abspath(input_directory)
         has_files = False
+        has_included = False
+
+        for directory, name, file_stat, layers in self._walk(input_directory):
+            has_files = True
+            file_path = os.path.normpath(os.path.join(directory, name))
+            if self.filter_manager.should_include(file_path, root_directory, layers):
+                has_included = True
+                yield file_path, file_stat, archive_dive and self.archive_handler.is_supported_archive(file_path)
+
+        # An ignored subtree counts as filtered out, not as empty, although its files were never listed
+        if not has_files and not self.pruned_directories:
+            raise EmptyInputDirectoryError(input_directory)
+        if not has_included:
+            raise NoFilesAfterFilteringError(input_directory, ignore_file)
+
+    def iter_listed_paths(self, paths, root=None, ignore_file=None, include_hidden=False, archive_dive=True, source="the file list"):
+        """
+        Lazily yield the listed files that pass the ignore pattern rules, in list order, without walking any directory.
+
+        Ignore patterns (and `.sumbuddyignore` files on the way down from the root) are applied as
+        if the file had been found by walking `root`. Listed paths that are missing, directories
+        or special files are skipped with a warning; repeated paths are yielded once.
+
+        Parameters:
+        ------------
+        paths - Iterable of Strings. Files to consider, e.g. from iter_file_list. Relative paths are relative to root if given, else to the current directory.
+        root - String [optional]. Directory the list is relative to, and against which ignore patterns are matched. Default: the current directory; files outside it are matched by their absolute path.
+        ignore_file - String [optional]. Filepath for the ignore patterns file.
+        include_hidden - Boolean [optional]. Whether to include hidden files.
+        archive_dive - Boolean [optional]. Whether to flag supported archives so callers can descend into their members. Default is True.
+        source - String [optional]. Name of the list, for error messages.
+
+        Yields:
+        ---------
+        Tuples of (file_path, stat_result, is_archive), as iter_file_paths.
+
+        Raises:
+        -------
+        NotADirectoryError - Immediately, if root is given and is not a directory.
+        NoListedFilesError, NoFilesAfterFilteringError - Once the list is exhausted, if nothing was yielded.
+        """
+        if root is not None and not os.path.isdir(root):
+            raise NotADirectoryError(root)
+
+        self.reset_filter(ignore_file=ignore_file, include_hidden=include_hidden)
+        return self._iter_listed_paths(paths, root, ignore_file, archive_dive, source)
+
+    def _iter_listed_paths(self, paths, root, ignore_file, archive_dive, source):
+        base = root or os.curdir
+        seen = set()
+        # Ignore layers by directory; lists usually name many files per directory
+        layer_cache = {}
+        has_files = False
+        has_included = False
+        for path in paths:
+            file_path = os.path.normpath(path if root is None else os.path.join(root, path))
+            if file_path in seen:
+                continue
+            seen.add(file_path)
+            try:
+                file_stat = os.stat(file_path)
+            except OSError as e:
+                print(f"Warning: skipping listed path {file_path}: {e.strerror}", file=sys.stderr)
+                continue
+            if stat.S_ISDIR(file_stat.st_mode):
+                print(f"Warning: skipping listed directory {file_path}; pass it as an input path to hash its contents", file=sys.stderr)
+                continue
+            if not stat.S_ISREG(file_stat.st_mode):
+                print(f"Warning: skipping special file {file_path}", file=sys.stderr)
+                continue
+            has_files = True
+
+            directory, name = os.path.split(file_path)
+            if name in self._excluded_names:
+                try:
+                    parent_stat = os.stat(directory or os.curdir)
+                except OSError:
+                    parent_stat = None
+                if parent_stat and (parent_stat.st_dev, parent_stat.st_ino, name) in self._excluded:
+                    continue
 
-        for root, dirs, files in os.walk(input_directory):
-            if files:
-                has_files = True
-            for name in files:
-                file_path = os.path.normpath(os.path.join(root, name))
-                if self.filter_manager.should_include(file_path, root_directory):
-                    if archive_dive and self.archive_handler.is_supported_archive(file_path):
-                        archive_files.append(file_path)
-                    else:
-                        regular_files.append(file_path)
+            # Files outside the root are matched by their absolute path, rather than a '../' path that would look hidden
+            filter_root = base
+            if os.path.relpath(file_path, base).startswith(os.pardir):
+                filter_root = os.path.abspath(os.sep)
+                file_path_for_filter = os.path.abspath(file_path)
+            else:
+                file_path_for_filter = file_path
+            layers = ()
+            if self.local_ignores:
+                key = (filter_root, directory)
+                layers = layer_cache.get(key)
+                if layers is None:
+                    if len(layer_cache) >= 4096:
+                        layer_cache.clear()
+                    layers = layer_cache[key] = self.filter_manager.local_layers(os.path.dirname(file_path_for_filter) or os.curdir, filter_root)
+            if self.filter_manager.should_include(file_path_for_filter, filter_root, layers):
+                has_included = True
+                yield file_path, file_stat, archive_dive and self.archive_handler.is_supported_archive(file_path)
 
         if not has_files:
+            raise NoListedFilesError(source)
+        if not has_included:
+            raise NoFilesAfterFilteringError(source, ignore_file)
+
+    def iter_storage_paths(self, storage, prefix="", ignore_file=None, include_hidden=False):
+        """
+        Lazily yield the objects under a key prefix of a storage backend that pass the ignore pattern rules, in listing order.
+
+        Patterns are matched against keys relative to the prefix's "directory" (see sumbuddy.storage.prefix_root), as
+        for a walked directory. Per-directory `.sumbuddyignore` files and archive dive do not apply to object stores.
+
+        Parameters:
+        ------------
+        storage - sumbuddy.storage.StorageBackend. Backend to list, e.g. an S3Storage.
+        prefix - String [optional]. Key prefix to list. Default: the whole bucket.
+        ignore_file - String [optional]. Filepath for the ignore patterns file.
+        include_hidden - Boolean [optional]. Whether to include hidden files.
+
+        Yields:
+        ---------
+        sumbuddy.storage.ObjectInfo for each included object.
+
+        Raises:
+        -------
+        EmptyInputDirectoryError, NoFilesAfterFilteringError - Once the listing is exhausted, if nothing was yielded.
+        """
+        self.reset_filter(ignore_file=ignore_file, include_hidden=include_hidden)
+        return self._iter_storage_paths(storage, prefix, ignore_file)
+
+    def _iter_storage_paths(self, storage, prefix, ignore_file):
+        from sumbuddy.storage import prefix_root
+
+        root = prefix_root(prefix) or os.curdir
+        has_objects = False
+        has_included = False
+        for info in storage.list(prefix):
+            has_objects = True
+            if self.filter_manager.should_include(info.path, root):
+                has_included = True
+                yield info
+
+        if not has_objects:
+            raise EmptyInputDirectoryError(storage.url(prefix))
+        if not has_included:
+            raise NoFilesAfterFilteringError(storage.url(prefix), ignore_file)
+
+    def gather_file_table(self, input_directory, ignore_file=None, include_hidden=False, archive_dive=True):
+        """
+        Collect the files in the input directory that pass the ignore pattern rules into a compact FileTable.
+
+        Same selection rules and errors as gather_file_paths, but paths are stored as a directory
+        id plus a basename rather than as a list of strings, for trees with tens of millions of files.
+
+        Returns:
+        ---------
+        FileTable. Archives are flagged (see FileTable.paths(archives=True)) when archive_dive is True.
+        """
+        from sumbuddy.filetable import FileTable
+
+        if not os.path.isdir(input_directory):
+            raise NotADirectoryError(input_directory)
+        self.reset_filter(ignore_file=ignore_file, include_hidden=include_hidden)
+
+        table = FileTable()
+        root_directory = os.path.abspath(input_directory)
+        has_files = False
+        current_directory = normalized_directory = None
+        for directory, name, _, layers in self._walk(input_directory):
+            has_files = True
+            if directory is not current_directory:
+                current_directory, normalized_directory = directory, os.path.normpath(directory)
+            file_path = name if normalized_directory == os.curdir else os.path.join(normalized_directory, name)
+            if self.filter_manager.should_include(file_path, root_directory, layers):
+                table.append(normalized_directory, name, archive_dive and self.archive_handler.is_supported_archive(file_path))
+
+        if not has_files and not self.pruned_directories:
             raise EmptyInputDirectoryError(input_directory)
-        if not (regular_files or archive_files):
+        if not table:
             raise NoFilesAfterFilteringError(input_directory, ignore_file)
+        return table
+
+    def gather_file_paths(self, input_directory, ignore_file=None, include_hidden=False, archive_dive=True):
+        """
+        Generate list of file paths in the input directory based on ignore pattern rules.
 
+        Parameters:
+        ------------
+        input_directory - String. Directory to traverse for files.
+        ignore_file - String [optional]. Filepath for the ignore patterns file.
+        include_hidden - Boolean [optional]. Whether to include hidden files.
+        archive_dive - Boolean [optional]. Whether to classify supported archives separately so callers can descend into their members. When False, archive files are returned with regular_files. Default is True.
+
+        Returns:
+        ---------
+        regular_files - List. Files in input_directory that are not ignored. When archive_dive is True, this excludes supported archives. When False, it includes them.
+        archive_files - List. Archive files in input_directory that are not ignored and should be expanded by the caller.
+        """
+        regular_files = []
+        archive_files = []
+        for file_path, _, is_archive in self.iter_file_paths(input_directory, ignore_file=ignore_file, include_hidden=include_hidden, archive_dive=archive_dive):
+            (archive_files if is_archive else regular_files).append(file_path)
         return regular_files, archive_files
@@ -0,0 +1,103 @@
+import json
+import sqlite3
+
+from sumbuddy.archive import ArchiveHandler
+
+# Archives stored between commits; a crash loses at most these, which are simply hashed again next run
+_COMMIT_EVERY = 256
+
+
+class MemberCache:
+    """
+    Persistent cache of archive member digests, in a SQLite file shared across runs.
+
+    An archive's member rows are stored under a key identifying that exact archive, and an
+    unchanged archive then yields all of its rows from the cache without any member being
+    decompressed. By default the key is the archive's device, inode, size and mtime_ns plus a
+    digest of its central directory (which lists every member's CRC-32 and sizes, and is read
+    from the end of the file). With `strict`, the key is the full digest of the archive itself,
+    which the run computes anyway for the archive's own row; it also matches identical copies
+    of an archive anywhere in the tree.
+
+    Entries are kept per checksum label, so digests of one algorithm are never served for another.
+    Use it from a single thread; it is a context manager, and close() commits pending entries.
+    """
+
+    def __init__(self, path, strict=False):
+        """
+        Parameters:
+        ------------
+        path - String. Filepath of the SQLite cache; created if missing.
+        strict - Boolean [optional]. Key on the archive's full digest rather than its stat and central directory. Default is False.
+        """
+        self.path = path
+        self.strict = strict
+        self.archive_handler = ArchiveHandler()
+        self.hits = 0
+        self.misses = 0
+        self._uncommitted = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS archives (
+                label TEXT NOT NULL,
+                key TEXT NOT NULL,
+                members TEXT NOT NULL,
+                PRIMARY KEY (label, key)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def archive_key(self, archive_path, archive_stat, archive_digest):
+        """
+        Key identifying the current content of an archive, or None if it cannot be identified (no readable central directory).
+
+        Parameters:
+        ------------
+        archive_path - String. Filesystem path of the archive.
+        archive_stat - os.stat_result. Stat of the archive, taken before it was hashed.
+        archive_digest - String. Digest of the whole archive, as written in its own row.
+        """
+        if self.strict:
+            return f"digest:{archive_digest}"
+        try:
+            directory_digest = self.archive_handler.central_directory_digest(archive_path)
+        except OSError:
+            return None
+        if directory_digest is None:
+            return None
+        return f"stat:{archive_stat.st_dev}:{archive_stat.st_ino}:{archive_stat.st_size}:{archive_stat.st_mtime_ns}:{directory_digest}"
+
+    def get(self, key, label):
+        """
+        Return the cached (member name, size, digest) tuples for an archive key, in central-directory order, or None.
+        """
+        row = self.connection.execute("SELECT members FROM archives WHERE label = ? AND key = ?", (label, key)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [tuple(member) for member in json.loads(row[0])]
+
+    def put(self, key, label, members):
+        """Store the (member name, size, digest) tuples of a fully hashed archive."""
+        self.connection.execute("INSERT OR REPLACE INTO archives VALUES (?, ?, ?)", (label, key, json.dumps(members)))
+        self._uncommitted += 1
+        if self._uncommitted >= _COMMIT_EVERY:
+            self.connection.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
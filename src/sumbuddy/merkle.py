@@ -0,0 +1,199 @@
+import csv
+import os
+from collections import deque
+
+from sumbuddy.hasher import Hasher
+
+DIRECTORY = "directory"
+ARCHIVE = "archive"
+
+
+class _Node:
+    """A directory (or archive member set): child name -> _Node or file digest bytes. `digest` is None while dirty."""
+
+    __slots__ = ("children", "digest")
+
+    def __init__(self):
+        self.children = {}
+        self.digest = None
+
+
+class DirectoryDigests:
+    """
+    Merkle-style aggregate digests for every directory under a root, and for the member set of every archive.
+
+    A directory's digest covers the sorted names, kinds and digests of its children, so two
+    trees with equal root digests have identical contents, and a subtree whose digest matches
+    need not be examined further. An archive counts as a file in its parent (by its own
+    checksum); its members get a separate tree. Updates only mark the path to the root dirty,
+    so after changing a few files, digest() rehashes just those directories.
+    """
+
+    def __init__(self, root, algorithm="md5", length=None, label=None):
+        """
+        Parameters:
+        ------------
+        root - String. Directory that the added paths are below.
+        algorithm - String [optional]. Algorithm combining the children's digests. Default: 'md5'.
+        length - Integer [optional]. Digest length for SHAKE and BLAKE algorithms in bytes.
+        label - String [optional]. Label of the file digests added, e.g. 'fp-md5-1KiB' or 'tree-sha256-64MiB', which the CSV column carries so digests of different kinds are never compared. Default: the algorithm.
+        """
+        self.root = os.path.normpath(root)
+        self.algorithm = algorithm
+        self.length = length
+        self.label = label or algorithm
+        self._hasher = Hasher(algorithm)
+        self._tree = _Node()
+        self._archives = {}
+
+    def _parts(self, filepath):
+        relative = os.path.relpath(filepath, self.root)
+        if relative == "." or relative.startswith(".." + os.sep):
+            raise ValueError(f"'{filepath}' is not below '{self.root}'")
+        return relative.split(os.sep)
+
+    @staticmethod
+    def _insert(node, parts, digest):
+        # Mark every directory on the way down dirty, then set the leaf
+        node.digest = None
+        for part in parts[:-1]:
+            child = node.children.get(part)
+            if not isinstance(child, _Node):
+                child = node.children[part] = _Node()
+            child.digest = None
+            node = child
+        node.children[parts[-1]] = digest
+
+    def add_file(self, filepath, checksum):
+        """Record (or update) the checksum of a file under the root."""
+        self._insert(self._tree, self._parts(filepath), bytes.fromhex(checksum))
+
+    def add_member(self, archive_path, member, checksum):
+        """Record the checksum of an archive member; `member` is its name inside the archive."""
+        archive_path = os.path.normpath(archive_path)
+        node = self._archives.setdefault(archive_path, _Node())
+        self._insert(node, member.rstrip("/").split("/"), bytes.fromhex(checksum))
+
+    def remove(self, filepath):
+        """Forget a file, or a whole directory, together with any archive member sets below it."""
+        filepath = os.path.normpath(filepath)
+        parts = self._parts(filepath)
+        node = self._tree
+        path = []
+        for part in parts[:-1]:
+            path.append(node)
+            node = node.children.get(part)
+            if not isinstance(node, _Node):
+                return
+        if node.children.pop(parts[-1], None) is None:
+            return
+        for ancestor in path + [node]:
+            ancestor.digest = None
+        prefix = filepath + os.sep
+        for archive_path in [a for a in self._archives if a == filepath or a.startswith(prefix)]:
+            del self._archives[archive_path]
+
+    def _digest(self, node):
+        if node.digest is None:
+            hash_func = self._hasher.new_hash(self.algorithm, self.length)
+            for name_bytes, name in sorted((os.fsencode(name), name) for name in node.children):
+                child = node.children[name]
+                if isinstance(child, _Node):
+                    kind, child_digest = b"d", self._digest(child)
+                else:
+                    kind, child_digest = b"f", child
+                hash_func.update(kind + len(name_bytes).to_bytes(4, "big") + name_bytes + len(child_digest).to_bytes(2, "big") + child_digest)
+            node.digest = bytes.fromhex(self._hasher.hexdigest(hash_func, self.length))
+        return node.digest
+
+    def digest(self, dirpath=None):
+        """
+        Return the hex digest of a directory (default: the root) or of an archive's member set.
+
+        Raises:
+        -------
+        KeyError - If `dirpath` is not a known directory or archive.
+        """
+        if dirpath is None:
+            return self._digest(self._tree).hex()
+        dirpath = os.path.normpath(dirpath)
+        if dirpath in self._archives:
+            return self._digest(self._archives[dirpath]).hex()
+        node = self._tree
+        for part in [] if dirpath == self.root else self._parts(dirpath):
+            node = node.children.get(part)
+            if not isinstance(node, _Node):
+                raise KeyError(dirpath)
+        return self._digest(node).hex()
+
+    def rows(self):
+        """
+        Yield (dirpath, kind, hex digest) for every directory and archive, parents before children, siblings sorted.
+        """
+        pending = deque([(self.root, DIRECTORY, self._tree)])
+        while pending:
+            dirpath, kind, node = pending.popleft()
+            yield dirpath, kind, self._digest(node).hex()
+            for name in sorted(node.children, key=os.fsencode):
+                child_path = os.path.normpath(os.path.join(dirpath, name))
+                child = node.children[name]
+                if isinstance(child, _Node):
+                    pending.append((child_path, DIRECTORY, child))
+                elif kind == DIRECTORY and child_path in self._archives:
+                    pending.append((child_path, ARCHIVE, self._archives[child_path]))
+
+    def write_csv(self, output_filepath):
+        """Write rows() to a CSV with columns dirpath, kind and dir-<label>, e.g. dir-md5 or dir-fp-md5-1KiB."""
+        with open(output_filepath, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["dirpath", "kind", f"dir-{self.label}"])
+            writer.writerows(self.rows())
+
+
+def load_directory_digests(csv_path):
+    """
+    Read a directory-digest CSV written by DirectoryDigests.write_csv.
+
+    Returns:
+    ---------
+    Dict mapping each path relative to the tree's root ('.' for the root) to a (kind, digest) tuple.
+    """
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        rows = list(reader)
+    if not rows:
+        return {}
+    root = rows[0][0]
+    return {os.path.relpath(dirpath, root): (kind, digest) for dirpath, kind, digest in rows}
+
+
+def changed_directories(digests_a, digests_b):
+    """
+    Compare two replicas top-down and yield the relative paths of directories and archives that differ.
+
+    Subtrees whose digests match are not descended into. Paths present on only one side
+    are yielded without descending further.
+
+    Parameters:
+    ------------
+    digests_a, digests_b - Dicts as returned by load_directory_digests.
+
+    Yields:
+    ---------
+    Relative paths ('.' for the root), parents before children.
+    """
+    children = {}
+    for relative in set(digests_a) | set(digests_b):
+        if relative != ".":
+            children.setdefault(os.path.dirname(relative) or ".", []).append(relative)
+
+    pending = deque(["."])
+    while pending:
+        relative = pending.popleft()
+        a, b = digests_a.get(relative), digests_b.get(relative)
+        if a == b:
+            continue
+        yield relative
+        if a is not None and b is not None:
+            pending.extend(sorted(children.get(relative, [])))
@@ -0,0 +1,80 @@
+import queue
+import threading
+
+DEFAULT_PIPELINE_BUFFER_SIZE = 1024 * 1024
+DEFAULT_PIPELINE_BUFFERS = 4
+
+
+class PipelinedReader:
+    """
+    Read a binary file on a background thread into a fixed ring of preallocated buffers.
+
+    The I/O thread fills free buffers with readinto() while the consumer processes the filled
+    ones, so reading the next block overlaps with hashing the current one: the read blocks in
+    the kernel and hashlib releases the GIL for large updates. Memory stays at
+    `buffers * buffer_size` bytes whatever the file size.
+
+    Iterate to get memoryviews of the filled buffers, in file order. Each view is only valid
+    until the next one is requested, since its buffer then goes back to the I/O thread.
+    Read errors are raised from the iteration. Use as a context manager (or call close())
+    to stop the I/O thread when the iteration is abandoned early.
+    """
+
+    def __init__(self, file_obj, buffer_size=DEFAULT_PIPELINE_BUFFER_SIZE, buffers=DEFAULT_PIPELINE_BUFFERS):
+        if buffers < 2:
+            raise ValueError("A pipelined reader needs at least two buffers")
+        self._file = file_obj
+        self._free = queue.Queue()
+        self._filled = queue.Queue()
+        for _ in range(buffers):
+            self._free.put(bytearray(buffer_size))
+        self._closed = False
+        self._thread = threading.Thread(target=self._fill, name="sumbuddy-reader", daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        try:
+            while True:
+                buffer = self._free.get()
+                if buffer is None:
+                    return
+                count = self._file.readinto(buffer)
+                if not count:
+                    self._filled.put((None, 0))
+                    return
+                self._filled.put((buffer, count))
+        except BaseException as e:  # noqa: BLE001 - handed to the consumer, which re-raises it
+            self._filled.put((e, 0))
+
+    def __iter__(self):
+        previous = None
+        try:
+            while True:
+                buffer, count = self._filled.get()
+                if previous is not None:
+                    self._free.put(previous)
+                    previous = None
+                if buffer is None:
+                    return
+                if isinstance(buffer, BaseException):
+                    raise buffer
+                previous = buffer
+                yield memoryview(buffer)[:count]
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the I/O thread and wait for it; the file itself is left open."""
+        if self._closed:
+            return
+        self._closed = True
+        # Wakes the I/O thread if it is waiting for a free buffer; a read in progress finishes first
+        self._free.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
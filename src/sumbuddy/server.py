@@ -0,0 +1,284 @@
+import errno
+import json
+import os
+import socket
+import socketserver
+import stat
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from sumbuddy.cache import HashCache
+from sumbuddy.checksums import _iter_checksums
+from sumbuddy.exceptions import ServerAlreadyRunningError, ServerRequestError
+
+# Request keys accepted by the server, with their defaults (mirroring get_checksums)
+REQUEST_OPTIONS = {
+    "ignore_file": None,
+    "include_hidden": False,
+    "algorithm": "md5",
+    "length": None,
+    "archive_dive": True,
+    "local_ignores": True,
+}
+
+
+def default_socket_path():
+    """
+    Return the default Unix socket path: $XDG_RUNTIME_DIR/sum-buddy.sock, else a per-user file in /tmp.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "sum-buddy.sock")
+    return f"/tmp/sum-buddy-{os.getuid()}.sock"
+
+
+def _is_socket(path):
+    """Whether `path` itself (not a symlink's target) is a socket."""
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except FileNotFoundError:
+        return False
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Reads one JSON request per line and streams JSON-line records back, ending with a summary line."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                self._respond(line)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    def _respond(self, line):
+        count = 0
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict) or "input_path" not in request:
+                raise ValueError("Request must be a JSON object with an 'input_path' key")
+            unknown = set(request) - set(REQUEST_OPTIONS) - {"input_path"}
+            if unknown:
+                raise ValueError(f"Unknown request options: {', '.join(sorted(unknown))}")
+            for record in self.server.checksum_server.iter_records(**request):
+                self._send(record)
+                count += 1
+        except (BrokenPipeError, ConnectionResetError):
+            raise
+        except Exception as e:  # noqa: BLE001 - any failure is reported to the client, not fatal to the server
+            self._send({"error": str(e), "type": type(e).__name__})
+            return
+        self._send({"done": True, "count": count})
+
+    def _send(self, message):
+        self.wfile.write(json.dumps(message).encode() + b"\n")
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ChecksumServer:
+    """
+    Resident checksum service listening on a Unix domain socket.
+
+    Every connection shares one warm thread pool and one HashCache, so repeated requests
+    for unchanged files are answered without rereading them.
+    """
+
+    def __init__(self, socket_path=None, workers=None, cache=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = HashCache() if cache is None else cache
+        self._executor = None
+        self._server = None
+        self._serving = False
+
+    def start(self):
+        """
+        Bind the socket and start the worker pool. A stale socket file left by a dead server is replaced.
+
+        Raises:
+        -------
+        ServerAlreadyRunningError - If another server is accepting connections on the socket path.
+        FileExistsError - If something other than a socket exists at the socket path; it is left untouched.
+        """
+        if os.path.lexists(self.socket_path):
+            if not _is_socket(self.socket_path):
+                raise FileExistsError(errno.EEXIST, "Not a socket; refusing to replace it with the server's socket", self.socket_path)
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(self.socket_path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    os.unlink(self.socket_path)
+                else:
+                    raise ServerAlreadyRunningError(self.socket_path)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sum-buddy")
+        # The socket grants read access to anything the server can read, so keep it owner-only
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _UnixServer(self.socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.checksum_server = self
+        return self
+
+    def serve_forever(self, poll_interval=0.5):
+        """Handle requests until shutdown() is called from another thread (or the process is interrupted)."""
+        if self._server is None:
+            self.start()
+        self._serving = True
+        try:
+            self._server.serve_forever(poll_interval=poll_interval)
+        finally:
+            self._serving = False
+
+    def shutdown(self):
+        """Stop serve_forever(); safe to call from any thread other than the one serving."""
+        if self._server is not None and self._serving:
+            self._server.shutdown()
+
+    def close(self):
+        """Release the socket and the worker pool."""
+        if self._server is not None:
+            self._server.server_close()
+            self._server = None
+            # Only our socket is removed, never a file that replaced it while the server ran
+            if _is_socket(self.socket_path):
+                os.unlink(self.socket_path)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.close()
+
+    def _ordered_map(self, fn, items):
+        """Like Executor.map, but with a bounded number of in-flight tasks so huge trees do not queue all at once."""
+        window = deque()
+        limit = self.workers * 4
+        try:
+            for item in items:
+                window.append(self._executor.submit(fn, item))
+                if len(window) >= limit:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+        finally:
+            for future in window:
+                future.cancel()
+
+    def iter_records(self, input_path, ignore_file=None, include_hidden=False, algorithm="md5", length=None, archive_dive=True, local_ignores=True):
+        """
+        Yield one record dict per file (and archive member) with the same selection rules as get_checksums.
+
+        Records come from the same pipeline as sumbuddy.iter_checksums: files are hashed on the shared pool, with
+        digests reused from the shared cache while the files are unchanged, and archive members are spread over the pool too.
+
+        Yields:
+        ---------
+        Dicts with keys 'filepath', 'filename', 'algorithm' and 'checksum'.
+        """
+        entries, entry_records, close = _iter_checksums(
+            input_path,
+            ignore_file=ignore_file,
+            include_hidden=include_hidden,
+            algorithm=algorithm,
+            length=length,
+            archive_dive=archive_dive,
+            local_ignores=local_ignores,
+            workers=self.workers,
+            cache=self.cache,
+            executor=self._executor,
+            per_entry=True,
+        )
+        archive_entries = []
+
+        def regular_entries():
+            for entry in entries:
+                if entry[2]:
+                    # Archives follow the regular files, as in the CSV layout
+                    archive_entries.append(entry)
+                else:
+                    yield entry
+
+        def hash_entry(entry):
+            return list(entry_records(*entry))
+
+        def message(record):
+            return {"filepath": record.path, "filename": record.name, "algorithm": record.algorithm, "checksum": record.digest}
+
+        try:
+            for records in self._ordered_map(hash_entry, regular_entries()):
+                for record in records:
+                    yield message(record)
+            # Archives run on this thread: their members are hashed on the pool, which a pool task waiting for them could exhaust
+            for entry in archive_entries:
+                for record in entry_records(*entry):
+                    yield message(record)
+        finally:
+            close()
+
+
+def request_checksums(input_path, socket_path=None, **options):
+    """
+    Ask a running server for checksums and return an iterator over its records as they arrive.
+
+    The connection is made before returning, so a missing server is reported immediately.
+    Relative paths are resolved here, since the server has its own working directory;
+    returned filepaths are rewritten to start with `input_path` as given.
+
+    Parameters:
+    ------------
+    input_path - String. File or directory to checksum.
+    socket_path - String [optional]. Server socket; defaults to default_socket_path().
+    options - Keyword arguments accepted by get_checksums: ignore_file, include_hidden, algorithm, length, archive_dive, local_ignores.
+
+    Returns:
+    ---------
+    Iterator of dicts with keys 'filepath', 'filename', 'algorithm' and 'checksum'.
+
+    Raises:
+    -------
+    FileNotFoundError or ConnectionRefusedError - If no server is listening on the socket.
+    ServerRequestError - While iterating, if the server reports an error for the request.
+    """
+    unknown = set(options) - set(REQUEST_OPTIONS)
+    if unknown:
+        raise TypeError(f"Unknown options: {', '.join(sorted(unknown))}")
+
+    absolute_input = os.path.abspath(input_path)
+    request = {"input_path": absolute_input, **options}
+    if request.get("ignore_file"):
+        request["ignore_file"] = os.path.abspath(request["ignore_file"])
+    display_root = os.path.normpath(input_path)
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path or default_socket_path())
+        sock.sendall(json.dumps(request).encode() + b"\n")
+    except OSError:
+        sock.close()
+        raise
+
+    def read_records():
+        with sock, sock.makefile("rb") as stream:
+            for line in stream:
+                message = json.loads(line)
+                if "error" in message:
+                    raise ServerRequestError(message.get("type", "Error"), message["error"])
+                if message.get("done"):
+                    return
+                relative = os.path.relpath(message["filepath"], absolute_input)
+                message["filepath"] = display_root if relative == "." else os.path.normpath(os.path.join(display_root, relative))
+                yield message
+        raise ServerRequestError("ConnectionError", "connection closed before the response was complete")
+
+    return read_records()
+
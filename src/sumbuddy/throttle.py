@@ -0,0 +1,141 @@
+import os
+import platform
+import threading
+import time
+
+# ioprio_set(2) syscall numbers, which differ between architectures (Python has no binding for it)
+_IOPRIO_SET_SYSCALLS = {
+    "x86_64": 251,
+    "i386": 289,
+    "i686": 289,
+    "aarch64": 30,
+    "riscv64": 30,
+    "armv7l": 314,
+    "ppc64le": 273,
+    "s390x": 282,
+}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+IO_CLASSES = {"best-effort": 2, "idle": 3}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, holding at most `burst` unused tokens.
+
+    acquire() always takes its tokens, going into debt if needed, and then sleeps until the
+    debt would have been refilled. Callers sharing a bucket are therefore held to `rate` on
+    average whatever the size of each request, without any one of them being starved.
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class Throttle:
+    """
+    Limits on bytes read and files opened per second, shared by every reader and worker thread of a run.
+
+    Parameters:
+    ------------
+    bytes_per_second - Number [optional]. Maximum average read throughput. Default is None, i.e. unlimited.
+    files_per_second - Number [optional]. Maximum average number of files (and archive members) opened per second. Default is None, i.e. unlimited.
+    """
+
+    def __init__(self, bytes_per_second=None, files_per_second=None):
+        self._bytes = TokenBucket(bytes_per_second) if bytes_per_second else None
+        self._files = TokenBucket(files_per_second) if files_per_second else None
+
+    def consume(self, nbytes):
+        """Account for `nbytes` just read, sleeping as needed to hold the byte rate."""
+        if self._bytes and nbytes:
+            self._bytes.acquire(nbytes)
+
+    def open_file(self):
+        """Account for one file about to be opened, sleeping as needed to hold the file rate."""
+        if self._files:
+            self._files.acquire()
+
+    def wrap(self, file_obj):
+        """Return `file_obj` with its reads counted against the byte rate."""
+        if self._bytes is None:
+            return file_obj
+        return ThrottledReader(file_obj, self)
+
+
+class ThrottledReader:
+    """File-like wrapper charging read() and readinto() to a Throttle; everything else is delegated."""
+
+    def __init__(self, file_obj, throttle):
+        self._file = file_obj
+        self._throttle = throttle
+
+    def read(self, size=-1):
+        data = self._file.read(size)
+        self._throttle.consume(len(data))
+        return data
+
+    def readinto(self, buffer):
+        count = self._file.readinto(buffer)
+        self._throttle.consume(count or 0)
+        return count
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+        return False
+
+
+def set_io_priority(io_class, level=7):
+    """
+    Set the Linux I/O scheduling class of the calling process, as `ionice` does.
+
+    Threads started afterwards inherit it, so call this before hashing starts. Only I/O
+    schedulers that honour priorities (BFQ, and CFQ on older kernels) act on it.
+
+    Parameters:
+    ------------
+    io_class - String. 'idle' (disk time only when no other process needs it) or 'best-effort'.
+    level - Integer [optional]. Priority within best-effort, 0 (highest) to 7 (lowest). Default: 7.
+
+    Raises:
+    -------
+    ValueError - For an unknown class or level.
+    OSError - If the platform has no ioprio_set or the call fails.
+    """
+    if io_class not in IO_CLASSES:
+        raise ValueError(f"Unknown I/O class '{io_class}'; use one of: {', '.join(IO_CLASSES)}")
+    if not 0 <= level <= 7:
+        raise ValueError("I/O priority level must be between 0 and 7")
+    syscall_number = _IOPRIO_SET_SYSCALLS.get(platform.machine())
+    if not platform.system() == "Linux" or syscall_number is None:
+        raise OSError(f"Setting the I/O scheduling class is not supported on {platform.system()} {platform.machine()}")
+
+    import ctypes
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    priority = (IO_CLASSES[io_class] << _IOPRIO_CLASS_SHIFT) | (level if io_class == "best-effort" else 0)
+    if libc.syscall(syscall_number, _IOPRIO_WHO_PROCESS, 0, priority) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"ioprio_set failed: {os.strerror(errno)}")
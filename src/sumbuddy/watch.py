@@ -0,0 +1,395 @@
+import ctypes
+import os
+import select
+import sqlite3
+import struct
+import sys
+import time
+
+from sumbuddy.exceptions import (
+    EmptyInputDirectoryError,
+    NoFilesAfterFilteringError,
+    WatchNotSupportedError,
+)
+from sumbuddy.filter import LOCAL_IGNORE_FILENAME
+from sumbuddy.hasher import Hasher
+from sumbuddy.mapper import Mapper
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """
+    Minimal ctypes binding to Linux inotify: add watches and read (wd, mask, name) events.
+    """
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise WatchNotSupportedError(f"platform is {sys.platform}")
+        try:
+            self._libc = ctypes.CDLL(None, use_errno=True)
+            self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        except (OSError, AttributeError) as e:
+            raise WatchNotSupportedError(str(e)) from e
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise WatchNotSupportedError(os.strerror(ctypes.get_errno()))
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        """Watch a directory and return its watch descriptor; raises OSError if it cannot be watched."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def read_events(self, timeout):
+        """
+        Wait up to `timeout` seconds for events and return them as a list of (wd, mask, name) tuples.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _cookie, name_length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + name_length].rstrip(b"\0"))
+            offset += name_length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class ManifestDB:
+    """
+    SQLite manifest with one row per file or archive member, keyed by filepath.
+
+    Rows for archive members record their archive, so replacing or deleting an archive
+    drops its members too. Size and mtime are kept so a restarted watcher can skip
+    files that did not change while it was down.
+    """
+
+    def __init__(self, path, algorithm="md5", length=None):
+        self.path = path
+        # The watcher may be built in one thread and run in another; it is never used concurrently
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS checksums (
+                filepath TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                size INTEGER,
+                mtime_ns INTEGER,
+                archive TEXT
+            );
+            CREATE INDEX IF NOT EXISTS checksums_archive ON checksums (archive);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        # Digests made with other settings cannot be reused
+        settings = {"algorithm": algorithm, "length": "" if length is None else str(length)}
+        stored = dict(self.connection.execute("SELECT key, value FROM meta"))
+        if any(stored.get(key) != value for key, value in settings.items()):
+            with self.connection:
+                self.connection.execute("DELETE FROM checksums")
+                self.connection.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", settings.items())
+
+    def get_stat(self, filepath):
+        """Return (size, mtime_ns) recorded for a file, or None."""
+        return self.connection.execute("SELECT size, mtime_ns FROM checksums WHERE filepath = ?", (filepath,)).fetchone()
+
+    def upsert(self, filepath, checksum, size=None, mtime_ns=None, archive=None):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO checksums VALUES (?, ?, ?, ?, ?, ?)",
+            (filepath, os.path.basename(filepath), checksum, size, mtime_ns, archive),
+        )
+
+    def delete(self, filepath):
+        """Remove a file and, if it is an archive, its members."""
+        self.connection.execute("DELETE FROM checksums WHERE filepath = ? OR archive = ?", (filepath, filepath))
+
+    def delete_members(self, archive):
+        self.connection.execute("DELETE FROM checksums WHERE archive = ?", (archive,))
+
+    def delete_tree(self, directory):
+        """Remove every row under `directory`. '0' sorts right after '/', bounding the prefix range."""
+        self.connection.execute(
+            "DELETE FROM checksums WHERE filepath >= ? AND filepath < ?",
+            (directory + "/", directory + "0"),
+        )
+
+    def filepaths(self):
+        return {row[0] for row in self.connection.execute("SELECT filepath FROM checksums WHERE archive IS NULL")}
+
+    def rows(self):
+        """Yield (filepath, filename, checksum) in filepath order."""
+        yield from self.connection.execute("SELECT filepath, filename, checksum FROM checksums ORDER BY filepath")
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+class Watcher:
+    """
+    Keep a ManifestDB in sync with a directory: one full scan, then only created,
+    modified and deleted files, as reported by inotify.
+
+    A file is rehashed once it has been quiet for `debounce` seconds, so files still
+    being written are hashed once, after the writer finishes. The same ignore rules
+    as get_checksums apply.
+    """
+
+    def __init__(self, input_directory, manifest_path, ignore_file=None, include_hidden=False, algorithm="md5", length=None, archive_dive=True, debounce=2.0):
+        self.input_directory = input_directory
+        self.root_directory = os.path.abspath(input_directory)
+        self.ignore_file = ignore_file
+        self.include_hidden = include_hidden
+        self.algorithm = algorithm
+        self.length = length
+        self.archive_dive = archive_dive
+        self.debounce = debounce
+
+        self.mapper = Mapper()
+        # Set here as well as by every scan, since watches are placed (and ignored directories pruned) before the first scan
+        self.mapper.reset_filter(ignore_file=ignore_file, include_hidden=include_hidden)
+        self.hasher = Hasher(algorithm)
+        self.manifest = ManifestDB(manifest_path, algorithm=algorithm, length=length)
+        # SQLite writes its journal next to the database; none of these belong in the manifest
+        manifest_abs_path = os.path.abspath(manifest_path)
+        self._excluded = {manifest_abs_path + suffix for suffix in ("", "-journal", "-wal", "-shm")}
+
+        self.inotify = None
+        self._watches = {}
+        self._pending = {}
+        self._rescan = False
+
+    def _display_path(self, abs_path):
+        relative = os.path.relpath(abs_path, self.root_directory)
+        return os.path.normpath(os.path.join(self.input_directory, relative))
+
+    def _is_tracked(self, abs_path):
+        if abs_path in self._excluded:
+            return False
+        filter_manager = self.mapper.filter_manager
+        layers = filter_manager.local_layers(os.path.dirname(abs_path), self.root_directory)
+        return filter_manager.should_include(abs_path, self.root_directory, layers)
+
+    def _record(self, abs_path):
+        """Hash one file (and its members, for archives) into the manifest, unless it is unchanged."""
+        filepath = self._display_path(abs_path)
+        try:
+            stat_result = os.stat(abs_path)
+        except FileNotFoundError:
+            self.manifest.delete(filepath)
+            return
+        if not os.path.isfile(abs_path):
+            return
+        if self.manifest.get_stat(filepath) == (stat_result.st_size, stat_result.st_mtime_ns):
+            return
+
+        try:
+            checksum = self.hasher.checksum_file(abs_path, algorithm=self.algorithm, length=self.length)
+            members = []
+            if self.archive_dive and self.mapper.archive_handler.is_supported_archive(abs_path):
+                for member, file_obj in self.mapper.archive_handler.iter_members(abs_path):
+                    members.append((f"{filepath}/{member}", self.hasher.checksum_file(file_obj, algorithm=self.algorithm, length=self.length)))
+        except FileNotFoundError:
+            self.manifest.delete(filepath)
+            return
+
+        self.manifest.delete_members(filepath)
+        self.manifest.upsert(filepath, checksum, stat_result.st_size, stat_result.st_mtime_ns)
+        for member_path, member_checksum in members:
+            self.manifest.upsert(member_path, member_checksum, archive=filepath)
+
+    def _relative_directory(self, directory):
+        relative = os.path.relpath(directory, self.root_directory)
+        return '' if relative == os.curdir else relative
+
+    def _watch_tree(self, directory):
+        """
+        Add watches for `directory` and its subdirectories; return the files found in them.
+
+        Directories the ignore rules leave out entirely (see Filter.should_descend) are neither watched nor
+        walked, as in the Mapper's walk, so large ignored trees do not use up the user's inotify watches.
+        """
+        filter_manager = self.mapper.filter_manager
+        if directory != self.root_directory:
+            parent_layers = filter_manager.local_layers(os.path.dirname(directory), self.root_directory)
+            if not filter_manager.should_descend(self._relative_directory(directory), parent_layers):
+                return []
+        # Ignore layers in effect inside each directory about to be walked, its own ignore file included
+        layers_by_directory = {directory: filter_manager.local_layers(directory, self.root_directory)}
+        found = []
+        for root, dirs, files in os.walk(directory):
+            layers = layers_by_directory.pop(root)
+            try:
+                self._watches[self.inotify.add_watch(root)] = root
+            except (FileNotFoundError, NotADirectoryError):
+                dirs[:] = []
+                continue
+            found.extend(os.path.join(root, name) for name in files)
+            relative_root = self._relative_directory(root)
+            kept = []
+            for name in dirs:
+                relative_directory = os.path.join(relative_root, name) if relative_root else name
+                if not filter_manager.should_descend(relative_directory, layers):
+                    continue
+                ignore_filepath = os.path.join(root, name, LOCAL_IGNORE_FILENAME)
+                layer = filter_manager.load_local_ignore(relative_directory, ignore_filepath) if os.path.isfile(ignore_filepath) else None
+                layers_by_directory[os.path.join(root, name)] = layers + (layer,) if layer else layers
+                kept.append(name)
+            dirs[:] = kept
+        return found
+
+    def scan(self):
+        """
+        Full synchronization: hash new or changed files, drop rows for files that are gone.
+        """
+        try:
+            regular_files, archive_files = self.mapper.gather_file_paths(
+                self.input_directory,
+                ignore_file=self.ignore_file,
+                include_hidden=self.include_hidden,
+                archive_dive=self.archive_dive,
+            )
+        except (EmptyInputDirectoryError, NoFilesAfterFilteringError):
+            regular_files, archive_files = [], []
+
+        seen = set()
+        for path in regular_files + archive_files:
+            abs_path = os.path.abspath(path)
+            if abs_path in self._excluded:
+                continue
+            seen.add(self._display_path(abs_path))
+            self._record(abs_path)
+        for filepath in self.manifest.filepaths() - seen:
+            self.manifest.delete(filepath)
+        self.manifest.commit()
+
+    def _handle_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost; only a full rescan restores consistency
+            self._rescan = True
+            return
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return
+        directory = self._watches.get(wd)
+        if directory is None or not name:
+            return
+
+        abs_path = os.path.join(directory, name)
+        if name == LOCAL_IGNORE_FILENAME and not mask & IN_ISDIR:
+            # Changed ignore rules can add or drop files anywhere below this directory
+            self._rescan = True
+        if mask & IN_ISDIR:
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self.manifest.delete_tree(self._display_path(abs_path))
+                # A directory moved within the tree is re-added under its new name by IN_MOVED_TO
+                prefix = abs_path + os.sep
+                for stale_wd in [w for w, path in self._watches.items() if path == abs_path or path.startswith(prefix)]:
+                    del self._watches[stale_wd]
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                now = time.monotonic()
+                for path in self._watch_tree(abs_path):
+                    if self._is_tracked(path):
+                        self._pending[path] = now
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            self._pending.pop(abs_path, None)
+            if abs_path not in self._excluded:
+                self.manifest.delete(self._display_path(abs_path))
+        elif self._is_tracked(abs_path):
+            self._pending[abs_path] = time.monotonic()
+
+    def process_pending(self, now=None):
+        """Hash files that have been quiet for the debounce period; return how many were processed."""
+        if now is None:
+            now = time.monotonic()
+        ready = [path for path, last_event in self._pending.items() if now - last_event >= self.debounce]
+        for path in ready:
+            del self._pending[path]
+            self._record(path)
+        if ready:
+            self.manifest.commit()
+        return len(ready)
+
+    def start(self):
+        """Subscribe to inotify events, then run the initial scan (so nothing changing during it is missed)."""
+        self.inotify = Inotify()
+        self._watch_tree(self.root_directory)
+        self.scan()
+        return self
+
+    def poll(self, timeout=0.5):
+        """Read and handle one batch of events, then hash any files that are ready."""
+        for wd, mask, name in self.inotify.read_events(timeout):
+            self._handle_event(wd, mask, name)
+        self.manifest.commit()
+        if self._rescan:
+            self._rescan = False
+            self._pending.clear()
+            # Changed ignore rules may bring back directories that were left unwatched
+            self._watch_tree(self.root_directory)
+            self.scan()
+        self.process_pending()
+
+    def run(self, stop_event=None, poll_interval=0.5):
+        """
+        Keep the manifest up to date until `stop_event` (a threading.Event) is set or the process is interrupted.
+        """
+        if self.inotify is None:
+            self.start()
+        while stop_event is None or not stop_event.is_set():
+            timeout = poll_interval
+            if self._pending:
+                # Wake up in time for the earliest file whose debounce period ends
+                earliest = min(self._pending.values()) + self.debounce - time.monotonic()
+                timeout = max(0.0, min(poll_interval, earliest))
+            self.poll(timeout)
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        self.manifest.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
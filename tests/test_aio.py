@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import threading
+import time
+from contextlib import aclosing
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from sumbuddy import aio, iter_checksums
+from sumbuddy.exceptions import EmptyInputDirectoryError
+from sumbuddy.hasher import Hasher
+from sumbuddy.membercache import MemberCache
+from sumbuddy.throttle import ThrottledReader
+
+TEST_ZIP = Path(__file__).parent / "test_archive.zip"
+
+
+class SlowThrottle:
+    """Throttle interface that sleeps on every block read, so reads are still in progress when a test cancels them."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+
+    def consume(self, nbytes):
+        time.sleep(self.delay)
+
+    def open_file(self):
+        pass
+
+    def wrap(self, file_obj):
+        return ThrottledReader(file_obj, self)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = tmp_path / "data"
+    (data_dir / "sub").mkdir(parents=True)
+    for i in range(12):
+        (data_dir / f"file{i}.txt").write_bytes(f"content {i}".encode())
+    (data_dir / "sub" / "nested.bin").write_bytes(bytes(range(256)) * 100)
+    os.link(data_dir / "file0.txt", data_dir / "sub" / "link0.txt")
+    shutil.copy2(TEST_ZIP, data_dir / "bundle.zip")
+    return data_dir
+
+
+def open_paths_under(directory):
+    directory = str(directory)
+    paths = []
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            target = os.readlink(f"/proc/self/fd/{fd}")
+        except OSError:
+            continue
+        if target.startswith(directory):
+            paths.append(target)
+    return paths
+
+
+async def collect(input_path, **options):
+    return [record async for record in aio.iter_checksums(input_path, **options)]
+
+
+def test_same_records_as_iter_checksums(data_dir):
+    records = asyncio.run(collect(str(data_dir), concurrency=4, algorithm="sha256"))
+    assert sorted(records) == sorted(iter_checksums(str(data_dir), algorithm="sha256"))
+
+
+def test_archive_members_follow_their_archive(data_dir):
+    paths = [record.path for record in asyncio.run(collect(str(data_dir), concurrency=4))]
+    archive = str(data_dir / "bundle.zip")
+    members = [i for i, path in enumerate(paths) if path.startswith(archive + "/")]
+    assert members
+    assert all(i > paths.index(archive) for i in members)
+
+
+def test_hardlinked_files_are_read_once(data_dir):
+    real_checksum_file = Hasher.checksum_file
+    calls = []
+
+    def tracking_checksum_file(self, file_path_or_obj, *args, **kwargs):
+        calls.append(file_path_or_obj)
+        return real_checksum_file(self, file_path_or_obj, *args, **kwargs)
+
+    with patch.object(Hasher, "checksum_file", tracking_checksum_file):
+        records = asyncio.run(collect(str(data_dir), concurrency=8, archive_dive=False))
+    linked = [record for record in records if record.name in ("file0.txt", "link0.txt")]
+    assert len(linked) == 2 and linked[0].digest == linked[1].digest
+    assert len([path for path in calls if path in (str(data_dir / "file0.txt"), str(data_dir / "sub" / "link0.txt"))]) == 1
+
+
+def test_concurrency_limit_and_backpressure(data_dir):
+    real_checksum_file = Hasher.checksum_file
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0, "started": 0}
+
+    def slow_checksum_file(self, *args, **kwargs):
+        with lock:
+            state["started"] += 1
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.02)
+        try:
+            return real_checksum_file(self, *args, **kwargs)
+        finally:
+            with lock:
+                state["running"] -= 1
+
+    async def consume_slowly():
+        async with aclosing(aio.iter_checksums(str(data_dir), concurrency=3, archive_dive=False)) as records:
+            await records.__anext__()
+            # While the consumer holds the first record back, no further files are started
+            await asyncio.sleep(0.2)
+            started = state["started"]
+            remaining = [record async for record in records]
+        return started, remaining
+
+    with patch.object(Hasher, "checksum_file", slow_checksum_file):
+        started, remaining = asyncio.run(consume_slowly())
+    assert started <= 3
+    assert len(remaining) == 14
+    assert 1 < state["peak"] <= 3
+
+
+def test_closing_early_stops_reads_and_closes_archives(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "large.bin").write_bytes(os.urandom(4 * 1024 * 1024))
+    shutil.copy2(TEST_ZIP, data_dir / "bundle.zip")
+    throttle = SlowThrottle()
+
+    async def take_one():
+        async with aclosing(aio.iter_checksums(str(data_dir), concurrency=2, throttle=throttle)) as records:
+            first = await records.__anext__()
+            started = time.monotonic()
+        return first, time.monotonic() - started
+
+    if not os.path.isdir("/proc/self/fd"):
+        pytest.skip("Needs /proc to list open files")
+    first, closing_time = asyncio.run(take_one())
+    # The archive's own row comes first; the 4 MiB file would take seconds at this throttle
+    assert first.path == str(data_dir / "bundle.zip")
+    assert closing_time < 1
+    assert open_paths_under(data_dir) == []
+
+
+def test_errors_propagate(tmp_path):
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    with pytest.raises(EmptyInputDirectoryError):
+        asyncio.run(collect(str(empty)))
+    with pytest.raises(ValueError):
+        asyncio.run(collect(str(empty), concurrency=0))
+    with MemberCache(str(tmp_path / "members.sqlite")) as cache, pytest.raises(ValueError):
+        asyncio.run(collect(str(empty), member_cache=cache))
+
+
+def test_checksum_file(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"This is a test file.")
+    assert asyncio.run(aio.checksum_file(str(path))) == hashlib.md5(b"This is a test file.").hexdigest()
+    assert asyncio.run(aio.checksum_file(str(path), algorithm="shake_128", length=8)) == hashlib.shake_128(b"This is a test file.").hexdigest(8)
+
+
+def test_cancelling_checksum_file_closes_the_file(tmp_path):
+    path = tmp_path / "large.bin"
+    path.write_bytes(os.urandom(2 * 1024 * 1024))
+
+    async def cancel_midway():
+        task = asyncio.create_task(aio.checksum_file(str(path), throttle=SlowThrottle()))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        started = time.monotonic()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return time.monotonic() - started
+
+    if not os.path.isdir("/proc/self/fd"):
+        pytest.skip("Needs /proc to list open files")
+    assert asyncio.run(cancel_midway()) < 1
+    assert open_paths_under(tmp_path) == []
@@ -67,6 +67,32 @@ class TestArchiveHandler:
         handler = ArchiveHandler()
         assert handler.count_members(str(TEST_ZIP)) == 2
 
+    def test_map_members_keeps_central_directory_order(self, tmp_path):
+        archive_path = tmp_path / "many.zip"
+        contents = {}
+        with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("dir/", "")
+            for i in range(300):
+                # Mix large and tiny members so batches finish out of order
+                data = (f"member {i} " * (5000 if i % 37 == 0 else 1)).encode()
+                zf.writestr(f"dir/m{i:03d}.txt", data)
+                contents[f"dir/m{i:03d}.txt"] = data
+        handler = ArchiveHandler()
+        hasher = Hasher("sha256")
+        with patch("sumbuddy.archive._MEMBER_BATCH_COUNT", 7):
+            results = list(handler.map_members(str(archive_path), hasher.checksum_file, workers=4))
+        expected = [(name, size, hasher.checksum_file(file_obj)) for name, size, file_obj in handler.iter_member_entries(str(archive_path))]
+        assert results == expected
+        assert [name for name, _, _ in results] == list(contents)
+        assert all(size == len(contents[name]) for name, size, _ in results)
+
+    def test_map_members_propagates_errors(self):
+        def fail(file_obj):
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            list(ArchiveHandler().map_members(str(TEST_ZIP), fail, workers=2))
+
 
 class TestMapperWithArchives:
     """Mapper.gather_file_paths interaction with archive files."""
@@ -0,0 +1,60 @@
+import csv
+import hashlib
+
+import pytest
+
+from sumbuddy import get_checksums
+from sumbuddy.__main__ import main
+from sumbuddy.bench import (
+    SECURE_ALGORITHMS,
+    bench_algorithms,
+    fastest_secure_algorithm,
+    format_results,
+    resolve_algorithm,
+)
+
+
+def test_bench_algorithms_ranks_results(tmp_path):
+    results = bench_algorithms(["md5", "sha256", "shake_128", "not-an-algorithm"], buffer_sizes=[4096, 65536], data_size=256 * 1024, directory=str(tmp_path), min_time=0.01)
+    assert {(result.algorithm, result.source, result.buffer_size) for result in results} == {
+        (algorithm, source, size) for algorithm in ("md5", "sha256", "shake_128") for source in ("memory", "disk") for size in (4096, 65536)
+    }
+    speeds = [result.bytes_per_second for result in results]
+    assert speeds == sorted(speeds, reverse=True) and speeds[-1] > 0
+    assert {result.algorithm for result in results if result.secure} == {"sha256"}
+    # The temporary data file is removed
+    assert list(tmp_path.iterdir()) == []
+
+    table = format_results(results).splitlines()
+    assert table[0].split() == ["rank", "algorithm", "data", "buffer", "MB/s", "secure"]
+    assert table[1].split()[0] == "1" and len(table) == len(results) + 1
+
+
+def test_fastest_secure_resolution():
+    algorithm = fastest_secure_algorithm()
+    assert algorithm in SECURE_ALGORITHMS and algorithm in hashlib.algorithms_available
+    assert resolve_algorithm("fastest-secure") == algorithm
+    assert resolve_algorithm("md5") == "md5"
+
+
+def test_fastest_secure_header(tmp_path):
+    (tmp_path / "data.txt").write_text("data")
+    output = tmp_path / "out.csv"
+    get_checksums(str(tmp_path / "data.txt"), str(output), algorithm="fastest-secure")
+    with open(output, newline="") as f:
+        header, row = list(csv.reader(f))
+    algorithm = fastest_secure_algorithm()
+    assert header[2] == algorithm
+    assert row[2] == hashlib.new(algorithm, b"data").hexdigest()
+
+
+def test_bench_subcommand(capsys):
+    main(["bench-algorithms", "-a", "md5,sha256", "--buffer-sizes", "4K", "--size", "64K", "--no-disk", "--min-time", "0.01"])
+    out = capsys.readouterr().out
+    assert "sha256" in out and "memory" in out and "disk" not in out
+    assert f"fastest-secure resolves to: {fastest_secure_algorithm()}" in out
+
+
+def test_bench_subcommand_rejects_bad_size():
+    with pytest.raises(SystemExit):
+        main(["bench-algorithms", "--size", "lots"])
@@ -0,0 +1,145 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from sumbuddy import get_checksums
+from sumbuddy.blocktree import (
+    BlockTreeHasher,
+    block_tree_label,
+    load_block_index,
+    parse_block_size,
+)
+
+BLOCK_SIZE = 1024
+
+
+def reference_root(data, block_size=BLOCK_SIZE):
+    """Independent implementation of the documented tree layout using sha256."""
+    blocks = [data[i:i + block_size] for i in range(0, len(data), block_size)] or [b""]
+    level = [hashlib.sha256(b"\x00" + block).digest() for block in blocks]
+    while len(level) > 1:
+        paired = [hashlib.sha256(b"\x01" + level[i] + level[i + 1]).digest() for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+    return level[0].hex()
+
+
+@pytest.mark.parametrize("size", [0, 1, BLOCK_SIZE, BLOCK_SIZE + 1, 5 * BLOCK_SIZE, 7 * BLOCK_SIZE - 3])
+def test_root_matches_reference_layout(tmp_path, size):
+    data = os.urandom(size)
+    path = tmp_path / "volume.bin"
+    path.write_bytes(data)
+
+    tree = BlockTreeHasher("sha256", BLOCK_SIZE, workers=4).hash_file(str(path))
+    assert tree.root == reference_root(data)
+    assert tree.size == size
+    assert len(tree.block_digests) == max(1, -(-size // BLOCK_SIZE))
+    # Never confusable with the plain digest
+    assert tree.root != hashlib.sha256(data).hexdigest()
+
+    streamed = BlockTreeHasher("sha256", BLOCK_SIZE, workers=1).hash_stream(io.BytesIO(data))
+    assert streamed.root == tree.root
+    assert streamed.block_digests == tree.block_digests
+
+
+def test_verify_pinpoints_corrupted_blocks(tmp_path):
+    path = tmp_path / "volume.bin"
+    data = bytearray(os.urandom(10 * BLOCK_SIZE))
+    path.write_bytes(data)
+    hasher = BlockTreeHasher("sha256", BLOCK_SIZE, workers=3)
+    tree = hasher.hash_file(str(path))
+
+    data[3 * BLOCK_SIZE + 17] ^= 0xFF
+    data[8 * BLOCK_SIZE] ^= 0xFF
+    path.write_bytes(data)
+    assert hasher.verify(str(path), tree) == [3, 8]
+    assert hasher.verify(str(path), tree, blocks=[0, 1, 8]) == [8]
+
+    path.write_bytes(data[:4 * BLOCK_SIZE + 10])
+    assert hasher.verify(str(path), tree, blocks=[0, 5, 9]) == [5, 9]
+
+    with pytest.raises(ValueError):
+        BlockTreeHasher("sha256", 2 * BLOCK_SIZE).verify(str(path), tree)
+
+
+@pytest.mark.parametrize("blocks", [[99], [-1], [0, 10]])
+def test_verify_rejects_blocks_outside_the_tree(tmp_path, blocks):
+    path = tmp_path / "volume.bin"
+    path.write_bytes(os.urandom(10 * BLOCK_SIZE))
+    hasher = BlockTreeHasher("sha256", BLOCK_SIZE)
+    tree = hasher.hash_file(str(path))
+    with pytest.raises(ValueError, match="outside the stored tree"):
+        hasher.verify(str(path), tree, blocks=blocks)
+
+
+def test_thread_pool_is_shared_and_skipped_for_single_blocks(tmp_path):
+    small = tmp_path / "small.bin"
+    small.write_bytes(b"x" * 100)
+    large = tmp_path / "large.bin"
+    large.write_bytes(os.urandom(3 * BLOCK_SIZE))
+    with BlockTreeHasher("sha256", BLOCK_SIZE, workers=2) as hasher, patch("sumbuddy.blocktree.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as pools:
+        hasher.hash_file(str(small))
+        assert pools.call_count == 0
+        for _ in range(3):
+            hasher.hash_file(str(large))
+        assert pools.call_count == 1
+    assert hasher._executor is None
+
+
+def test_short_reads_are_completed(tmp_path):
+    data = os.urandom(3 * BLOCK_SIZE + 5)
+    path = tmp_path / "volume.bin"
+    path.write_bytes(data)
+    real_pread = os.pread
+
+    def short_pread(fd, length, offset):
+        # As for blocks above 2 GiB on Linux, or on network filesystems
+        return real_pread(fd, min(length, 100), offset)
+
+    with patch("sumbuddy.blocktree.os.pread", side_effect=short_pread):
+        tree = BlockTreeHasher("sha256", BLOCK_SIZE, workers=2).hash_file(str(path))
+    assert tree.root == reference_root(data)
+
+    def truncated_pread(fd, length, offset):
+        return real_pread(fd, length, offset) if offset < BLOCK_SIZE // 2 else b""
+
+    with patch("sumbuddy.blocktree.os.pread", side_effect=truncated_pread), pytest.raises(EOFError, match="truncated"):
+        BlockTreeHasher("sha256", BLOCK_SIZE, workers=2).hash_file(str(path))
+
+
+def test_get_checksums_block_tree_and_index(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    contents = {"small.txt": b"small", "large.bin": os.urandom(3 * BLOCK_SIZE + 5)}
+    for name, data in contents.items():
+        (data_dir / name).write_bytes(data)
+    output_file = tmp_path / "checksums.csv"
+    index_file = tmp_path / "blocks.csv"
+
+    get_checksums(str(data_dir), str(output_file), algorithm="sha256", block_size=BLOCK_SIZE, block_index_filepath=str(index_file), workers=2)
+
+    lines = output_file.read_text().splitlines()
+    assert lines[0] == "filepath,filename,tree-sha256-1KiB"
+    rows = {line.split(",")[1]: line.split(",")[2] for line in lines[1:]}
+    assert rows == {name: reference_root(data) for name, data in contents.items()}
+
+    trees = load_block_index(str(index_file))
+    large = trees[str(data_dir / "large.bin")]
+    assert large.root == rows["large.bin"]
+    assert len(large.block_digests) == 4
+    assert BlockTreeHasher("sha256", BLOCK_SIZE).verify(str(data_dir / "large.bin"), large) == []
+
+
+def test_labels_and_block_size_parsing():
+    assert block_tree_label("sha256", 64 * 1024 * 1024) == "tree-sha256-64MiB"
+    assert block_tree_label("md5-sha1", 1000) == "tree-md5-sha1-1000B"
+    assert parse_block_size("64M") == parse_block_size("64MiB") == 64 * 1024 * 1024
+    assert parse_block_size("4096") == 4096
+    for bad in ("0", "-1", "1.5G", "12X"):
+        with pytest.raises(ValueError):
+            parse_block_size(bad)
@@ -0,0 +1,143 @@
+import csv
+import hashlib
+import os
+import random
+
+import pytest
+
+from sumbuddy import get_checksums
+from sumbuddy.chunking import ChunkAnalyzer, ContentChunker
+
+AVERAGE = 1024
+
+
+def chunk_all(data, average=AVERAGE, step=4096):
+    chunker = ContentChunker(average)
+    chunks = []
+    for start in range(0, len(data), step):
+        chunks.extend(chunker.update(data[start:start + step]))
+    return chunks + chunker.finish()
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    return rows[0], rows[1:]
+
+
+def test_chunks_cover_data_within_bounds():
+    data = random.Random(1).randbytes(200 * AVERAGE)
+    chunks = chunk_all(data)
+    assert b"".join(chunks) == data
+    assert all(len(chunk) <= 8 * AVERAGE for chunk in chunks)
+    assert all(len(chunk) >= AVERAGE // 4 for chunk in chunks[:-1])
+    # Boundaries depend on content only, not on how the bytes were fed in
+    assert chunk_all(data, step=777) == chunks
+
+
+def test_insertion_only_changes_nearby_chunks():
+    data = random.Random(2).randbytes(200 * AVERAGE)
+    edited = data[:50_000] + b"inserted bytes" + data[50_000:]
+    original = set(chunk_all(data))
+    changed = [chunk for chunk in chunk_all(edited) if chunk not in original]
+    assert sum(len(chunk) for chunk in changed) < 20 * AVERAGE
+
+
+def test_invalid_average_size():
+    with pytest.raises(ValueError):
+        ContentChunker(1000)
+
+
+def test_analyzer_counts_duplicates():
+    data = random.Random(3).randbytes(50 * AVERAGE)
+    analyzer = ChunkAnalyzer(AVERAGE)
+    for path in ("a/one.bin", "a/two.bin", "b/three.bin"):
+        analyzer.start_file(path)
+        analyzer.update(data)
+        analyzer.finish_file()
+    rows = list(analyzer.rows())
+    assert rows[0] == ("tree", "", 3, rows[0][3], 3 * len(data), len(data))
+    assert [row[:2] for row in rows[1:]] == [("directory", "a"), ("directory", "b")]
+    assert rows[1][4:] == (2 * len(data), len(data))
+    assert rows[2][4:] == (len(data), len(data))
+
+
+def test_get_checksums_chunk_report(tmp_path):
+    root = tmp_path / "data"
+    (root / "sub").mkdir(parents=True)
+    shared = random.Random(4).randbytes(300_000)
+    (root / "original.bin").write_bytes(shared)
+    (root / "sub" / "edited.bin").write_bytes(shared[:100_000] + b"patch" + shared[100_000:])
+    (root / "small.txt").write_bytes(b"hello")
+    output = tmp_path / "out.csv"
+    report = tmp_path / "report.csv"
+    index = tmp_path / "index.csv"
+
+    get_checksums(str(root), str(output), algorithm="sha256", chunk_report_filepath=str(report), chunk_size=4096, chunk_index_filepath=str(index))
+
+    # Checksums are unaffected by the analysis
+    _, rows = read_csv(output)
+    assert {row[1]: row[2] for row in rows}["original.bin"] == hashlib.sha256(shared).hexdigest()
+
+    header, report_rows = read_csv(report)
+    assert header == ["scope", "dirpath", "files", "chunks", "total_bytes", "unique_bytes", "dedup_ratio"]
+    tree = report_rows[0]
+    assert tree[:3] == ["tree", "", "3"]
+    assert int(tree[4]) == 2 * len(shared) + 5 + 5
+    assert int(tree[5]) < len(shared) * 1.2
+    assert float(tree[6]) > 1.5
+    assert [row[1] for row in report_rows[1:]] == [str(root), os.path.join(str(root), "sub")]
+
+    header, index_rows = read_csv(index)
+    assert header == ["filepath", "offset", "length", "chunk-blake2b-128"]
+    sizes = {}
+    for path, offset, size, _ in index_rows:
+        assert int(offset) == sizes.get(path, 0)
+        sizes[path] = int(offset) + int(size)
+    assert sizes[str(root / "original.bin")] == len(shared)
+    assert sizes[str(root / "small.txt")] == 5
+
+
+def test_chunk_report_rejects_block_tree(tmp_path):
+    (tmp_path / "file.txt").write_text("data")
+    with pytest.raises(ValueError):
+        get_checksums(str(tmp_path), chunk_report_filepath=str(tmp_path / "r.csv"), block_size=1024)
+
+
+def test_sampled_analysis_keeps_identical_files_together():
+    rng = random.Random(5)
+    contents = [rng.randbytes(rng.randrange(1, 3 * AVERAGE)) for _ in range(200)]
+    analyzer = ChunkAnalyzer(AVERAGE, sample=0.25)
+    for i, data in enumerate(contents):
+        for copy in ("a", "b"):
+            analyzer.start_file(f"{copy}/{i}.bin")
+            # Fed in small blocks, so the sampling decision waits for the first bytes
+            for start in range(0, len(data), 1000):
+                analyzer.update(data[start:start + 1000])
+            analyzer.finish_file()
+    tree = next(analyzer.rows())
+    # Each file and its copy are both in the sample or both out of it, so the ratio is exactly 2
+    assert 0 < tree[2] < 400 and tree[2] % 2 == 0
+    assert tree[4] == 2 * tree[5]
+    assert 50 < tree[2] // 2 < 150
+
+
+def test_full_sample_matches_unsampled():
+    data = random.Random(6).randbytes(20 * AVERAGE)
+    rows = []
+    for options in ({}, {"sample": 1.0}):
+        analyzer = ChunkAnalyzer(AVERAGE, **options)
+        analyzer.start_file("a/one.bin")
+        analyzer.update(data)
+        analyzer.finish_file()
+        rows.append(list(analyzer.rows()))
+    assert rows[0] == rows[1]
+
+
+@pytest.mark.parametrize("sample", [0, -0.5, 1.5])
+def test_invalid_sample(sample, tmp_path):
+    with pytest.raises(ValueError):
+        ChunkAnalyzer(AVERAGE, sample=sample)
+    (tmp_path / "file.txt").write_text("data")
+    with pytest.raises(ValueError):
+        get_checksums(str(tmp_path), chunk_report_filepath=str(tmp_path / "r.csv"), chunk_sample=sample)
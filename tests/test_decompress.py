@@ -0,0 +1,77 @@
+import bz2
+import csv
+import gzip
+import hashlib
+import lzma
+import os
+
+import pytest
+
+from sumbuddy import get_checksums, iter_checksums
+from sumbuddy.archive import ArchiveHandler
+from sumbuddy.exceptions import DecompressionError
+
+COMPRESSORS = {".gz": gzip.compress, ".bz2": bz2.compress, ".xz": lzma.compress}
+
+
+@pytest.mark.parametrize("suffix", list(COMPRESSORS))
+def test_raw_and_decompressed_in_one_read(tmp_path, suffix):
+    data = os.urandom(300_000) + b"\0" * 3_000_000
+    compressed = COMPRESSORS[suffix](data)
+    path = tmp_path / f"scan.tif{suffix}"
+    path.write_bytes(compressed)
+
+    records = list(iter_checksums(str(path), algorithm="sha256", decompress=True))
+    assert [(record.path, record.name, record.size, record.digest, record.archive) for record in records] == [
+        (str(path), path.name, len(compressed), hashlib.sha256(compressed).hexdigest(), None),
+        (f"{path}/scan.tif", "scan.tif", len(data), hashlib.sha256(data).hexdigest(), str(path)),
+    ]
+    # Without the option, compressed files are ordinary files
+    assert len(list(iter_checksums(str(path), algorithm="sha256"))) == 1
+
+
+def test_reader_bounds_blocks_and_handles_concatenated_streams(tmp_path):
+    data = b"a" * 5_000_000
+    path = tmp_path / "double.gz"
+    path.write_bytes(gzip.compress(data) + gzip.compress(b"tail"))
+    raw = bytearray()
+    with open(path, "rb") as f:
+        reader = ArchiveHandler().open_decompressed(str(path), f, raw.extend)
+        blocks = list(iter(lambda: reader.read(4096), b""))
+    assert b"".join(blocks) == data + b"tail"
+    assert reader.size == len(data) + 4
+    assert bytes(raw) == path.read_bytes()
+
+
+def test_truncated_file(tmp_path, capsys):
+    compressed = gzip.compress(os.urandom(100_000))
+    path = tmp_path / "broken.gz"
+    path.write_bytes(compressed[:-100])
+    with open(path, "rb") as f, pytest.raises(DecompressionError):
+        ArchiveHandler().open_decompressed(str(path), f).read()
+
+    records = list(iter_checksums(str(path), decompress=True))
+    assert [record.digest for record in records] == [hashlib.md5(compressed[:-100]).hexdigest()]
+    assert "Could not decompress" in capsys.readouterr().err
+
+
+def test_get_checksums_rows(tmp_path):
+    root = tmp_path / "data"
+    root.mkdir()
+    (root / "notes.txt").write_text("plain")
+    (root / "scan.tif.gz").write_bytes(gzip.compress(b"tiff bytes"))
+    output = tmp_path / "out.csv"
+    get_checksums(str(root), str(output), decompress=True, sort="path")
+    with open(output, newline="") as f:
+        rows = list(csv.reader(f))[1:]
+    # gzip.compress embeds a timestamp, so hash the bytes actually written
+    assert [(row[0], row[2]) for row in rows] == [
+        (str(root / "notes.txt"), hashlib.md5(b"plain").hexdigest()),
+        (str(root / "scan.tif.gz"), hashlib.md5((root / "scan.tif.gz").read_bytes()).hexdigest()),
+        (str(root / "scan.tif.gz" / "scan.tif"), hashlib.md5(b"tiff bytes").hexdigest()),
+    ]
+
+
+def test_decompress_rejects_block_tree(tmp_path):
+    with pytest.raises(ValueError):
+        iter_checksums(str(tmp_path), decompress=True, block_size=1024)
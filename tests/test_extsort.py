@@ -0,0 +1,80 @@
+import csv
+import os
+import random
+from unittest.mock import patch
+
+import pytest
+
+from sumbuddy import get_checksums
+from sumbuddy.extsort import SORT_KEYS, ExternalSorter, row_key
+
+
+def random_rows(count, seed=0):
+    rng = random.Random(seed)
+    return [[f"dir{rng.randrange(50)}/file{rng.randrange(10**6)}.txt", "name", f"{rng.randrange(16**8):08x}"] for _ in range(count)]
+
+
+@pytest.mark.parametrize("order", ["path", "checksum"])
+@pytest.mark.parametrize("run_size", [7, 100, 10**6])
+def test_matches_in_memory_sort(order, run_size):
+    rows = random_rows(1000)
+    key = row_key(SORT_KEYS[order])
+    with ExternalSorter(key, run_size=run_size) as sorter:
+        for row in rows:
+            sorter.add(row)
+        assert list(sorter) == sorted(rows, key=key)
+        assert len(sorter._runs) == (1000 // run_size if run_size < 1000 else 0)
+
+
+def test_quoted_and_undecodable_paths_round_trip():
+    rows = [['has,"quotes"\nand newline', "a", "1"], [os.fsdecode(b"caf\xe9"), "b", "2"], ["plain", "c", "3"]]
+    with ExternalSorter(row_key(SORT_KEYS["path"]), run_size=1) as sorter:
+        for row in rows:
+            sorter.add(row)
+        result = list(sorter)
+    assert sorted(map(tuple, result)) == sorted(map(tuple, rows))
+    assert [os.fsencode(row[0]) for row in result] == sorted(os.fsencode(row[0]) for row in rows)
+
+
+def test_runs_are_removed_on_close():
+    sorter = ExternalSorter(row_key(SORT_KEYS["path"]), run_size=2)
+    for row in random_rows(10):
+        sorter.add(row)
+    runs = list(sorter._runs)
+    sorter.close()
+    assert all(run.closed for run in runs)
+
+
+@pytest.mark.parametrize("order", ["path", "checksum"])
+def test_get_checksums_sorted_output(tmp_path, order):
+    root = tmp_path / "data"
+    for i in range(40):
+        directory = root / f"d{i % 3}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"f{(i * 7919) % 40}.txt").write_text(str(i % 5))
+    unsorted = tmp_path / "unsorted.csv"
+    output = tmp_path / "sorted.csv"
+    get_checksums(str(root), str(unsorted))
+    spills = []
+    original_spill = ExternalSorter._spill
+
+    def spill(self):
+        spills.append(len(self._buffer))
+        original_spill(self)
+
+    with patch("sumbuddy.extsort.DEFAULT_RUN_SIZE", 6), patch.object(ExternalSorter, "_spill", spill):
+        get_checksums(str(root), str(output), sort=order, workers=4)
+    assert len(spills) == 6
+
+    with open(unsorted, newline="") as f:
+        header, *expected = list(csv.reader(f))
+    with open(output, newline="") as f:
+        sorted_header, *rows = list(csv.reader(f))
+    assert sorted_header == header
+    assert rows == sorted(expected, key=row_key(SORT_KEYS[order]))
+
+
+def test_get_checksums_rejects_unknown_order(tmp_path):
+    (tmp_path / "a.txt").write_text("a")
+    with pytest.raises(ValueError):
+        get_checksums(str(tmp_path), sort="size")
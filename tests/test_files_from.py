@@ -0,0 +1,104 @@
+import csv
+import hashlib
+import io
+import shutil
+from pathlib import Path
+
+import pytest
+
+from sumbuddy import get_checksums, iter_checksums
+from sumbuddy.__main__ import main
+from sumbuddy.exceptions import NoListedFilesError
+from sumbuddy.mapper import iter_file_list
+
+TEST_ZIP = Path(__file__).parent / "test_archive.zip"
+
+
+def read_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))[1:]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = tmp_path / "data"
+    (data_dir / "sub").mkdir(parents=True)
+    (data_dir / "a.txt").write_bytes(b"aaa")
+    (data_dir / "b.log").write_bytes(b"log")
+    (data_dir / "sub" / "c.txt").write_bytes(b"ccc")
+    (data_dir / ".hidden").write_bytes(b"hidden")
+    shutil.copy2(TEST_ZIP, data_dir / "bundle.zip")
+    return data_dir
+
+
+@pytest.mark.parametrize(
+    ("content", "expected"),
+    [
+        (b"a.txt\nsub/c.txt\n", ["a.txt", "sub/c.txt"]),
+        (b"a.txt\r\n\r\nsub/c.txt", ["a.txt", "sub/c.txt"]),
+        (b"a.txt\0with\nnewline\0", ["a.txt", "with\nnewline"]),
+        (b"", []),
+    ],
+)
+def test_iter_file_list(content, expected):
+    assert list(iter_file_list(io.BytesIO(content))) == expected
+
+
+def test_only_listed_files_are_hashed(data_dir):
+    records = list(iter_checksums(str(data_dir), files_from=["a.txt", "sub/c.txt", "a.txt", "bundle.zip"]))
+    names = [record.name for record in records]
+    # Duplicates are hashed once, and archives are still dived into
+    assert names[:3] == ["a.txt", "c.txt", "bundle.zip"]
+    assert {"test_file.txt", "nested_file.txt"} <= set(names[3:])
+    assert records[0].path == str(data_dir / "a.txt")
+    assert records[0].digest == hashlib.md5(b"aaa").hexdigest()
+
+
+def test_listed_files_are_filtered(data_dir, tmp_path):
+    ignore_file = tmp_path / "ignore"
+    ignore_file.write_text("*.log\n")
+    records = iter_checksums(str(data_dir), ignore_file=str(ignore_file), files_from=["a.txt", "b.log"])
+    assert [record.name for record in records] == ["a.txt"]
+    records = iter_checksums(str(data_dir), files_from=["a.txt", ".hidden"])
+    assert [record.name for record in records] == ["a.txt"]
+
+
+def test_missing_and_directory_entries_are_skipped(data_dir, capsys):
+    records = iter_checksums(str(data_dir), files_from=["missing.txt", "sub", "a.txt"])
+    assert [record.name for record in records] == ["a.txt"]
+    err = capsys.readouterr().err
+    assert "missing.txt" in err
+    assert "listed directory" in err
+
+
+def test_nothing_readable_listed(data_dir):
+    with pytest.raises(NoListedFilesError):
+        list(iter_checksums(str(data_dir), files_from=["missing.txt"]))
+
+
+def test_multiple_roots_share_one_output(data_dir, tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "d.txt").write_bytes(b"ddd")
+    output = tmp_path / "out.csv"
+    get_checksums([str(data_dir / "sub"), str(other)], output_filepath=str(output))
+    assert [row[0] for row in read_rows(output)] == [str(data_dir / "sub" / "c.txt"), str(other / "d.txt")]
+
+
+def test_overlapping_roots_are_rejected(data_dir):
+    with pytest.raises(ValueError, match="overlap"):
+        iter_checksums([str(data_dir), str(data_dir / "sub")])
+
+
+def test_cli_files_from_stdin(data_dir, tmp_path, monkeypatch):
+    output = tmp_path / "out.csv"
+    listed = f"{data_dir / 'a.txt'}\0{data_dir / 'sub' / 'c.txt'}\0".encode()
+    monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(listed)))
+    main(["--files-from", "-", "--no-archive-dive", "-o", str(output)])
+    assert [row[1] for row in read_rows(output)] == ["a.txt", "c.txt"]
+
+
+def test_cli_requires_input(capsys):
+    with pytest.raises(SystemExit):
+        main([])
+    assert "--files-from" in capsys.readouterr().err
@@ -0,0 +1,57 @@
+import os
+import tracemalloc
+
+from sumbuddy import get_checksums
+from sumbuddy.filetable import FileTable
+from sumbuddy.mapper import Mapper
+
+
+def test_bounded_bytes_per_file():
+    directories = [f"dataset/images/batch_{i:03d}" for i in range(100)]
+    name_length = len("img_0000000.jpg")
+    count = 50_000
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        table = FileTable()
+        for i in range(count):
+            table.append(directories[i % 100], f"img_{i:07d}.jpg")
+        allocated = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    finally:
+        tracemalloc.stop()
+
+    assert len(table) == count
+    assert table.nbytes == count * (4 + 8 + name_length + 1)
+    # Growth slack of the arrays included; a list of path strings needs > 90 bytes per file here
+    assert allocated / count < name_length + 24
+    assert table[12345] == os.path.join(directories[45], "img_0012345.jpg")
+    assert table[-1] == os.path.join(directories[99], f"img_{count - 1:07d}.jpg")
+
+
+def test_gather_file_table_matches_gather_file_paths(tmp_path, monkeypatch):
+    for relative in ("a.txt", "sub/b.txt", "sub/deeper/c.bin", "ünïcode/d.txt", ".hidden"):
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(relative)
+    (tmp_path / "sub" / "fake.zip").write_text("not really a zip")
+
+    monkeypatch.chdir(tmp_path)
+    for root in (".", str(tmp_path)):
+        regular_files, archive_files = Mapper().gather_file_paths(root)
+        table = Mapper().gather_file_table(root)
+        assert list(table.paths()) == regular_files
+        assert list(table.paths(archives=True)) == archive_files
+        assert list(table) == regular_files
+
+
+def test_output_inside_input_excluded_by_identity(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "a.txt").write_text("a")
+    (tmp_path / "alias").symlink_to(tmp_path / "data")
+    monkeypatch.chdir(tmp_path)
+
+    # The output is named through a symlinked alias of the input directory
+    get_checksums("data", "alias/checksums.csv")
+    lines = (tmp_path / "data" / "checksums.csv").read_text().splitlines()
+    assert lines == ["filepath,filename,md5", "data/a.txt,a.txt,0cc175b9c0f1b6a831c399e269772661"]
@@ -0,0 +1,144 @@
+import csv
+import hashlib
+import io
+import os
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from sumbuddy import get_checksums, iter_checksums
+from sumbuddy.checksums import refine_fingerprints
+from sumbuddy.hasher import Hasher, fingerprint_label
+
+SAMPLE = 1024
+TEST_ZIP = Path(__file__).parent / "test_archive.zip"
+
+
+def reference_fingerprint(data, sample=SAMPLE):
+    hash_func = hashlib.sha256(len(data).to_bytes(8, "big"))
+    if len(data) <= 3 * sample:
+        hash_func.update(data)
+    else:
+        middle = (len(data) - sample) // 2
+        hash_func.update(data[:sample] + data[middle:middle + sample] + data[-sample:])
+    return hash_func.hexdigest()
+
+
+@pytest.mark.parametrize("size", [0, 10, 3 * SAMPLE, 3 * SAMPLE + 1, 50 * SAMPLE + 7])
+def test_fingerprint_layout(tmp_path, size):
+    data = os.urandom(size)
+    path = tmp_path / "image.tif"
+    path.write_bytes(data)
+    hasher = Hasher("sha256")
+    fingerprint = hasher.fingerprint_file(str(path), sample_size=SAMPLE)
+    assert fingerprint == reference_fingerprint(data)
+    assert fingerprint != hashlib.sha256(data).hexdigest()
+    assert hasher.fingerprint_file(io.BytesIO(data), sample_size=SAMPLE) == fingerprint
+
+
+def test_fingerprint_sensitivity(tmp_path):
+    data = bytearray(os.urandom(100 * SAMPLE))
+    path = tmp_path / "image.tif"
+    path.write_bytes(data)
+    hasher = Hasher("sha256")
+    original = hasher.fingerprint_file(str(path), sample_size=SAMPLE)
+
+    # Outside the sampled regions and same size: deliberately not detected
+    data[10 * SAMPLE] ^= 0xFF
+    path.write_bytes(data)
+    assert hasher.fingerprint_file(str(path), sample_size=SAMPLE) == original
+
+    data[len(data) // 2] ^= 0xFF
+    path.write_bytes(data)
+    assert hasher.fingerprint_file(str(path), sample_size=SAMPLE) != original
+    path.write_bytes(data + b"x")
+    assert hasher.fingerprint_file(str(path), sample_size=SAMPLE) != original
+
+    assert fingerprint_label("sha256") == "fp-sha256-1MiB"
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    return rows[0], {row[0]: row[2:] for row in rows[1:]}
+
+
+def test_refine_full_hashes_changed_and_colliding_rows(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for name in ("same.bin", "changed.bin", "twin_a.bin"):
+        (data_dir / name).write_bytes(os.urandom(10 * SAMPLE))
+    baseline_csv = tmp_path / "baseline.csv"
+    get_checksums(str(data_dir), str(baseline_csv), fingerprint_size=SAMPLE)
+    header, _ = read_csv(baseline_csv)
+    assert header == ["filepath", "filename", "fp-md5-1KiB"]
+
+    (data_dir / "changed.bin").write_bytes(os.urandom(12 * SAMPLE))
+    (data_dir / "twin_b.bin").write_bytes((data_dir / "twin_a.bin").read_bytes())
+    shutil.copy2(TEST_ZIP, data_dir / "new.zip")
+    refined_csv = tmp_path / "refined.csv"
+    get_checksums(str(data_dir), str(refined_csv), fingerprint_size=SAMPLE, refine_baseline=str(baseline_csv))
+
+    header, refined = read_csv(refined_csv)
+    assert header == ["filepath", "filename", "fp-md5-1KiB", "md5"]
+    full = {os.path.basename(path): values[1] for path, values in refined.items()}
+    assert full["same.bin"] == ""
+    for name in ("changed.bin", "twin_a.bin", "twin_b.bin", "new.zip"):
+        assert full[name] == hashlib.md5((data_dir / name).read_bytes()).hexdigest()
+    # New archive members are full-hashed from inside the archive
+    assert full["test_file.txt"] and full["nested_file.txt"]
+
+    with pytest.raises(ValueError):
+        get_checksums(str(data_dir), str(tmp_path / "other.csv"), fingerprint_size=2 * SAMPLE, refine_baseline=str(baseline_csv))
+
+
+def refine_counting_reads(records, baseline):
+    """Run refine_fingerprints, returning {path: full checksum} and the files it read."""
+    real_checksum_file = Hasher.checksum_file
+    reads = []
+
+    def counting_checksum_file(self, file_path_or_obj, *args, **kwargs):
+        reads.append(file_path_or_obj)
+        return real_checksum_file(self, file_path_or_obj, *args, **kwargs)
+
+    with patch.object(Hasher, "checksum_file", counting_checksum_file):
+        full = {record.path: checksum for record, checksum in refine_fingerprints(records, baseline)}
+    return full, reads
+
+
+def test_refine_treats_hardlinks_as_one_file(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "kept.bin").write_bytes(os.urandom(10 * SAMPLE))
+    (data_dir / "edited.bin").write_bytes(os.urandom(10 * SAMPLE))
+    shutil.copy2(TEST_ZIP, data_dir / "bundle.zip")
+    for name in ("kept.bin", "edited.bin", "bundle.zip"):
+        os.link(data_dir / name, data_dir / f"link_{name}")
+    records = list(iter_checksums(str(data_dir), fingerprint_size=SAMPLE))
+    baseline = {record.path: record.digest for record in records}
+    baseline.pop(str(data_dir / "edited.bin"))
+
+    full, reads = refine_counting_reads(records, baseline)
+    # Links share a fingerprint without colliding, so only the path missing from the baseline is full-hashed
+    assert reads == [str(data_dir / "edited.bin")]
+    assert full[str(data_dir / "edited.bin")] == hashlib.md5((data_dir / "edited.bin").read_bytes()).hexdigest()
+    assert full[str(data_dir / "link_edited.bin")] is None
+    assert full[str(data_dir / "kept.bin")] is None
+
+
+def test_refine_full_hashes_colliding_links_once(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.bin").write_bytes(b"same")
+    (data_dir / "copy.bin").write_bytes(b"same")
+    os.link(data_dir / "a.bin", data_dir / "link_a.bin")
+    records = list(iter_checksums(str(data_dir), fingerprint_size=SAMPLE))
+    baseline = {record.path: record.digest for record in records}
+
+    full, reads = refine_counting_reads(records, baseline)
+    # A genuine collision (two physical files) is full-hashed, each physical file once
+    assert set(full.values()) == {hashlib.md5(b"same").hexdigest()}
+    assert len(reads) == 2
+    assert all(checksum is None for path, checksum in full.items() if "bundle.zip" in path)
@@ -6,6 +6,13 @@ from unittest.mock import mock_open, patch
 
 from sumbuddy import get_checksums
 
+FILE_STAT = os.stat_result((0o100644, 1, 1, 1, 0, 0, 12, 0, 0, 0))
+
+
+def walk_entries(*paths):
+    """Stand-in for Mapper.iter_file_paths: (path, stat_result, is_archive) tuples for regular files."""
+    return [(path, FILE_STAT, False) for path in paths]
+
 
 class TestGetChecksums(unittest.TestCase):
 
@@ -17,10 +24,11 @@ class TestGetChecksums(unittest.TestCase):
         self.algorithm = 'md5'
         self.dummy_checksum = 'dummychecksum'
 
+    @patch('os.stat', return_value=FILE_STAT)
     @patch('os.path.isfile', return_value=True)
     @patch('builtins.open', new_callable=mock_open)
     @patch('sumbuddy.Hasher.checksum_file', return_value='dummychecksum')
-    def test_get_checksums_single_file_to_file(self, mock_checksum, mock_open, mock_isfile):
+    def test_get_checksums_single_file_to_file(self, mock_checksum, mock_open, mock_isfile, mock_stat):
         get_checksums(self.input_path, self.output_filepath, ignore_file=None, include_hidden=False, algorithm=self.algorithm, force=True)
         
         mock_open.assert_called_with(self.output_filepath, 'w', newline='')
@@ -28,10 +36,11 @@ class TestGetChecksums(unittest.TestCase):
         handle.write.assert_any_call('filepath,filename,md5\r\n')
         handle.write.assert_any_call(f'{self.input_path},{os.path.basename(self.input_path)},dummychecksum\r\n')
 
+    @patch('os.stat', return_value=FILE_STAT)
     @patch('os.path.isfile', return_value=True)
     @patch('builtins.open', new_callable=mock_open)
     @patch('sumbuddy.Hasher.checksum_file', return_value='dummychecksum')
-    def test_get_checksums_single_file_to_stdout(self, mock_checksum, mock_open, mock_isfile):
+    def test_get_checksums_single_file_to_stdout(self, mock_checksum, mock_open, mock_isfile, mock_stat):
         output_stream = StringIO()
         with patch('sys.stdout', new=output_stream):
             get_checksums(self.input_path, output_filepath=None, ignore_file=None, include_hidden=False, algorithm=self.algorithm)
@@ -88,9 +97,9 @@ class TestGetChecksums(unittest.TestCase):
     @patch('os.path.abspath', side_effect=lambda x: x)
     @patch('os.path.exists', return_value=True)
     @patch('builtins.open', new_callable=mock_open)
-    @patch('sumbuddy.Mapper.gather_file_paths', return_value=(['file1.txt', 'file2.txt'], []))
+    @patch('sumbuddy.Mapper.iter_file_paths', return_value=walk_entries('file1.txt', 'file2.txt'))
     @patch('sumbuddy.Hasher.checksum_file', side_effect=lambda x, **kwargs: 'dummychecksum')
-    def test_get_checksums_to_file(self, mock_checksum, mock_gather, mock_open, mock_exists, mock_abspath):
+    def test_get_checksums_to_file(self, mock_checksum, mock_iter, mock_open, mock_exists, mock_abspath):
         get_checksums(self.input_path, self.output_filepath, ignore_file=None, include_hidden=False, algorithm=self.algorithm, force=True)
         
         mock_open.assert_called_with(self.output_filepath, 'w', newline='')
@@ -102,9 +111,9 @@ class TestGetChecksums(unittest.TestCase):
     @patch('os.path.abspath', side_effect=lambda x: x)
     @patch('os.path.exists', return_value=True)
     @patch('builtins.open', new_callable=mock_open)
-    @patch('sumbuddy.Mapper.gather_file_paths', return_value=(['file1.txt', 'file2.txt'], []))
+    @patch('sumbuddy.Mapper.iter_file_paths', return_value=walk_entries('file1.txt', 'file2.txt'))
     @patch('sumbuddy.Hasher.checksum_file', side_effect=lambda x, **kwargs: 'dummychecksum')
-    def test_get_checksums_to_stdout(self, mock_checksum, mock_gather, mock_open, mock_exists, mock_abspath):
+    def test_get_checksums_to_stdout(self, mock_checksum, mock_iter, mock_open, mock_exists, mock_abspath):
         output_stream = StringIO()
         with patch('sys.stdout', new=output_stream):
             get_checksums(self.input_path, output_filepath=None, ignore_file=None, include_hidden=False, algorithm=self.algorithm)
@@ -117,11 +126,11 @@ class TestGetChecksums(unittest.TestCase):
     @patch('os.path.abspath', side_effect=lambda x: x)
     @patch('os.path.exists', return_value=True)
     @patch('builtins.open', new_callable=mock_open)
-    @patch('sumbuddy.Mapper.gather_file_paths', return_value=(['file1.txt', 'file2.txt'], []))
+    @patch('sumbuddy.Mapper.iter_file_paths', return_value=walk_entries('file1.txt', 'file2.txt'))
     @patch('sumbuddy.Hasher.checksum_file', side_effect=lambda x, **kwargs: 'dummychecksum')
-    def test_get_checksums_with_ignore_file(self, mock_checksum, mock_gather, mock_open, mock_exists, mock_abspath):
+    def test_get_checksums_with_ignore_file(self, mock_checksum, mock_iter, mock_open, mock_exists, mock_abspath):
         get_checksums(self.input_path, output_filepath=None, ignore_file=self.ignore_file, include_hidden=False, algorithm=self.algorithm)
-        mock_gather.assert_called_with(
+        mock_iter.assert_called_with(
             self.input_path,
             ignore_file=self.ignore_file,
             include_hidden=False,
@@ -131,11 +140,11 @@ class TestGetChecksums(unittest.TestCase):
     @patch('os.path.abspath', side_effect=lambda x: x)
     @patch('os.path.exists', return_value=True)
     @patch('builtins.open', new_callable=mock_open)
-    @patch('sumbuddy.Mapper.gather_file_paths', return_value=(['file1.txt', 'file2.txt', '.hidden_file'], []))
+    @patch('sumbuddy.Mapper.iter_file_paths', return_value=walk_entries('file1.txt', 'file2.txt', '.hidden_file'))
     @patch('sumbuddy.Hasher.checksum_file', side_effect=lambda x, **kwargs: 'dummychecksum')
-    def test_get_checksums_include_hidden(self, mock_checksum, mock_gather, mock_open, mock_exists, mock_abspath):
+    def test_get_checksums_include_hidden(self, mock_checksum, mock_iter, mock_open, mock_exists, mock_abspath):
         get_checksums(self.input_path, output_filepath=None, ignore_file=None, include_hidden=True, algorithm=self.algorithm)
-        mock_gather.assert_called_with(
+        mock_iter.assert_called_with(
             self.input_path,
             ignore_file=None,
             include_hidden=True,
@@ -145,9 +154,9 @@ class TestGetChecksums(unittest.TestCase):
     @patch('os.path.abspath', side_effect=lambda x: x)
     @patch('os.path.exists', return_value=True)
     @patch('builtins.open', new_callable=mock_open)
-    @patch('sumbuddy.Mapper.gather_file_paths', return_value=(['file1.txt', 'file2.txt'], []))
+    @patch('sumbuddy.Mapper.iter_file_paths', return_value=walk_entries('file1.txt', 'file2.txt'))
     @patch('sumbuddy.Hasher.checksum_file', side_effect=lambda x, **kwargs: 'dummychecksum')
-    def test_get_checksums_different_algorithm(self, mock_checksum, mock_gather, mock_open, mock_exists, mock_abspath):
+    def test_get_checksums_different_algorithm(self, mock_checksum, mock_iter, mock_open, mock_exists, mock_abspath):
         algorithm = 'sha256'
         get_checksums(self.input_path, output_filepath=None, ignore_file=None, include_hidden=False, algorithm=algorithm)
         
@@ -163,8 +172,8 @@ class TestGetChecksums(unittest.TestCase):
     @patch('os.path.abspath', side_effect=lambda x: x)
     @patch('os.path.exists', return_value=False)
     @patch('builtins.open', new_callable=mock_open)
-    @patch('sumbuddy.Mapper.gather_file_paths', return_value=([], []))
-    def test_get_checksums_empty_directory(self, mock_gather, mock_open, mock_exists, mock_abspath):
+    @patch('sumbuddy.Mapper.iter_file_paths', return_value=walk_entries())
+    def test_get_checksums_empty_directory(self, mock_iter, mock_open, mock_exists, mock_abspath):
         output_stream = StringIO()
         with patch('sys.stdout', new=output_stream):
             get_checksums(self.input_path, output_filepath=None, ignore_file=None, include_hidden=False, algorithm=self.algorithm)
@@ -175,8 +184,8 @@ class TestGetChecksums(unittest.TestCase):
     @patch('os.path.abspath', side_effect=lambda x: x)
     @patch('os.path.exists', return_value=True)
     @patch('builtins.open', new_callable=mock_open)
-    @patch('sumbuddy.Mapper.gather_file_paths', return_value=(['file1.txt', 'file2.txt'], []))
-    def test_get_checksums_invalid_algorithm(self, mock_gather, mock_open, mock_exists, mock_abspath):
+    @patch('sumbuddy.Mapper.iter_file_paths', return_value=walk_entries('file1.txt', 'file2.txt'))
+    def test_get_checksums_invalid_algorithm(self, mock_iter, mock_open, mock_exists, mock_abspath):
         with self.assertRaises(ValueError):
             get_checksums(self.input_path, output_filepath=None, ignore_file=None, include_hidden=False, algorithm='invalid_alg')
 
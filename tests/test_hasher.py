@@ -118,3 +118,45 @@ def test_guaranteed_algorithm_coverage():
     missing_algorithms = algorithms_guaranteed - algorithms_covered
 
     assert not missing_algorithms, f"The following guaranteed algorithms are not covered in tests: {missing_algorithms}"
+
+@pytest.mark.parametrize("size", [0, 1, 4096, 100_000, 256 * 1024])
+def test_small_file_path_matches_buffered_read(tmp_path, size):
+    path = tmp_path / "small.bin"
+    path.write_bytes(os.urandom(size))
+    hasher = Hasher("sha256")
+    assert hasher.checksum_file(str(path), size=size) == hashlib.sha256(path.read_bytes()).hexdigest()
+
+def test_small_file_that_grew_is_read_in_full(tmp_path):
+    # The size from the walk is stale: the file grew past the reused buffer since
+    path = tmp_path / "grown.bin"
+    path.write_bytes(os.urandom(600_000))
+    assert Hasher().checksum_file(str(path), size=10) == hashlib.md5(path.read_bytes()).hexdigest()
+
+@pytest.mark.skipif(not hasattr(os, "O_NOATIME"), reason="O_NOATIME is Linux-only")
+def test_small_file_path_falls_back_without_noatime(tmp_path):
+    path = tmp_path / "other_owner.bin"
+    path.write_bytes(b"data")
+    hasher = Hasher()
+    hasher._noatime = True
+    real_open = os.open
+
+    def refuse_noatime(file, flags, *args):
+        if flags & os.O_NOATIME:
+            raise PermissionError(1, "Operation not permitted", file)
+        return real_open(file, flags, *args)
+
+    with patch("os.open", side_effect=refuse_noatime):
+        assert hasher.checksum_file(str(path), size=4) == hashlib.md5(b"data").hexdigest()
+    assert hasher._noatime is False
+
+def test_small_file_path_is_throttled(tmp_path):
+    path = tmp_path / "small.bin"
+    path.write_bytes(b"x" * 1000)
+    consumed = []
+
+    class Throttle:
+        def consume(self, count):
+            consumed.append(count)
+
+    Hasher(throttle=Throttle()).checksum_file(str(path), size=1000)
+    assert sum(consumed) == 1000
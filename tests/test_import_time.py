@@ -0,0 +1,55 @@
+import subprocess
+import sys
+
+import pytest
+
+# Generous ceilings (cumulative microseconds as reported by -X importtime). The eager package used to take well over
+# 100 ms; the lazy one takes a few ms, and the CLI module, which loads the local hashing pipeline, a few tens of ms.
+IMPORT_BUDGETS_US = {"sumbuddy": 50_000, "sumbuddy.__main__": 100_000}
+
+# Modules that must not be loaded just to import the package, the get_checksums entry point or the CLI
+HEAVY_MODULES = ("tqdm", "pathspec", "argparse", "zipfile", "concurrent.futures", "sumbuddy.storage")
+
+
+def import_times(statement):
+    """Run `statement` in a fresh interpreter with -X importtime and return {module: cumulative_us}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", IMPORT_BUDGETS_US)
+def test_import_within_budget(module):
+    times = import_times(f"import {module}")
+    assert times[module] < IMPORT_BUDGETS_US[module], f"import {module} took {times[module]} us"
+
+
+@pytest.mark.parametrize("statement", ["import sumbuddy", "from sumbuddy import get_checksums", "import sumbuddy.__main__"])
+def test_import_skips_heavy_modules(statement):
+    times = import_times(statement)
+    loaded = [name for name in HEAVY_MODULES if name in times]
+    assert not loaded, f"'{statement}' imported {loaded}"
+
+
+def test_lazy_attributes_resolve():
+    import sumbuddy
+    from sumbuddy.hasher import Hasher
+    from sumbuddy.mapper import Mapper
+
+    assert sumbuddy.Hasher is Hasher
+    assert sumbuddy.Mapper is Mapper
+    assert callable(sumbuddy.checksum_file)
+    assert callable(sumbuddy.gather_file_paths)
+    assert set(sumbuddy.__all__) <= set(dir(sumbuddy))
+    with pytest.raises(AttributeError):
+        _ = sumbuddy.not_a_real_attribute
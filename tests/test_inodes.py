@@ -0,0 +1,105 @@
+import hashlib
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from unittest.mock import patch
+
+from sumbuddy import get_checksums, iter_checksums
+from sumbuddy.hasher import Hasher
+from sumbuddy.mapper import Mapper
+
+TEST_ZIP = Path(__file__).parent / "test_archive.zip"
+
+
+def md5(data):
+    return hashlib.md5(data).hexdigest()
+
+
+def read_rows(csv_path):
+    lines = Path(csv_path).read_text().splitlines()
+    return lines[0].split(","), [line.split(",") for line in lines[1:]]
+
+
+def test_hardlinks_hashed_once(tmp_path):
+    data_dir = tmp_path / "data"
+    (data_dir / "subset_a").mkdir(parents=True)
+    (data_dir / "subset_b").mkdir()
+    (data_dir / "subset_a" / "big.bin").write_bytes(b"shared contents")
+    os.link(data_dir / "subset_a" / "big.bin", data_dir / "subset_b" / "big.bin")
+    (data_dir / "own.txt").write_bytes(b"own")
+    shutil.copy2(TEST_ZIP, data_dir / "subset_a" / "bundle.zip")
+    os.link(data_dir / "subset_a" / "bundle.zip", data_dir / "subset_b" / "bundle.zip")
+    output_file = tmp_path / "checksums.csv"
+
+    with patch.object(Hasher, "checksum_file", autospec=True, side_effect=Hasher.checksum_file) as checksum_file:
+        get_checksums(str(data_dir), str(output_file), inode_column=True)
+    hashed = [call.args[1] for call in checksum_file.call_args_list if isinstance(call.args[1], str)]
+    assert sorted(os.path.basename(path) for path in hashed) == ["big.bin", "bundle.zip", "own.txt"]
+
+    header, rows = read_rows(output_file)
+    assert header == ["filepath", "filename", "md5", "inode"]
+    by_path = {row[0]: row for row in rows}
+    linked_a, linked_b = by_path[str(data_dir / "subset_a" / "big.bin")], by_path[str(data_dir / "subset_b" / "big.bin")]
+    assert linked_a[2] == linked_b[2] == md5(b"shared contents")
+    assert linked_a[3] == linked_b[3] != by_path[str(data_dir / "own.txt")][3]
+    file_stat = os.stat(data_dir / "own.txt")
+    assert by_path[str(data_dir / "own.txt")][3] == f"{file_stat.st_dev}:{file_stat.st_ino}"
+
+    # Members of both links to the archive are listed, with no inode of their own
+    members_a = [row[1:] for row in rows if row[0].startswith(f"{data_dir}/subset_a/bundle.zip/")]
+    members_b = [row[1:] for row in rows if row[0].startswith(f"{data_dir}/subset_b/bundle.zip/")]
+    assert members_a == members_b
+    assert members_a and all(row[-1] == "" for row in members_a)
+
+
+def test_links_outside_the_walk_are_not_kept(tmp_path):
+    data_dir = tmp_path / "data"
+    outside = tmp_path / "outside"
+    data_dir.mkdir()
+    outside.mkdir()
+    for i in range(8):
+        (data_dir / f"file{i}.txt").write_bytes(f"contents {i}".encode())
+        os.link(data_dir / f"file{i}.txt", outside / f"file{i}.txt")
+    sizes = []
+
+    class RecordingDict(OrderedDict):
+        def __setitem__(self, key, value):
+            super().__setitem__(key, value)
+            sizes.append(len(self))
+
+    with patch("sumbuddy.checksums.OrderedDict", RecordingDict), patch("sumbuddy.checksums._MAX_LINKED_FILES", 3):
+        records = list(iter_checksums(str(data_dir)))
+    # Every file has a link the walk never reaches, yet at most 3 results are held (plus the one just added)
+    assert max(sizes) == 4
+    assert sorted((record.name, record.digest) for record in records) == [(f"file{i}.txt", md5(f"contents {i}".encode())) for i in range(8)]
+
+
+def test_symlink_policy_and_loop_detection(tmp_path, capsys):
+    data_dir = tmp_path / "data"
+    (data_dir / "real").mkdir(parents=True)
+    (data_dir / "real" / "file.txt").write_bytes(b"file")
+    (data_dir / "real" / "loop").symlink_to(data_dir)
+    (data_dir / "alias").symlink_to(data_dir / "real")
+    (data_dir / "file_link.txt").symlink_to(data_dir / "real" / "file.txt")
+    (data_dir / "dangling.txt").symlink_to(data_dir / "missing.txt")
+
+    regular_files, _ = Mapper().gather_file_paths(str(data_dir))
+    assert sorted(os.path.relpath(path, data_dir) for path in regular_files) == ["file_link.txt", "real/file.txt"]
+    assert "dangling.txt" in capsys.readouterr().err
+
+    entries = list(Mapper(follow_symlinks=True).iter_file_paths(str(data_dir)))
+    # alias/ is followed once; real/loop and alias/loop point back at an ancestor and are skipped
+    assert sorted(os.path.relpath(path, data_dir) for path, _, _ in entries) == ["alias/file.txt", "file_link.txt", "real/file.txt"]
+    assert "symlink loop" in capsys.readouterr().err
+    assert len({(file_stat.st_dev, file_stat.st_ino) for _, file_stat, _ in entries}) == 1
+
+
+def test_walk_order_matches_os_walk(tmp_path):
+    for relative in ("b.txt", "a/z.txt", "a/deep/y.txt", "c/x.txt", "a.txt"):
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(relative)
+
+    expected = [os.path.join(root, name) for root, _, files in os.walk(tmp_path) for name in files]
+    assert [os.path.join(directory, name) for directory, name, _, _ in Mapper()._walk(str(tmp_path))] == expected
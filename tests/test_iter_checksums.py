@@ -0,0 +1,62 @@
+import hashlib
+import shutil
+import types
+from pathlib import Path
+
+import pytest
+
+from sumbuddy import ChecksumRecord, get_checksums, iter_checksums
+from sumbuddy.exceptions import EmptyInputDirectoryError
+
+TEST_ZIP = Path(__file__).parent / "test_archive.zip"
+
+
+def md5(data):
+    return hashlib.md5(data).hexdigest()
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = tmp_path / "data"
+    (data_dir / "sub").mkdir(parents=True)
+    (data_dir / "a.txt").write_bytes(b"aaa")
+    (data_dir / "sub" / "b.txt").write_bytes(b"bb")
+    (data_dir / ".hidden").write_bytes(b"hidden")
+    shutil.copy2(TEST_ZIP, data_dir / "bundle.zip")
+    return data_dir
+
+
+def test_records_match_csv(data_dir, tmp_path):
+    records = iter_checksums(str(data_dir))
+    assert isinstance(records, types.GeneratorType)
+    records = list(records)
+    assert all(isinstance(record, ChecksumRecord) for record in records)
+
+    by_name = {record.name: record for record in records}
+    assert set(by_name) == {"a.txt", "b.txt", "bundle.zip", "test_file.txt", "nested_file.txt"}
+    assert by_name["a.txt"] == ChecksumRecord(str(data_dir / "a.txt"), "a.txt", 3, "md5", md5(b"aaa"), None, by_name["a.txt"].file_id)
+    member = by_name["test_file.txt"]
+    assert member.archive == str(data_dir / "bundle.zip")
+    assert member.path.startswith(member.archive + "/")
+    assert member.file_id is None and member.size > 0
+
+    output_file = tmp_path / "checksums.csv"
+    get_checksums(str(data_dir), str(output_file))
+    rows = [line.split(",") for line in output_file.read_text().splitlines()[1:]]
+    assert rows == [[record.path, record.name, record.digest] for record in records]
+
+
+def test_records_are_lazy(data_dir, monkeypatch):
+    hashed = []
+    monkeypatch.setattr("sumbuddy.hasher.Hasher.checksum_file", lambda self, path, **kwargs: hashed.append(path) or "x")
+    records = iter_checksums(str(data_dir), archive_dive=False)
+    assert hashed == []
+    next(records)
+    assert len(hashed) == 1
+
+
+def test_errors(tmp_path):
+    with pytest.raises(ValueError):
+        iter_checksums(str(tmp_path), algorithm="not-an-algorithm")
+    with pytest.raises(EmptyInputDirectoryError):
+        list(iter_checksums(str(tmp_path)))
@@ -0,0 +1,90 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from sumbuddy import filter as filter_module
+from sumbuddy.exceptions import NoFilesAfterFilteringError
+from sumbuddy.mapper import Mapper
+
+
+def make_tree(root, files):
+    for relative, content in files.items():
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+def gathered(root, **kwargs):
+    regular_files, archive_files = Mapper(**kwargs.pop("mapper", {})).gather_file_paths(str(root), **kwargs)
+    return sorted(os.path.relpath(path, root) for path in regular_files + archive_files)
+
+
+def test_layering_follows_gitignore_semantics(tmp_path):
+    make_tree(tmp_path, {
+        ".sumbuddyignore": "*.log\n/top_only.txt\n",
+        "a.log": "",
+        "top_only.txt": "",
+        "keep.txt": "",
+        "sub/.sumbuddyignore": "!keep.log\n*.tmp\ntop_only.txt\n",
+        "sub/keep.log": "",
+        "sub/other.log": "",
+        "sub/scratch.tmp": "",
+        "sub/top_only.txt": "",
+        "sub/deeper/x.tmp": "",
+        "sub/deeper/y.txt": "",
+        "elsewhere/scratch.tmp": "",
+    })
+    assert gathered(tmp_path) == ["elsewhere/scratch.tmp", "keep.txt", "sub/deeper/y.txt", "sub/keep.log"]
+    # The ignore files themselves are hidden files, and can be disabled altogether
+    assert "sub/.sumbuddyignore" in gathered(tmp_path, include_hidden=True)
+    assert "a.log" in gathered(tmp_path, mapper={"local_ignores": False})
+
+
+def test_ignored_subtrees_are_not_read(tmp_path):
+    make_tree(tmp_path, {
+        ".sumbuddyignore": "build/\n",
+        "src/main.c": "",
+        "build/out.o": "",
+        "build/.sumbuddyignore": "!out.o\n",
+        ".git/objects/ab/cdef": "",
+    })
+    scanned = []
+    real_scandir = os.scandir
+
+    def recording_scandir(path):
+        scanned.append(os.path.relpath(path, tmp_path))
+        return real_scandir(path)
+
+    with patch("os.scandir", side_effect=recording_scandir):
+        assert gathered(tmp_path) == ["src/main.c"]
+    assert sorted(scanned) == [".", "src"]
+
+    # With a negation in effect, a file could come back, so the subtree is read
+    make_tree(tmp_path, {".sumbuddyignore": "build/\n!important.o\n"})
+    scanned.clear()
+    with patch("os.scandir", side_effect=recording_scandir):
+        gathered(tmp_path)
+    assert "build" in scanned
+
+
+def test_fully_pruned_tree_reports_filtering(tmp_path):
+    make_tree(tmp_path, {".cache/blob": ""})
+    with pytest.raises(NoFilesAfterFilteringError):
+        gathered(tmp_path)
+
+
+def test_specs_compiled_once_per_file_version(tmp_path):
+    make_tree(tmp_path, {f"d{i}/.sumbuddyignore": "*.tmp\n" for i in range(5)})
+    make_tree(tmp_path, {f"d{i}/file.txt": "" for i in range(5)})
+    filter_module._compile_local_ignore.cache_clear()
+
+    gathered(tmp_path)
+    gathered(tmp_path)
+    assert filter_module._compile_local_ignore.cache_info().misses == 5
+
+    ignore_file = tmp_path / "d0" / ".sumbuddyignore"
+    ignore_file.write_text("*.txt\n")
+    os.utime(ignore_file, ns=(1, 1))
+    assert gathered(tmp_path) == [f"d{i}/file.txt" for i in range(1, 5)]
+    assert filter_module._compile_local_ignore.cache_info().misses == 6
@@ -0,0 +1,70 @@
+import csv
+import hashlib
+import os
+
+import pytest
+
+from sumbuddy import get_checksums
+from sumbuddy.__main__ import main
+from sumbuddy.lookup import INDEX_SUFFIX, ManifestIndex
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    root = tmp_path / "data"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.txt").write_text("same")
+    (root / "sub" / "b.txt").write_text("same")
+    (root / "c.txt").write_text("other")
+    path = tmp_path / "manifest.csv"
+    get_checksums(str(root), str(path), algorithm="sha256")
+    return root, path
+
+
+def test_lookups(manifest):
+    root, path = manifest
+    same = hashlib.sha256(b"same").hexdigest()
+    with ManifestIndex(str(path)) as index:
+        assert index.by_checksum(same.upper()) == [
+            (str(root / "a.txt"), "a.txt", same),
+            (str(root / "sub" / "b.txt"), "b.txt", same),
+        ]
+        assert index.by_checksum(hashlib.sha256(b"missing").hexdigest()) == []
+        assert index.by_path(str(root / "c.txt")) == [(str(root / "c.txt"), "c.txt", hashlib.sha256(b"other").hexdigest())]
+        assert index.label == "sha256"
+    assert os.path.exists(str(path) + INDEX_SUFFIX)
+    # A second index on the unchanged manifest reuses the sidecar
+    assert ManifestIndex(str(path)).refresh() is False
+
+
+def test_index_follows_manifest_changes(manifest):
+    root, path = manifest
+    index = ManifestIndex(str(path))
+    assert index.by_path(str(root / "c.txt"))
+    (root / "c.txt").unlink()
+    (root / "d.txt").write_text("new")
+    get_checksums(str(root), str(path), algorithm="sha256", force=True)
+    assert index.by_path(str(root / "c.txt")) == []
+    assert index.by_checksum(hashlib.sha256(b"new").hexdigest()) == [(str(root / "d.txt"), "d.txt", hashlib.sha256(b"new").hexdigest())]
+    index.close()
+
+
+def test_rejects_other_csv(tmp_path):
+    path = tmp_path / "other.csv"
+    path.write_text("a,b,c\n1,2,3\n")
+    with pytest.raises(ValueError):
+        ManifestIndex(str(path)).refresh()
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
+
+
+def test_lookup_command(manifest, capsys):
+    root, path = manifest
+    same = hashlib.sha256(b"same").hexdigest()
+    main(["lookup", str(path), "--checksum", same, "--path", str(root / "c.txt")])
+    rows = list(csv.reader(capsys.readouterr().out.splitlines()))
+    assert rows[0] == ["filepath", "filename", "sha256"]
+    assert [row[1] for row in rows[1:]] == ["a.txt", "b.txt", "c.txt"]
+
+    with pytest.raises(SystemExit) as excinfo:
+        main(["lookup", str(path), "--checksum", "00"])
+    assert excinfo.value.code == 1
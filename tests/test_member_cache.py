@@ -0,0 +1,129 @@
+import csv
+import hashlib
+import os
+import shutil
+import struct
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from sumbuddy import get_checksums, iter_checksums
+from sumbuddy.archive import ArchiveHandler
+from sumbuddy.membercache import MemberCache
+
+TEST_ZIP = Path(__file__).parent / "test_archive.zip"
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.txt").write_bytes(b"aaa")
+    shutil.copy2(TEST_ZIP, data_dir / "bundle.zip")
+    return data_dir
+
+
+def read_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def no_member_reads():
+    return patch.object(ArchiveHandler, "map_members", side_effect=AssertionError("members were read"))
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_unchanged_archive_members_come_from_cache(data_dir, tmp_path, strict):
+    cache_path = str(tmp_path / "members.sqlite")
+    with MemberCache(cache_path, strict=strict) as cache:
+        first = list(iter_checksums(str(data_dir), member_cache=cache))
+        assert cache.misses == 1
+    with MemberCache(cache_path, strict=strict) as cache, no_member_reads():
+        second = list(iter_checksums(str(data_dir), member_cache=cache))
+        assert cache.hits == 1
+    assert second == first
+
+
+def test_changed_archive_is_hashed_again(data_dir, tmp_path):
+    cache_path = str(tmp_path / "members.sqlite")
+    with MemberCache(cache_path) as cache:
+        list(iter_checksums(str(data_dir), member_cache=cache))
+    with zipfile.ZipFile(data_dir / "bundle.zip", "a") as zip_ref:
+        zip_ref.writestr("added.txt", b"new")
+    with MemberCache(cache_path) as cache:
+        names = [record.name for record in iter_checksums(str(data_dir), member_cache=cache)]
+        assert cache.misses == 1
+    assert "added.txt" in names
+
+
+def test_touched_archive_misses_unless_strict(data_dir, tmp_path):
+    cache_path = str(tmp_path / "members.sqlite")
+    for strict, expected_hits in ((False, 0), (True, 1)):
+        with MemberCache(cache_path, strict=strict) as cache:
+            list(iter_checksums(str(data_dir), member_cache=cache))
+        os.utime(data_dir / "bundle.zip", ns=(0, 0))
+        with MemberCache(cache_path, strict=strict) as cache:
+            list(iter_checksums(str(data_dir), member_cache=cache))
+            assert cache.hits == expected_hits
+
+
+def test_algorithms_are_cached_separately(data_dir, tmp_path):
+    cache_path = str(tmp_path / "members.sqlite")
+    with MemberCache(cache_path) as cache:
+        list(iter_checksums(str(data_dir), member_cache=cache))
+        records = list(iter_checksums(str(data_dir), algorithm="sha256", member_cache=cache))
+        assert cache.hits == 0
+    assert all(len(record.digest) == 64 for record in records)
+
+
+def test_central_directory_digest(tmp_path):
+    archive = tmp_path / "bundle.zip"
+    shutil.copy2(TEST_ZIP, archive)
+    handler = ArchiveHandler()
+    digest = handler.central_directory_digest(str(archive))
+    assert digest and len(digest) == 32
+    # Prepended data (as in self-extracting archives) does not change the central directory
+    prefixed = tmp_path / "prefixed.zip"
+    prefixed.write_bytes(b"#!stub\n" + archive.read_bytes())
+    assert handler.central_directory_digest(str(prefixed)) == digest
+    (tmp_path / "not.zip").write_bytes(b"plain data")
+    assert handler.central_directory_digest(str(tmp_path / "not.zip")) is None
+
+
+def as_zip64(data, extensible=b""):
+    """Rewrite a small ZIP's end records as ZIP64 ones, with `extensible` data in the ZIP64 end record."""
+    _, _, _, entries, _, directory_size, directory_offset, _ = struct.unpack("<4s4H2LH", data[-22:])
+    directory_end = directory_offset + directory_size
+    record = struct.pack("<4sQ2H2L4Q", b"PK\x06\x06", 44 + len(extensible), 45, 45, 0, 0, entries, entries, directory_size, directory_offset) + extensible
+    locator = struct.pack("<4sLQL", b"PK\x06\x07", 0, directory_end, 1)
+    end = struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, 0xFFFF, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0)
+    return data[:directory_end] + record + locator + end, directory_offset
+
+
+@pytest.mark.parametrize("extensible", [b"", b"extensible data" * 10])
+def test_central_directory_digest_zip64(tmp_path, extensible):
+    data, directory_offset = as_zip64(TEST_ZIP.read_bytes(), extensible)
+    archive = tmp_path / "zip64.zip"
+    archive.write_bytes(data)
+    handler = ArchiveHandler()
+    digest = handler.central_directory_digest(str(archive))
+    assert digest == hashlib.blake2b(data[directory_offset:], digest_size=16).hexdigest()
+    prefixed = tmp_path / "prefixed.zip"
+    prefixed.write_bytes(os.urandom(5000) + data)
+    assert handler.central_directory_digest(str(prefixed)) == digest
+
+
+def test_get_checksums_with_member_cache(data_dir, tmp_path):
+    cache_path = data_dir / "members.sqlite"
+    output = tmp_path / "out.csv"
+    get_checksums(str(data_dir), output_filepath=str(output), member_cache_filepath=str(cache_path))
+    first = read_rows(output)
+    # The cache file inside the input directory is not hashed
+    assert not any("members.sqlite" in row[0] for row in first)
+    with no_member_reads():
+        get_checksums(str(data_dir), output_filepath=str(output), member_cache_filepath=str(cache_path), force=True)
+    assert read_rows(output) == first
+    with pytest.raises(ValueError):
+        get_checksums(str(data_dir), member_cache_strict=True)
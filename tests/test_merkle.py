@@ -0,0 +1,121 @@
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from sumbuddy import get_checksums
+from sumbuddy.exceptions import OutputFileExistsError
+from sumbuddy.merkle import (
+    ARCHIVE,
+    DIRECTORY,
+    DirectoryDigests,
+    changed_directories,
+    load_directory_digests,
+)
+
+EXAMPLES_DIR = Path(__file__).parent.parent / "examples"
+
+
+def md5(data):
+    return hashlib.md5(data).hexdigest()
+
+
+def build(root, files):
+    digests = DirectoryDigests(root)
+    for relative, data in files.items():
+        digests.add_file(os.path.join(root, relative), md5(data))
+    return digests
+
+
+def test_digest_independent_of_insertion_order_and_root():
+    files = {"a.txt": b"a", "sub/b.txt": b"b", "sub/deeper/c.txt": b"c"}
+    forward = build("replica1", files)
+    backward = build("/mnt/replica2", dict(reversed(list(files.items()))))
+    assert forward.digest() == backward.digest()
+    assert forward.digest("replica1/sub") == backward.digest("/mnt/replica2/sub")
+
+
+def test_digest_covers_names_and_contents():
+    base = build("r", {"a.txt": b"a", "sub/b.txt": b"b"})
+    assert base.digest() != build("r", {"a.txt": b"a", "sub/b.txt": b"B"}).digest()
+    assert base.digest() != build("r", {"a.txt": b"a", "sub/renamed.txt": b"b"}).digest()
+    # Moving a file between directories changes the digest even though names and contents match
+    assert base.digest() != build("r", {"a.txt": b"a", "b.txt": b"b", "sub/x": b""}).digest()
+    # A directory and a file with the same name and digest are distinguished
+    assert build("r", {"x/y": b""}).digest() != build("r", {"x": b""}).digest()
+
+
+def test_incremental_update_only_rehashes_dirty_path():
+    digests = build("r", {"a/1": b"1", "b/2": b"2", "b/c/3": b"3"})
+    digests.digest()
+
+    digests.add_file("r/b/c/3", md5(b"changed"))
+    with patch.object(digests._hasher, "new_hash", wraps=digests._hasher.new_hash) as new_hash:
+        updated = digests.digest()
+    # Root, b and b/c are recomputed; a is reused
+    assert new_hash.call_count == 3
+    assert updated == build("r", {"a/1": b"1", "b/2": b"2", "b/c/3": b"changed"}).digest()
+
+    digests.remove("r/b")
+    assert digests.digest() == build("r", {"a/1": b"1"}).digest()
+
+
+def test_archive_member_set_digest():
+    digests = build("r", {"x.zip": b"zip bytes"})
+    digests.add_member("r/x.zip", "dir/file.txt", md5(b"member"))
+    rows = {dirpath: kind for dirpath, kind, _ in digests.rows()}
+    assert rows == {"r": DIRECTORY, "r/x.zip": ARCHIVE, "r/x.zip/dir": DIRECTORY}
+    assert digests.digest("r/x.zip") == build("s", {"dir/file.txt": b"member"}).digest()
+
+
+def test_changed_directories_descends_only_into_differences(tmp_path):
+    for name in ("one", "two"):
+        for relative in ("same/a.txt", "same/deep/b.txt", "diff/c.txt", "diff/ok/d.txt"):
+            path = tmp_path / name / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(relative)
+    (tmp_path / "two" / "diff" / "c.txt").write_text("corrupted")
+
+    digest_files = {}
+    for name in ("one", "two"):
+        digest_files[name] = tmp_path / f"{name}_dirs.csv"
+        get_checksums(str(tmp_path / name), str(tmp_path / f"{name}.csv"), dir_digests_filepath=str(digest_files[name]))
+
+    a = load_directory_digests(digest_files["one"])
+    b = load_directory_digests(digest_files["two"])
+    assert list(changed_directories(a, b)) == [".", "diff"]
+    assert list(changed_directories(a, a)) == []
+
+
+def test_get_checksums_dir_digests_matches_examples(monkeypatch, tmp_path):
+    monkeypatch.chdir(EXAMPLES_DIR)
+    digests_file = tmp_path / "dirs.csv"
+    get_checksums("example_content", str(tmp_path / "checksums.csv"), dir_digests_filepath=str(digests_file))
+
+    lines = digests_file.read_text().splitlines()
+    assert lines[0] == "dirpath,kind,dir-md5"
+    assert [line.rsplit(",", 1)[0] for line in lines[1:]] == [
+        "example_content,directory",
+        "example_content/dir,directory",
+        "example_content/testzip.zip,archive",
+        "example_content/testzip.zip/dir,directory",
+    ]
+
+    # The same tree copied elsewhere has the same root digest
+    shutil.copytree("example_content", tmp_path / "copy")
+    get_checksums(str(tmp_path / "copy"), str(tmp_path / "copy.csv"), dir_digests_filepath=str(tmp_path / "copy_dirs.csv"))
+    assert load_directory_digests(digests_file)["."] == load_directory_digests(tmp_path / "copy_dirs.csv")["."]
+
+    with pytest.raises(OutputFileExistsError):
+        get_checksums("example_content", dir_digests_filepath=str(digests_file))
+
+
+@pytest.mark.parametrize(("options", "label"), [({"fingerprint_size": 1024}, "dir-fp-md5-1KiB"), ({"block_size": 1024}, "dir-tree-md5-1KiB")])
+def test_dir_digests_carry_the_checksum_label(monkeypatch, tmp_path, options, label):
+    monkeypatch.chdir(EXAMPLES_DIR)
+    digests_file = tmp_path / "dirs.csv"
+    get_checksums("example_content", str(tmp_path / "checksums.csv"), dir_digests_filepath=str(digests_file), **options)
+    assert digests_file.read_text().splitlines()[0] == f"dirpath,kind,{label}"
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from sumbuddy.exceptions import EmptyInputDirectoryError, NoFilesAfterFilteringError
+from sumbuddy.mapper import Mapper
+
+
+def build_tree(root):
+    for i in range(12):
+        directory = root / f"dir{i:02d}" / "nested"
+        directory.mkdir(parents=True)
+        for j in range(5):
+            (directory.parent / f"file{j}.txt").write_text(f"{i}-{j}")
+            (directory / f"deep{j}.dat").write_text(f"{i}-{j}")
+        (directory / ".hidden").write_text("hidden")
+    (root / "skip").mkdir()
+    (root / "skip" / "a.txt").write_text("a")
+    (root / "keep.log").write_text("log")
+    (root / ".sumbuddyignore").write_text("skip/\n*.log\n")
+    (root / "dir03" / ".sumbuddyignore").write_text("*.dat\n")
+    (root / "dir05" / "loop").symlink_to(root)
+
+
+@pytest.mark.parametrize("follow_symlinks", [False, True])
+@pytest.mark.parametrize("include_hidden", [False, True])
+def test_same_files_as_sequential_walk(tmp_path, follow_symlinks, include_hidden):
+    build_tree(tmp_path)
+    sequential = Mapper(follow_symlinks=follow_symlinks).gather_file_paths(str(tmp_path), include_hidden=include_hidden)
+    concurrent = Mapper(follow_symlinks=follow_symlinks, walk_threads=4).gather_file_paths(str(tmp_path), include_hidden=include_hidden)
+    assert sorted(concurrent[0]) == sorted(sequential[0])
+    assert concurrent[1] == sequential[1]
+    if not include_hidden:
+        assert not any("skip" in path or path.endswith((".log", ".hidden")) for path in concurrent[0])
+
+
+def test_sorted_depth_first_order(tmp_path):
+    build_tree(tmp_path)
+    expected = []
+    for root, directories, files in os.walk(tmp_path):
+        directories.sort()
+        expected.extend(os.path.join(root, name) for name in sorted(files))
+    walked = [os.path.join(directory, name) for directory, name, _, _ in Mapper(walk_threads=3)._walk(str(tmp_path))]
+    assert walked == [path for path in expected if not path.startswith(str(tmp_path / "skip"))]
+    # The stats come from the listing threads and match the files
+    for directory, name, file_stat, _ in Mapper(walk_threads=3)._walk(str(tmp_path)):
+        assert file_stat.st_ino == os.stat(os.path.join(directory, name)).st_ino
+
+
+def test_abandoned_walk_stops_threads(tmp_path):
+    build_tree(tmp_path)
+    walk = Mapper(walk_threads=2).iter_file_paths(str(tmp_path))
+    next(walk)
+    walk.close()
+
+
+def test_errors_match_sequential_walk(tmp_path):
+    with pytest.raises(EmptyInputDirectoryError):
+        Mapper(walk_threads=4).gather_file_paths(str(tmp_path))
+    (tmp_path / ".hidden").mkdir()
+    (tmp_path / ".hidden" / "file.txt").write_text("x")
+    with pytest.raises(NoFilesAfterFilteringError):
+        Mapper(walk_threads=4).gather_file_paths(str(tmp_path))
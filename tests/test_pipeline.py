@@ -0,0 +1,59 @@
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+
+from sumbuddy.hasher import Hasher
+from sumbuddy.pipeline import DEFAULT_PIPELINE_BUFFER_SIZE, PipelinedReader
+
+
+class FailingStream(io.RawIOBase):
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        raise OSError("device error")
+
+
+def test_reader_yields_contents_in_order():
+    data = os.urandom(10_000)
+    blocks = []
+    owners = set()
+    with PipelinedReader(io.BytesIO(data), buffer_size=1024, buffers=3) as reader:
+        for block in reader:
+            blocks.append(bytes(block))
+            owners.add(id(block.obj))
+    assert b"".join(blocks) == data
+    # The same preallocated buffers are reused for the whole file
+    assert len(owners) <= 3
+
+
+def test_reader_raises_read_errors():
+    with pytest.raises(OSError, match="device error"), PipelinedReader(FailingStream(), buffer_size=64) as reader:
+        list(reader)
+
+
+def test_abandoned_reader_stops_thread():
+    reader = PipelinedReader(io.BytesIO(b"x" * 100_000), buffer_size=64, buffers=2)
+    next(iter(reader))
+    reader.close()
+    assert not any(thread.name == "sumbuddy-reader" and thread.is_alive() for thread in threading.enumerate())
+
+
+def test_reader_needs_two_buffers():
+    with pytest.raises(ValueError):
+        PipelinedReader(io.BytesIO(b""), buffers=1)
+
+
+@pytest.mark.parametrize("size", [0, 100, DEFAULT_PIPELINE_BUFFER_SIZE, 3 * DEFAULT_PIPELINE_BUFFER_SIZE + 5])
+def test_pipelined_checksum_matches(tmp_path, size):
+    data = os.urandom(size)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    hasher = Hasher("sha256")
+    observed = bytearray()
+    assert hasher.checksum_file(str(path), pipelined=True, observer=observed.extend) == hashlib.sha256(data).hexdigest()
+    assert observed == data
+    assert hasher.checksum_file(io.BytesIO(data), pipelined=True) == hashlib.sha256(data).hexdigest()
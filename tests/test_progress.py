@@ -0,0 +1,78 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+import sumbuddy.__main__
+from sumbuddy import get_checksums
+
+
+class RecordingBar:
+    """Stand-in for the tqdm bar that records what get_checksums does with it."""
+
+    def __init__(self, total, desc, disable):
+        self.total = total
+        self.n = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def update(self, n=1):
+        self.n += n
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (data_dir / name).write_text(name)
+    return data_dir
+
+
+def run_with_bar(data_dir, output, **options):
+    bars = []
+
+    def progress_bar(*args):
+        bars.append(RecordingBar(*args))
+        return bars[-1]
+
+    with patch("sumbuddy.__main__._progress_bar", side_effect=progress_bar):
+        get_checksums(str(data_dir), str(output), **options)
+    return bars[0]
+
+
+def test_hashing_does_not_wait_for_the_count(data_dir, tmp_path):
+    stopped = []
+
+    def slow_count(input_paths, stop=None, **options):
+        stopped.append(stop.wait(timeout=10))
+
+    started = time.monotonic()
+    with patch("sumbuddy.__main__._count_entries", side_effect=slow_count):
+        bar = run_with_bar(data_dir, tmp_path / "out.csv")
+    assert time.monotonic() - started < 5
+    # The count was stopped at the end of the run, and the bar went without a total
+    assert stopped == [True]
+    assert (bar.n, bar.total) == (3, None)
+
+
+def test_count_sets_the_total(data_dir, tmp_path):
+    real_count = sumbuddy.__main__._count_entries
+
+    def unstoppable_count(input_paths, stop=None, **options):
+        # On a tree this small the hashing would otherwise finish, and stop the count, before it completes
+        return real_count(input_paths, **options)
+
+    with patch("sumbuddy.__main__._count_entries", side_effect=unstoppable_count):
+        bar = run_with_bar(data_dir, tmp_path / "out.csv")
+    assert (bar.n, bar.total) == (3, 3)
+
+
+def test_no_count_with_walk_threads(data_dir, tmp_path):
+    with patch("sumbuddy.__main__._count_entries", side_effect=AssertionError("tree walked twice")):
+        bar = run_with_bar(data_dir, tmp_path / "out.csv", walk_threads=4)
+    assert (bar.n, bar.total) == (3, None)
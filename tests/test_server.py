@@ -0,0 +1,161 @@
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from sumbuddy import __main__ as sb_main
+from sumbuddy import iter_checksums
+from sumbuddy.cache import HashCache
+from sumbuddy.exceptions import ServerAlreadyRunningError, ServerRequestError
+from sumbuddy.hasher import Hasher
+from sumbuddy.server import ChecksumServer, request_checksums
+
+EXAMPLES_DIR = Path(__file__).parent.parent / "examples"
+TEST_ZIP = Path(__file__).parent / "test_archive.zip"
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix domain sockets not available")
+
+
+@pytest.fixture
+def server():
+    # Unix socket paths are limited to ~100 bytes, so avoid pytest's long tmp_path
+    with tempfile.TemporaryDirectory() as socket_dir:
+        checksum_server = ChecksumServer(os.path.join(socket_dir, "sb.sock"), workers=2)
+        with checksum_server:
+            thread = threading.Thread(target=checksum_server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+            thread.start()
+            yield checksum_server
+        thread.join(timeout=5)
+
+
+def test_request_matches_default_fixture(server, monkeypatch):
+    monkeypatch.chdir(EXAMPLES_DIR)
+    records = list(request_checksums("example_content", socket_path=server.socket_path))
+
+    rows = [f"{r['filepath']},{r['filename']},{r['checksum']}" for r in records]
+    expected = (EXAMPLES_DIR / "expected_outputs" / "default.csv").read_text().splitlines()[1:]
+    assert sorted(rows) == sorted(expected)
+    assert {r["algorithm"] for r in records} == {"md5"}
+
+
+def test_repeated_request_is_served_from_cache(server, tmp_path):
+    (tmp_path / "a.txt").write_text("alpha")
+    (tmp_path / "b.txt").write_text("beta")
+
+    first = list(request_checksums(str(tmp_path), socket_path=server.socket_path))
+    with patch("sumbuddy.hasher.Hasher.checksum_file") as mock_checksum:
+        second = list(request_checksums(str(tmp_path), socket_path=server.socket_path))
+    mock_checksum.assert_not_called()
+    assert first == second
+    assert server.cache.hits == 2
+
+    (tmp_path / "a.txt").write_text("changed")
+    third = {r["filename"]: r["checksum"] for r in request_checksums(str(tmp_path), socket_path=server.socket_path)}
+    assert third["a.txt"] != {r["filename"]: r["checksum"] for r in first}["a.txt"]
+
+
+def test_records_match_iter_checksums_on_the_shared_pool(server, tmp_path):
+    (tmp_path / "a.txt").write_text("alpha")
+    os.link(tmp_path / "a.txt", tmp_path / "b.txt")
+    shutil.copy2(TEST_ZIP, tmp_path / "bundle.zip")
+
+    real_checksum_file = Hasher.checksum_file
+    member_threads = set()
+
+    def recording_checksum_file(self, file_path_or_obj, *args, **kwargs):
+        if not isinstance(file_path_or_obj, str):
+            member_threads.add(threading.current_thread().name)
+        return real_checksum_file(self, file_path_or_obj, *args, **kwargs)
+
+    # Files and archive members are hashed on the server's warm pool, not on pools started per request or archive
+    with patch("concurrent.futures.ThreadPoolExecutor", side_effect=AssertionError("pool started for a request")), patch.object(Hasher, "checksum_file", recording_checksum_file):
+        records = list(request_checksums(str(tmp_path), socket_path=server.socket_path))
+    assert member_threads and all(name.startswith("sum-buddy_") for name in member_threads)
+    expected = [(r.path, r.name, r.algorithm, r.digest) for r in iter_checksums(str(tmp_path))]
+    assert [(r["filepath"], r["filename"], r["algorithm"], r["checksum"]) for r in records] == expected
+    assert any(r["filepath"].startswith(str(tmp_path / "bundle.zip") + "/") for r in records)
+
+
+def test_single_file_and_options(server, tmp_path):
+    target = tmp_path / "file.txt"
+    target.write_text("This is a test file.")
+    records = list(request_checksums(str(target), socket_path=server.socket_path, algorithm="sha256"))
+    assert records == [{
+        "filepath": str(target),
+        "filename": "file.txt",
+        "algorithm": "sha256",
+        "checksum": "f29bc64a9d3732b4b9035125fdb3285f5b6455778edca72414671e0ca3b2e0de",
+    }]
+
+
+def test_server_reports_errors(server, tmp_path):
+    with pytest.raises(ServerRequestError, match="EmptyInputDirectoryError"):
+        list(request_checksums(str(tmp_path), socket_path=server.socket_path))
+
+    # The connection stays usable after an error response
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(server.socket_path)
+        sock.sendall(b'{"input_path": "x", "bogus": 1}\n{"not": "a request"}\n')
+        with sock.makefile("rb") as stream:
+            first, second = json.loads(stream.readline()), json.loads(stream.readline())
+    assert "bogus" in first["error"]
+    assert "input_path" in second["error"]
+
+
+def test_second_server_on_same_socket_refused(server):
+    with pytest.raises(ServerAlreadyRunningError):
+        ChecksumServer(server.socket_path).start()
+
+
+def test_stale_socket_is_replaced():
+    with tempfile.TemporaryDirectory() as socket_dir:
+        socket_path = os.path.join(socket_dir, "sb.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(socket_path)
+        stale.close()
+
+        with ChecksumServer(socket_path, cache=HashCache(max_entries=10)):
+            assert os.path.exists(socket_path)
+        assert not os.path.exists(socket_path)
+
+
+def test_regular_file_at_socket_path_is_kept():
+    with tempfile.TemporaryDirectory() as socket_dir:
+        socket_path = os.path.join(socket_dir, "sb.sock")
+        Path(socket_path).write_text("not a socket")
+
+        with pytest.raises(FileExistsError, match="Not a socket"):
+            ChecksumServer(socket_path).start()
+        assert Path(socket_path).read_text() == "not a socket"
+
+        # A file that replaced the socket while the server ran is not removed on close either
+        os.unlink(socket_path)
+        checksum_server = ChecksumServer(socket_path).start()
+        os.unlink(socket_path)
+        Path(socket_path).write_text("replacement")
+        checksum_server.close()
+        assert Path(socket_path).read_text() == "replacement"
+
+
+def test_client_command_writes_csv(server, monkeypatch, tmp_path):
+    monkeypatch.chdir(EXAMPLES_DIR)
+    output_file = tmp_path / "checksums.csv"
+    monkeypatch.setattr(sys, "argv", ["sum-buddy", "client", "--socket", server.socket_path, "-o", str(output_file), "example_content"])
+    sb_main.main()
+
+    expected = (EXAMPLES_DIR / "expected_outputs" / "default.csv").read_text().splitlines()
+    assert sorted(output_file.read_text().splitlines()) == sorted(expected)
+
+
+def test_client_command_without_server(monkeypatch, tmp_path):
+    monkeypatch.setattr(sys, "argv", ["sum-buddy", "client", "--socket", str(tmp_path / "missing.sock"), str(tmp_path)])
+    with pytest.raises(SystemExit) as excinfo:
+        sb_main.main()
+    assert "sum-buddy serve" in str(excinfo.value)
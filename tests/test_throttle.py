@@ -0,0 +1,96 @@
+import hashlib
+import io
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from sumbuddy import get_checksums, iter_checksums
+from sumbuddy.hasher import Hasher
+from sumbuddy.throttle import Throttle, TokenBucket, set_io_priority
+
+
+class FakeClock:
+    """Stands in for the time module: sleeping advances the clock instantly."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = 0.0
+        self._lock = threading.Lock()
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.slept += seconds
+            self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch("sumbuddy.throttle.time", fake):
+        yield fake
+
+
+def test_bucket_allows_burst_then_holds_rate(clock):
+    bucket = TokenBucket(100, burst=50)
+    bucket.acquire(50)
+    assert clock.slept == 0
+    bucket.acquire(100)
+    assert clock.slept == pytest.approx(1.0)
+    # Requests larger than the burst are allowed, at the cost of a longer wait
+    bucket.acquire(300)
+    assert clock.slept == pytest.approx(4.0)
+
+
+def test_bucket_refills_while_idle(clock):
+    bucket = TokenBucket(10)
+    bucket.acquire(10)
+    clock.now += 5
+    bucket.acquire(10)
+    assert clock.slept == 0
+
+
+def test_bucket_rejects_zero_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_hasher_reads_are_charged(clock):
+    data = b"x" * 10_000
+    throttle = Throttle(bytes_per_second=1000)
+    assert Hasher("md5", throttle=throttle).checksum_file(io.BytesIO(data)) == hashlib.md5(data).hexdigest()
+    # 1000 bytes of burst, then 9000 bytes at 1000 bytes per second
+    assert clock.slept == pytest.approx(9.0)
+
+
+def test_files_per_second(clock, tmp_path):
+    for i in range(6):
+        (tmp_path / f"f{i}.txt").write_text(str(i))
+    records = list(iter_checksums(str(tmp_path), throttle=Throttle(files_per_second=2)))
+    assert len(records) == 6
+    assert clock.slept == pytest.approx(2.0)
+
+
+def test_get_checksums_rates(clock, tmp_path):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "big.bin").write_bytes(b"\0" * 5000)
+    output = tmp_path / "out.csv"
+    get_checksums(str(tmp_path / "data"), str(output), max_bytes_per_second=1000, pipelined=True)
+    assert clock.slept == pytest.approx(4.0)
+
+
+def test_set_io_priority_validation():
+    with pytest.raises(ValueError):
+        set_io_priority("realtime")
+    with pytest.raises(ValueError):
+        set_io_priority("best-effort", level=9)
+
+
+def test_set_io_priority():
+    try:
+        set_io_priority("best-effort", level=7)
+    except OSError as e:
+        pytest.skip(f"ioprio_set unavailable here: {e}")
@@ -0,0 +1,163 @@
+import hashlib
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from sumbuddy.watch import ManifestDB, Watcher
+
+TEST_ZIP = Path(__file__).parent / "test_archive.zip"
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="watch mode requires Linux inotify")
+
+
+def md5(data):
+    return hashlib.md5(data).hexdigest()
+
+
+def manifest_rows(manifest_path):
+    with sqlite3.connect(manifest_path) as connection:
+        return dict(connection.execute("SELECT filepath, checksum FROM checksums"))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def watched(tmp_path):
+    """Run a watcher over tmp_path/data in a background thread; yields (data_dir, manifest_path)."""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "existing.txt").write_bytes(b"existing")
+    (data_dir / ".hidden").write_bytes(b"hidden")
+    manifest_path = tmp_path / "manifest.db"
+
+    watcher = Watcher(str(data_dir), str(manifest_path), debounce=0.1).start()
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.run, kwargs={"stop_event": stop, "poll_interval": 0.05})
+    thread.start()
+    try:
+        yield data_dir, manifest_path
+    finally:
+        stop.set()
+        thread.join(timeout=5)
+        watcher.close()
+
+
+def test_initial_scan_respects_filter(watched):
+    data_dir, manifest_path = watched
+    assert manifest_rows(manifest_path) == {str(data_dir / "existing.txt"): md5(b"existing")}
+
+
+def test_create_modify_delete(watched):
+    data_dir, manifest_path = watched
+    new_file = data_dir / "sub" / "new.txt"
+    new_file.parent.mkdir()
+    new_file.write_bytes(b"first")
+    assert wait_for(lambda: manifest_rows(manifest_path).get(str(new_file)) == md5(b"first"))
+
+    new_file.write_bytes(b"second")
+    assert wait_for(lambda: manifest_rows(manifest_path).get(str(new_file)) == md5(b"second"))
+
+    (data_dir / ".ignored").write_bytes(b"hidden files stay out")
+    (data_dir / "existing.txt").unlink()
+    assert wait_for(lambda: str(data_dir / "existing.txt") not in manifest_rows(manifest_path))
+
+    shutil.rmtree(data_dir / "sub")
+    assert wait_for(lambda: manifest_rows(manifest_path) == {})
+
+
+def test_archive_members_follow_archive(watched):
+    data_dir, manifest_path = watched
+    archive = data_dir / "bundle.zip"
+    shutil.copy2(TEST_ZIP, archive)
+    member = f"{archive}/test_data/test_file.txt"
+    assert wait_for(lambda: member in manifest_rows(manifest_path))
+
+    archive.rename(data_dir / "renamed.zip")
+    assert wait_for(lambda: f"{data_dir}/renamed.zip/test_data/test_file.txt" in manifest_rows(manifest_path))
+    assert not any(path.startswith(str(archive)) for path in manifest_rows(manifest_path))
+
+
+def test_debounce_waits_for_writer(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    with Watcher(str(data_dir), str(tmp_path / "manifest.db"), debounce=60) as watcher:
+        (data_dir / "growing.bin").write_bytes(b"partial")
+        watcher.poll(timeout=1)
+        assert manifest_rows(tmp_path / "manifest.db") == {}
+        assert watcher.process_pending(now=time.monotonic() + 61) == 1
+        assert manifest_rows(tmp_path / "manifest.db") == {str(data_dir / "growing.bin"): md5(b"partial")}
+
+
+def test_restart_skips_unchanged_files(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.txt").write_bytes(b"a")
+    manifest_path = str(tmp_path / "manifest.db")
+    watcher = Watcher(str(data_dir), manifest_path)
+    watcher.scan()
+    watcher.close()
+
+    calls = []
+    monkeypatch.setattr("sumbuddy.hasher.Hasher.checksum_file", lambda self, path, **kwargs: calls.append(path) or "x")
+    (data_dir / "b.txt").write_bytes(b"b")
+    watcher = Watcher(str(data_dir), manifest_path)
+    watcher.scan()
+    watcher.close()
+    assert calls == [str(data_dir / "b.txt")]
+
+
+def test_manifest_reset_when_algorithm_changes(tmp_path):
+    manifest_path = str(tmp_path / "manifest.db")
+    manifest = ManifestDB(manifest_path)
+    manifest.upsert("a.txt", "abc")
+    manifest.close()
+
+    manifest = ManifestDB(manifest_path, algorithm="sha256")
+    assert list(manifest.rows()) == []
+    manifest.close()
+
+
+def test_local_ignore_files_apply_to_events(tmp_path):
+    data_dir = tmp_path / "data"
+    (data_dir / "sub").mkdir(parents=True)
+    (data_dir / "sub" / ".sumbuddyignore").write_text("*.tmp\n")
+    with Watcher(str(data_dir), str(tmp_path / "manifest.db"), debounce=0) as watcher:
+        (data_dir / "sub" / "scratch.tmp").write_bytes(b"tmp")
+        (data_dir / "sub" / "kept.txt").write_bytes(b"kept")
+        (data_dir / "scratch.tmp").write_bytes(b"top level is not covered")
+        watcher.poll(timeout=1)
+        assert set(manifest_rows(tmp_path / "manifest.db")) == {str(data_dir / "sub" / "kept.txt"), str(data_dir / "scratch.tmp")}
+
+
+def test_ignored_directories_are_not_watched(tmp_path):
+    data_dir = tmp_path / "data"
+    (data_dir / ".git" / "objects").mkdir(parents=True)
+    (data_dir / "node_modules" / "pkg").mkdir(parents=True)
+    (data_dir / "src").mkdir()
+    (data_dir / ".sumbuddyignore").write_text("node_modules/\n")
+    with Watcher(str(data_dir), str(tmp_path / "manifest.db"), debounce=0) as watcher:
+        assert set(watcher._watches.values()) == {str(data_dir), str(data_dir / "src")}
+
+        # Directories created later are pruned by the same rules
+        (data_dir / "src" / "node_modules").mkdir()
+        (data_dir / "src" / "lib").mkdir()
+        watcher.poll(timeout=1)
+        assert set(watcher._watches.values()) == {str(data_dir), str(data_dir / "src"), str(data_dir / "src" / "lib")}
+
+        # Dropping the rule brings the directories back under watch
+        (data_dir / ".sumbuddyignore").write_text("")
+        watcher.poll(timeout=1)
+        assert str(data_dir / "node_modules" / "pkg") in set(watcher._watches.values())
+        assert str(data_dir / ".git") not in set(watcher._watches.values())
@@ -0,0 +1,98 @@
+import hashlib
+import os
+from unittest.mock import patch
+
+import pytest
+
+from sumbuddy import iter_checksums
+from sumbuddy.cache import XattrCache
+from sumbuddy.hasher import Hasher
+
+
+def supports_user_xattrs(directory):
+    if not hasattr(os, "setxattr"):
+        return False
+    probe = directory / ".xattr-probe"
+    probe.write_bytes(b"")
+    try:
+        os.setxattr(probe, "user.sumbuddy.probe", b"1")
+    except OSError:
+        return False
+    finally:
+        probe.unlink()
+    return True
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    if not supports_user_xattrs(tmp_path):
+        pytest.skip("user extended attributes are not supported here")
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"payload")
+    return path
+
+
+def test_digest_is_stored_and_reused(data_file):
+    hasher = Hasher("sha256", xattrs=True)
+    digest = hasher.checksum_file(str(data_file))
+    assert digest == hashlib.sha256(b"payload").hexdigest()
+    size, mtime_ns, stored = os.getxattr(data_file, "user.sumbuddy.sha256").decode().split()
+    assert (int(size), int(mtime_ns), stored) == (7, data_file.stat().st_mtime_ns, digest)
+
+    with patch("builtins.open", side_effect=AssertionError("file was read")):
+        assert hasher.checksum_file(str(data_file)) == digest
+    assert hasher.xattr_cache.hits == 1
+
+
+def test_stale_attribute_is_ignored(data_file):
+    hasher = Hasher("md5", xattrs=True)
+    hasher.checksum_file(str(data_file))
+    data_file.write_bytes(b"changed")
+    os.utime(data_file, ns=(0, 0))
+    assert hasher.checksum_file(str(data_file)) == hashlib.md5(b"changed").hexdigest()
+    assert os.getxattr(data_file, "user.sumbuddy.md5").decode().split()[1] == "0"
+
+
+def test_algorithms_and_lengths_are_kept_apart(data_file):
+    Hasher(xattrs=True).checksum_file(str(data_file), algorithm="shake_128", length=8)
+    names = set(os.listxattr(data_file))
+    assert "user.sumbuddy.shake_128-8" in names
+    assert Hasher(xattrs=True).checksum_file(str(data_file), algorithm="md5") == hashlib.md5(b"payload").hexdigest()
+
+
+def test_malformed_attribute_is_overwritten(data_file):
+    os.setxattr(data_file, "user.sumbuddy.md5", b"garbage")
+    assert Hasher(xattrs=True).checksum_file(str(data_file)) == hashlib.md5(b"payload").hexdigest()
+    assert os.getxattr(data_file, "user.sumbuddy.md5").decode().endswith(hashlib.md5(b"payload").hexdigest())
+
+
+def test_unsupported_filesystem_falls_back(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"payload")
+    cache = XattrCache()
+    with patch("os.getxattr", side_effect=OSError(95, "Operation not supported")), patch("os.setxattr", side_effect=OSError(95, "Operation not supported")) as setxattr:
+        stat_result = path.stat()
+        assert cache.get(str(path), "md5", stat_result=stat_result) is None
+        cache.put(str(path), "md5", None, stat_result, "digest")
+        cache.put(str(path), "md5", None, stat_result, "digest")
+    # The device is remembered as unsupported, so it is not probed again
+    setxattr.assert_not_called()
+
+
+def test_iter_checksums_with_xattrs(data_file):
+    first = list(iter_checksums(str(data_file.parent), xattrs=True))
+    with patch("builtins.open", side_effect=AssertionError("file was read")):
+        assert list(iter_checksums(str(data_file.parent), xattrs=True)) == first
+    with pytest.raises(ValueError, match="xattrs"):
+        iter_checksums(str(data_file.parent), xattrs=True, block_size=1024)
+
+
+@pytest.mark.parametrize("value", ["abc def 0123", "{size} {mtime_ns} notahexdigest", "{size} {mtime_ns} " + "ab" * 8, "{size} {mtime_ns} " + "zz" * 16])
+def test_invalid_attribute_is_a_miss_and_overwritten(data_file, value):
+    file_stat = data_file.stat()
+    os.setxattr(data_file, "user.sumbuddy.md5", value.format(size=file_stat.st_size, mtime_ns=file_stat.st_mtime_ns).encode())
+    hasher = Hasher("md5", xattrs=True)
+    digest = hasher.checksum_file(str(data_file))
+    assert digest == hashlib.md5(b"payload").hexdigest()
+    assert hasher.xattr_cache.misses == 1
+    assert os.getxattr(data_file, "user.sumbuddy.md5").decode().split()[2] == digest